@@ -0,0 +1,54 @@
+import random
+import sys
+import time
+from core import match_matrix
+from core.recommender import CookingRecommender
+
+# Scores a batch of pantry queries one by one and through the sparse batch API.
+# Run from the Meal&Match folder: python -m benchmarks.batch_bench [queries] [top_k]
+
+
+def pantry_queries(recommender, n):
+    # a few ingredients from one recipe plus a few staples, like a real pantry
+    random.seed(0)
+    titles = recommender.recipe_titles
+    vocab = sorted(recommender.postings)
+    queries = []
+    for _ in range(n):
+        ings = list(dict.fromkeys(recommender.ingredients_map[random.choice(titles)]))
+        picked = random.sample(ings, min(len(ings), random.randint(2, 8)))
+        queries.append(" ".join(picked + random.sample(vocab, 2)))
+    return queries
+
+
+def main():
+    n_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    recommender = CookingRecommender()
+    queries = pantry_queries(recommender, n_queries)
+    backend = "scipy" if match_matrix.sparse is not None else "pure Python"
+    print(f"{len(recommender.recipe_titles)} recipes, {len(queries)} queries, top {top_k}, batch backend: {backend}")
+
+    start = time.perf_counter()
+    expected = [recommender.get_alternative_dishes(q, top_k=top_k) for q in queries]
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    recommender.get_alternative_dishes_batch(queries[:1], top_k=top_k)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = recommender.get_alternative_dishes_batch(queries, top_k=top_k)
+    batched = time.perf_counter() - start
+    if batch != expected:
+        raise SystemExit("batch results differ from get_alternative_dishes")
+    print("Results identical to get_alternative_dishes.")
+
+    print(f"get_alternative_dishes, one by one   {single:7.3f}s  {single / len(queries) * 1000:7.3f} ms/query")
+    print(f"get_alternative_dishes_batch         {batched:7.3f}s  {batched / len(queries) * 1000:7.3f} ms/query  {single / batched:5.1f}x")
+    print(f"matrix build (first batch call)      {setup:7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlencode
+
+# Load generator for the HTTP service (python main.py serve [port]). Keep-alive connections
+# send a mix of typing-style suggest calls, matches, alternatives, steps and the odd batch of
+# alternatives for the given time, then client-side latencies are printed next to the
+# server's own /metrics. Queries are built from ingredients_corpus.txt in the current folder.
+# Run from the Meal&Match folder: python -m benchmarks.load_gen [port] [connections] [seconds] [batch size]
+
+HOST = "127.0.0.1"
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+    return pick(50) * 1000, pick(95) * 1000, pick(99) * 1000
+
+
+def request_mix(lines, titles, batch_size):
+    # one (endpoint, method, target, body) at random, in proportions a UI session produces
+    line = random.choice(lines)
+    tokens = line.split()
+    cut = random.randint(1, len(tokens))
+    typed = " ".join(tokens[:cut])
+    r = random.random()
+    if r < 0.55:
+        if random.random() < 0.5:
+            typed = typed[:len(typed) - random.randint(0, min(3, len(tokens[cut - 1]) - 1))]
+        return "/suggest", "GET", "/suggest?" + urlencode({"text": typed, "k": 6}), None
+    if r < 0.75:
+        return "/match", "GET", "/match?" + urlencode({"text": typed}), None
+    if r < 0.9:
+        return "/alternatives", "GET", "/alternatives?" + urlencode({"text": typed, "k": 3}), None
+    if r < 0.99 or not batch_size:
+        return "/steps", "GET", "/steps?" + urlencode({"dish": random.choice(titles)}), None
+    texts = [" ".join(random.choice(lines).split()[:6]) for _ in range(batch_size)]
+    return "/alternatives (batch)", "POST", "/alternatives", json.dumps({"texts": texts, "k": 3}).encode("utf-8")
+
+
+async def send(reader, writer, method, target, body=None):
+    head = f"{method} {target} HTTP/1.1\r\nHost: {HOST}\r\n"
+    if body:
+        head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+    writer.write(head.encode("latin-1") + b"\r\n" + (body or b""))
+    await writer.drain()
+    response = await reader.readuntil(b"\r\n\r\n")
+    lines = response.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(port, deadline, lines, titles, batch_size, latencies, errors):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    try:
+        while time.perf_counter() < deadline:
+            endpoint, method, target, body = request_mix(lines, titles, batch_size)
+            start = time.perf_counter()
+            status, _ = await send(reader, writer, method, target, body)
+            latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(port, connections, seconds, batch_size):
+    with open("ingredients_corpus.txt", "r", encoding="utf-8", errors="ignore") as f:
+        entries = [l.split(":", 1) for l in f if ":" in l]
+    lines = [rest.strip() for _, rest in entries if rest.strip()]
+    titles = [title.strip() for title, _ in entries]
+
+    random.seed(0)
+    latencies = {}
+    errors = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, start + seconds, lines, titles, batch_size, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{connections} connections, {elapsed:.1f}s: {total} requests, {total / elapsed:.0f} req/s, "
+          f"errors {errors or 0}")
+    print(f"{'client side':22s} {'count':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for endpoint, samples in sorted(latencies.items()):
+        print(f"{endpoint:22s} {len(samples):7d} " + " ".join(f"{v:8.2f}" for v in percentiles(samples)))
+
+    reader, writer = await asyncio.open_connection(HOST, port)
+    _, metrics = await send(reader, writer, "GET", "/metrics")
+    writer.close()
+    print(f"{'server side':22s} {'count':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for endpoint, m in metrics["endpoints"].items():
+        print(f"{endpoint:22s} {m['count']:7d} " + " ".join(f"{m[k]:8.2f}" for k in ("p50_ms", "p95_ms", "p99_ms")))
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    batch_size = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+    asyncio.run(run(port, connections, seconds, batch_size))
+
+
+if __name__ == "__main__":
+    main()
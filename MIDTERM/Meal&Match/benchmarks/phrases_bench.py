@@ -0,0 +1,78 @@
+import ast
+import csv
+import os
+import sys
+import tempfile
+import time
+from core.corpora_builder import CorporaBuilder
+
+# Time to get the original ingredient phrases of every recipe: reading the CSV with
+# ast.literal_eval per row as the recommender used to, reading it with the fast list parser,
+# and loading the phrases file the builder writes. All three must give the same dict.
+# Run from the Meal&Match folder: python -m benchmarks.phrases_bench [csv] [repeats]
+
+
+def literal_eval_phrases(csv_path):
+    # load_original_phrases before the phrases file and fast parser
+    phrases_map = {}
+    with open(csv_path, newline='', encoding='utf-8', errors='ignore') as fh:
+        reader = csv.DictReader(fh)
+        title_key = None
+        ing_key = None
+        for k in reader.fieldnames:
+            lk = k.lower()
+            if lk in ("title", "name", "recipe"):
+                title_key = k
+            if "ingredient" in lk:
+                ing_key = k
+        for row in reader:
+            title = row.get(title_key, "").strip() if title_key else None
+            raw_ing = row.get(ing_key, "") if ing_key else None
+            if title and raw_ing:
+                try:
+                    phrases = ast.literal_eval(raw_ing)
+                    if isinstance(phrases, list):
+                        phrases_map[title] = [p.strip() for p in phrases if p.strip()]
+                    else:
+                        phrases_map[title] = [raw_ing.strip()]
+                except Exception:
+                    phrases_map[title] = [raw_ing.strip()]
+    return phrases_map
+
+
+def best_of(repeats, fn):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "13k-recipes.csv"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    builder = CorporaBuilder(csv_path=csv_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        phrases_file = os.path.join(tmp, "ingredient_phrases.jsonl")
+        start = time.perf_counter()
+        builder.load_original_phrases(phrases_path=phrases_file)
+        print(f"wrote {phrases_file} ({os.path.getsize(phrases_file)} bytes) in {time.perf_counter() - start:.2f}s")
+
+        t_ast, expected = best_of(repeats, lambda: literal_eval_phrases(csv_path))
+        t_fast, from_csv = best_of(repeats, lambda: builder.read_original_phrases())
+        t_file, from_file = best_of(repeats, lambda: builder.load_original_phrases(phrases_path=phrases_file))
+
+    for name, result in (("fast parser", from_csv), ("phrases file", from_file)):
+        if list(result.items()) != list(expected.items()):
+            raise SystemExit(f"{name} does not match the literal_eval result")
+    print(f"{len(expected)} titles, best of {repeats}")
+    print(f"csv + ast.literal_eval  {t_ast * 1000:8.1f} ms")
+    print(f"csv + fast parser       {t_fast * 1000:8.1f} ms  {t_ast / t_fast:5.1f}x")
+    print(f"phrases file            {t_file * 1000:8.1f} ms  {t_ast / t_file:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
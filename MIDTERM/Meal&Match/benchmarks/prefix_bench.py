@@ -0,0 +1,100 @@
+import random
+import sys
+import time
+from core.ngram_model import NGramModel
+from core.tokenizer import simple_tokenize, split_partial
+
+# Replays typing held-out ingredient lines one keystroke at a time and times the suggestions:
+# completions from the prefix index, against scanning the vocabulary for the prefix, and how
+# often the word being typed is among the suggestions, against the old next-word-only answer.
+# Every 10th line of the corpus is held out, the rest is trained on.
+# Run from the Meal&Match folder: python -m benchmarks.prefix_bench [corpus] [scoring] [words]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+    return pick(50) * 1000, pick(95) * 1000
+
+
+def scan_completions(model, text, top_k):
+    # completion without the index: every vocabulary word tested against the prefix, then
+    # ranked like backoff_completions (longest history with matching followers first)
+    head, prefix = split_partial(text)
+    tokens = simple_tokenize(head)
+    context = tokens[max(0, len(tokens) - model.max_n + 1):]
+    matching = [w for w in model.vocab if w.startswith(prefix)]
+    ranked, seen = [], set()
+    for n in range(len(context) + 1, 0, -1):
+        history = " ".join(context[len(context) - n + 1:]) if n > 1 else ""
+        followers = model.context_counts[n].get(history)
+        if not followers:
+            continue
+        total = sum(followers.values())
+        for w in sorted((w for w in matching if w in followers), key=lambda w: (-followers[w], w)):
+            if w not in seen:
+                seen.add(w)
+                ranked.append((w, followers[w] / total))
+        if len(ranked) >= top_k:
+            break
+    return ranked[:top_k]
+
+
+def main():
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "ingredients_corpus.txt"
+    scoring = sys.argv[2] if len(sys.argv) > 2 else "backoff"
+    n_words = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    with open(corpus, "r", encoding="utf-8", errors="ignore") as f:
+        lines = [l.strip() for l in f if l.strip()]
+    train = [l for i, l in enumerate(lines) if i % 10]
+    held_out = [l for i, l in enumerate(lines) if not i % 10]
+
+    start = time.perf_counter()
+    model = NGramModel(corpus_lines=train, max_n=4, scoring=scoring)
+    print(f"{scoring} model on {len(train)} lines, {len(model.vocab)} words, built in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    model.prefix_index()
+    if model.smoothing is not None:
+        model.prefix_index(continuation=True)
+    print(f"prefix index built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # (text typed so far, word being typed) for every keystroke inside a sampled word
+    random.seed(0)
+    words = []
+    for line in held_out:
+        tokens = model.line_tokens(line)
+        words.extend((" ".join(tokens[:i]), w) for i, w in enumerate(tokens) if w.isalpha())
+    words = random.sample(words, min(n_words, len(words)))
+    keystrokes = [((head + " " if head else "") + word[:end], word)
+                  for head, word in words for end in range(1, len(word) + 1)]
+    print(f"{len(words)} held-out words, {len(keystrokes)} keystrokes, top 6\n")
+
+    answers = (
+        ("suggest (index)", lambda text: model.suggest(text, top_k=6)),
+        ("vocabulary scan", lambda text: scan_completions(model, text, 6)),
+        ("next word only", lambda text: model.predict_next_words(text, top_k=6)),
+    )
+    for name, answer in answers:
+        model._ranked.clear()
+        if model.smoothing is not None:
+            model.smoothing._ranked.clear()
+        found = {1: 0, 3: 0, 6: 0}
+        first = []
+        latencies = []
+        for text, word in keystrokes:
+            t = time.perf_counter()
+            suggested = [w for w, _ in answer(text)]
+            latencies.append(time.perf_counter() - t)
+            for k in found:
+                found[k] += word in suggested[:k]
+            if text.endswith(word[:1]) and len(text.rsplit(" ", 1)[-1]) == 1:
+                first.append(word in suggested[:6])
+        p50, p95 = percentiles(latencies)
+        print(f"{name:16s} p50 {p50:7.3f} ms  p95 {p95:7.3f} ms  "
+              + "  ".join(f"in top {k} {found[k] / len(keystrokes):6.1%}" for k in found)
+              + f"  after 1 letter {sum(first) / max(1, len(first)):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import math
+import random
+import sys
+import time
+from core.ngram_model import NGramModel
+
+# Held-out perplexity, next-word hit rate and per-keystroke latency of the n-gram scoring modes.
+# Every 10th line of the corpus is held out, the rest is trained on.
+# Run from the Meal&Match folder: python -m benchmarks.smoothing_bench [corpus] [order] [samples]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+    return pick(50) * 1000, pick(95) * 1000
+
+
+def clear_caches(model):
+    model._ranked.clear()
+    if model.smoothing is not None:
+        model.smoothing._ranked.clear()
+
+
+def backoff_prob(model, word, context):
+    # the probability predict_next_words reports in backoff mode: the relative frequency
+    # under the longest history that has followers, zero for anything that never followed it
+    for n in range(min(model.max_n, len(context) + 1), 0, -1):
+        history = " ".join(context[len(context) - n + 1:]) if n > 1 else ""
+        followers = model.context_counts[n].get(history)
+        if followers:
+            return followers.get(word, 0) / sum(followers.values())
+    return 0.0
+
+
+def main():
+    corpus = sys.argv[1] if len(sys.argv) > 1 else "process_corpus.txt"
+    order = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    n_samples = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    with open(corpus, "r", encoding="utf-8", errors="ignore") as f:
+        lines = [l.strip() for l in f if l.strip()]
+    train = [l for i, l in enumerate(lines) if i % 10]
+    held_out = [l for i, l in enumerate(lines) if not i % 10]
+
+    models = {}
+    for scoring in ("backoff", "kneser_ney"):
+        start = time.perf_counter()
+        models[scoring] = NGramModel(corpus_lines=train, max_n=order, scoring=scoring)
+        print(f"{scoring:10s} trained on {len(train)} lines in {time.perf_counter() - start:.2f}s")
+
+    # (context, next word) for every held-out token, the context cut to the model's history
+    events = []
+    for line in held_out:
+        tokens = models["backoff"].line_tokens(line)
+        for i, word in enumerate(tokens):
+            events.append((tokens[max(0, i - order + 1):i], word))
+    print(f"{len(held_out)} held-out lines, {len(events)} tokens, order {order}")
+
+    smoothed = models["kneser_ney"]
+    kn_logs = [math.log2(smoothed.word_prob(word, context)) for context, word in events]
+    bo_probs = [backoff_prob(models["backoff"], word, context) for context, word in events]
+    covered = [i for i, p in enumerate(bo_probs) if p > 0]
+    perplexity = lambda logs: 2 ** (-sum(logs) / max(1, len(logs)))
+    print(f"kneser_ney perplexity {perplexity(kn_logs):10.2f} on every token")
+    print(f"           perplexity {perplexity([kn_logs[i] for i in covered]):10.2f} on the {len(covered)} tokens backoff covers")
+    zeros = len(events) - len(covered)
+    print(f"backoff    perplexity {perplexity([math.log2(bo_probs[i]) for i in covered]):10.2f} on the tokens it covers"
+          + (f"; {zeros} get probability zero, so over every token it is infinite" if zeros else ""))
+
+    random.seed(0)
+    sample = random.sample(events, min(n_samples, len(events)))
+    texts = [" ".join(context) for context, _ in sample]
+    print(f"\n{len(sample)} sampled held-out positions, suggestions as the UI asks for them (top 6)")
+    for scoring, model in models.items():
+        hits = {1: 0, 3: 0, 6: 0}
+        cold, session, repeat = [], [], []
+        for text, (_, word) in zip(texts, sample):
+            # cold: nothing cached at all, as for the very first query after loading
+            clear_caches(model)
+            t = time.perf_counter()
+            preds = model.predict_next_words(text, top_k=6)
+            cold.append(time.perf_counter() - t)
+            words = [w for w, _ in preds]
+            for k in hits:
+                hits[k] += word in words[:k]
+        clear_caches(model)
+        for text in texts:
+            # session: each context asked for the first time, with earlier queries still cached
+            t = time.perf_counter()
+            model.predict_next_words(text, top_k=6)
+            session.append(time.perf_counter() - t)
+        for text in texts:
+            t = time.perf_counter()
+            model.predict_next_words(text, top_k=6)
+            repeat.append(time.perf_counter() - t)
+        print(f"{scoring:10s} " + "  ".join(f"hit@{k} {hits[k] / len(sample):6.1%}" for k in hits))
+        for name, samples in (("cold", cold), ("session", session), ("repeat", repeat)):
+            p50, p95 = percentiles(samples)
+            print(f"{'':10s} {name:8s} p50 {p50:7.3f} ms  p95 {p95:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
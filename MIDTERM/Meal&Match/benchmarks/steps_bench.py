@@ -0,0 +1,97 @@
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from core.step_store import open_step_store, write_step_store
+
+# Memory held and lookup latency for recipe steps: the whole process map loaded from JSON, as
+# the recommender used to, against the on-disk step store. The catalogue is the process map in
+# the current folder, its recipes repeated under new titles up to the requested size.
+# Run from the Meal&Match folder: python -m benchmarks.steps_bench [recipes] [lookups]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+    return pick(50) * 1e6, pick(95) * 1e6
+
+
+def held(load):
+    # bytes of Python objects still allocated once load() has returned, and how long it took
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    n_recipes = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    n_lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    with open("process_map.json", "r", encoding="utf-8") as f:
+        source = list(json.load(f).items())
+    catalogue = {}
+    for i in range(n_recipes):
+        title, steps = source[i % len(source)]
+        catalogue[f"{title} #{i // len(source)}" if i >= len(source) else title] = steps
+    titles = list(catalogue)
+    del source
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "process_map.json")
+        store_path = os.path.join(tmp, "recipe_steps.store")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(catalogue, f, indent=2, ensure_ascii=False)
+        start = time.perf_counter()
+        write_step_store(store_path, catalogue)
+        print(f"{n_recipes} recipes: process_map.json {os.path.getsize(json_path) / 1e6:.1f} MB, "
+              f"step store {os.path.getsize(store_path) / 1e6:.1f} MB written in {time.perf_counter() - start:.2f}s")
+        del catalogue
+
+        def load_json():
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        random.seed(0)
+        # dishes picked with a skew, as a user keeps coming back to a few of them
+        picks = [titles[min(int(random.expovariate(1 / 200)), len(titles) - 1)] if random.random() < 0.7
+                 else random.choice(titles) for _ in range(n_lookups)]
+
+        process_map, map_bytes, map_time = held(load_json)
+        lat_map = []
+        for title in picks:
+            start = time.perf_counter()
+            process_map.get(title)
+            lat_map.append(time.perf_counter() - start)
+        expected = [process_map.get(title) for title in picks[:2000]]
+        del process_map
+
+        store, store_bytes, store_time = held(lambda: open_step_store(store_path))
+        lat_store = []
+        for title in picks:
+            start = time.perf_counter()
+            store.get(title)
+            lat_store.append(time.perf_counter() - start)
+        if [store.get(title) for title in picks[:2000]] != expected:
+            raise SystemExit("step store does not match the process map")
+        cached = len(store._cache)
+        store.close()
+
+    print(f"{'':18s} {'held':>10s} {'load':>9s} {'get p50':>10s} {'get p95':>10s}")
+    for name, size, elapsed, lat in (("process_map.json", map_bytes, map_time, lat_map),
+                                     ("step store", store_bytes, store_time, lat_store)):
+        p50, p95 = percentiles(lat)
+        print(f"{name:18s} {size / 1e6:7.1f} MB {elapsed * 1000:6.0f} ms {p50:7.2f} us {p95:7.2f} us")
+    print(f"{n_lookups} lookups, {cached} dishes in the store's LRU at the end")
+
+
+if __name__ == "__main__":
+    main()
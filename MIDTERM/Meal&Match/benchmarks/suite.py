@@ -0,0 +1,287 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from core.corpora_builder import CorporaBuilder
+from core.ngram_model import NGramModel
+from core.recommender import CookingRecommender
+from core.tokenizer import simple_tokenize
+
+# End-to-end benchmark on synthetic recipe CSVs of several sizes: corpus build, tokenizing,
+# n-gram training, snapshot compile, cold load in a fresh interpreter, and the latency
+# distribution of every query the UI makes. Results are written as JSON so two commits can be
+# compared; the CSVs are generated from a fixed seed, so a size always gives the same data.
+# Run from the Meal&Match folder:
+#   python -m benchmarks.suite [sizes] [results.json] [queries]    e.g. 10k,100k,1m
+#   python -m benchmarks.suite compare old.json new.json
+# Nothing in the current folder is read or written apart from the results file.
+
+RESULTS_VERSION = 1
+SEED = 13
+
+STAPLES = ["salt", "pepper", "water", "olive oil", "butter", "garlic", "onion", "sugar", "flour", "egg",
+           "milk", "heavy cream", "lemon juice", "black pepper", "kosher salt", "vegetable oil"]
+FOODS = ["chicken breast", "chicken thighs", "ground beef", "pork shoulder", "salmon fillet", "shrimp", "tofu",
+         "rice", "pasta", "potatoes", "carrots", "celery", "tomatoes", "cherry tomatoes", "spinach", "kale",
+         "mushrooms", "zucchini", "bell pepper", "jalapeño", "ginger", "soy sauce", "fish sauce", "honey",
+         "maple syrup", "dijon mustard", "red wine vinegar", "parmesan", "cheddar", "feta", "yogurt",
+         "sour cream", "thyme", "rosemary", "basil", "cilantro", "parsley", "cumin", "paprika", "chili flakes",
+         "cinnamon", "nutmeg", "vanilla extract", "baking powder", "baking soda", "brown sugar", "oats",
+         "almonds", "walnuts", "coconut milk", "chickpeas", "black beans", "lentils", "scallions", "shallots",
+         "lime", "orange zest", "white wine", "chicken stock", "bread crumbs", "mozzarella", "bacon"]
+UNITS = ["cup", "cups", "tablespoon", "tablespoons", "teaspoon", "teaspoons", "lb.", "oz.", "pinch", "cloves",
+         "large", "medium", "small", "can", "sprigs", ""]
+QUANTITIES = ["1", "2", "3", "4", "½", "¼", "¾", "1½", "2½", "1/2", "1/4", "3/4", "1 1/2", "6", "8", "12"]
+PREP = ["", "", "", ", chopped", ", finely chopped", ", minced", ", thinly sliced", ", divided", ", at room temperature",
+        ", peeled and diced", " (about 2 cups)", ", plus more for serving", ", drained and rinsed"]
+VERBS = ["Preheat", "Mix", "Stir", "Whisk", "Add", "Combine", "Season", "Bake", "Roast", "Simmer", "Boil",
+         "Cook", "Heat", "Transfer", "Serve", "Fold", "Toss", "Drizzle", "Sprinkle", "Let"]
+FILLERS = ["until golden brown", "for 10 to 15 minutes", "over medium-high heat", "in a large bowl",
+           "until the sauce thickens", "with salt and pepper", "until tender", "in the oven at 400°F",
+           "and set aside", "until well combined", "in a skillet", "for 2 minutes more", "until fragrant"]
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def write_synthetic_csv(path, rows, seed=SEED):
+    # Rows look like the scraped recipe CSV: Python-literal ingredient lists, unicode fractions,
+    # prep notes, multi-sentence instructions, and the odd empty or repeated title. Foods follow
+    # a skewed distribution so a few are everywhere and most are rare, as in real recipes.
+    rng = random.Random(seed)
+    foods = FOODS + [f"{a} {b}" for a in ("smoked", "fresh", "dried", "toasted", "pickled") for b in FOODS]
+    weights = [1 / (rank + 1) for rank in range(len(foods))]
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["", "Title", "Ingredients", "Instructions", "Image_Name", "Cleaned_Ingredients"])
+        for i in range(rows):
+            names = rng.sample(STAPLES, rng.randint(1, 4)) + rng.choices(foods, weights, k=rng.randint(2, 10))
+            ingredients = [f"{rng.choice(QUANTITIES)} {rng.choice(UNITS)} {name}{rng.choice(PREP)}".replace("  ", " ")
+                           for name in names]
+            steps = [f"{rng.choice(VERBS)} the {rng.choice(names)} {rng.choice(FILLERS)}."
+                     for _ in range(rng.randint(2, 9))]
+            r = rng.random()
+            title = "" if r < 0.005 else f"Synthetic Dish {i // 2 if r < 0.02 else i}"
+            writer.writerow([i, title, repr(ingredients), "\n".join(steps), f"synthetic-{i}", repr(ingredients)])
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+    return {
+        "n": len(ordered),
+        "mean_us": round(sum(ordered) / len(ordered) * 1e6, 2),
+        "p50_us": round(pick(50) * 1e6, 2),
+        "p95_us": round(pick(95) * 1e6, 2),
+        "p99_us": round(pick(99) * 1e6, 2),
+        "max_us": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    # (result, seconds), with the builder's progress messages kept out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        return result, time.perf_counter() - start
+
+
+def query_latencies(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+COLD_LOAD = """
+import json, sys, time
+start = time.perf_counter()
+from core.recommender import CookingRecommender
+imported = time.perf_counter()
+CookingRecommender(**json.loads(sys.argv[1]))
+loaded = time.perf_counter()
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10)
+except ImportError:
+    rss = None
+print(json.dumps({"import_s": imported - start, "load_s": loaded - imported, "peak_rss_mb": rss}))
+"""
+
+
+def cold_load(paths):
+    # a fresh interpreter, so nothing this process has imported or cached helps
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    out = subprocess.run([sys.executable, "-c", COLD_LOAD, json.dumps(paths)], capture_output=True, text=True,
+                         env=env, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def workload(recommender, ingredient_lines, n, rng):
+    # typing prefixes of real corpus lines, and pantries drawn from real recipes plus noise
+    typed = []
+    for _ in range(n):
+        tokens = rng.choice(ingredient_lines).split()
+        typed.append(" ".join(tokens[:rng.randint(1, len(tokens))]))
+    partial = [t[:len(t) - rng.randint(0, 2)] for t in typed]
+    titles = recommender.recipe_titles
+    vocab = sorted(recommender.postings)
+    pantries = []
+    for _ in range(n):
+        ings = list(dict.fromkeys(recommender.ingredients_map[rng.choice(titles)]))
+        pantries.append(" ".join(rng.sample(ings, min(len(ings), rng.randint(2, 8))) + rng.sample(vocab, 2)))
+    dishes = [rng.choice(titles) for _ in range(n)]
+    return typed, partial, pantries, dishes
+
+
+def run_size(rows, n_queries, workdir):
+    paths = {name: os.path.join(workdir, name) for name in (
+        "recipes.csv", "ingredients_corpus.txt", "process_corpus.txt", "ingredients_map.json", "process_map.json",
+        "corpora_rows.jsonl", "ingredient_phrases.jsonl", "meal_match.snapshot", "recipe_steps.store")}
+    result = {"rows": rows}
+
+    _, result["generate_s"] = timed(write_synthetic_csv, paths["recipes.csv"], rows)
+    result["csv_mb"] = round(os.path.getsize(paths["recipes.csv"]) / 1e6, 2)
+
+    builder = CorporaBuilder(csv_path=paths["recipes.csv"])
+    _, result["build_corpora_s"] = timed(
+        builder.build_corpora, out_ing=paths["ingredients_corpus.txt"], out_proc=paths["process_corpus.txt"],
+        out_ing_map=paths["ingredients_map.json"], out_proc_map=paths["process_map.json"],
+        out_state=paths["corpora_rows.jsonl"], out_phrases=paths["ingredient_phrases.jsonl"])
+
+    with open(paths["ingredients_corpus.txt"], "r", encoding="utf-8") as f:
+        ingredient_lines = [l.split(":", 1)[1].strip() for l in f if ":" in l and l.split(":", 1)[1].strip()]
+    with open(paths["process_corpus.txt"], "r", encoding="utf-8") as f:
+        process_lines = [l.strip() for l in f if l.strip()]
+    with open(paths["ingredient_phrases.jsonl"], "r", encoding="utf-8") as f:
+        next(f)
+        phrases = [p for line in f for p in json.loads(line)[1]]
+    _, seconds = timed(lambda: [simple_tokenize(p) for p in phrases])
+    result["tokenize"] = {"phrases": len(phrases), "s": seconds, "phrases_per_s": round(len(phrases) / seconds)}
+
+    _, result["train_ingredients_s"] = timed(NGramModel(max_n=4).train, ingredient_lines)
+    _, result["train_process_s"] = timed(NGramModel(max_n=3).train, process_lines)
+    del process_lines
+
+    _, result["build_snapshot_s"] = timed(
+        builder.build_snapshot, out_snapshot=paths["meal_match.snapshot"],
+        ingredients_file=paths["ingredients_corpus.txt"], process_file=paths["process_corpus.txt"],
+        ing_map=paths["ingredients_map.json"], proc_map=paths["process_map.json"],
+        phrases_file=paths["ingredient_phrases.jsonl"], steps_file=paths["recipe_steps.store"])
+    result["snapshot_mb"] = round(os.path.getsize(paths["meal_match.snapshot"]) / 1e6, 2)
+
+    recommender_paths = {
+        "ingredients_file": paths["ingredients_corpus.txt"], "process_file": paths["process_corpus.txt"],
+        "ing_map": paths["ingredients_map.json"], "proc_map": paths["process_map.json"],
+        "csv_path": paths["recipes.csv"], "snapshot_path": paths["meal_match.snapshot"],
+        "phrases_file": paths["ingredient_phrases.jsonl"], "steps_file": paths["recipe_steps.store"],
+    }
+    result["cold_load"] = cold_load(recommender_paths)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender = CookingRecommender(**recommender_paths)
+    typed, partial, pantries, dishes = workload(recommender, ingredient_lines, n_queries, random.Random(SEED))
+    del ingredient_lines
+    model = recommender.ingredient_model
+    result["queries"] = {
+        "predict_next_words": query_latencies(lambda t: model.predict_next_words(t, top_k=5), typed),
+        "get_suggestions": query_latencies(lambda t: recommender.get_suggestions(t, top_k=5), partial),
+        "find_missing_ingredients": query_latencies(recommender.find_missing_ingredients, pantries),
+        "get_alternative_dishes": query_latencies(lambda t: recommender.get_alternative_dishes(t, top_k=3), pantries),
+        "get_recipe_steps": query_latencies(recommender.get_recipe_steps, dishes),
+    }
+    recommender.close()
+    return result
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result):
+    load = result["cold_load"]
+    print(f"{result['rows']} rows ({result['csv_mb']} MB csv): build {result['build_corpora_s']:.2f}s, "
+          f"tokenize {result['tokenize']['phrases_per_s']}/s, train {result['train_ingredients_s']:.2f}s "
+          f"+ {result['train_process_s']:.2f}s, snapshot {result['build_snapshot_s']:.2f}s "
+          f"({result['snapshot_mb']} MB), cold load {load['load_s']:.2f}s "
+          f"(+{load['import_s']:.2f}s imports, peak rss {load['peak_rss_mb'] or 0:.0f} MB)")
+    print(f"  {'query':26s} {'mean us':>10s} {'p50 us':>10s} {'p95 us':>10s} {'p99 us':>10s}")
+    for name, q in result["queries"].items():
+        print(f"  {name:26s} " + " ".join(f"{q[k]:10.1f}" for k in ("mean_us", "p50_us", "p95_us", "p99_us")))
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(old_path, new_path):
+    # new/old for every timing both runs measured, per size; above 1 is slower
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{old.get('commit')} -> {new.get('commit')} (new / old, above 1.00 is slower)")
+    old_by_rows = {r["rows"]: dict(flatten(r)) for r in old["results"]}
+    for result in new["results"]:
+        before = old_by_rows.get(result["rows"])
+        if before is None:
+            continue
+        print(f"{result['rows']} rows")
+        for key, value in flatten(result):
+            timing = (key.endswith("_s") and not key.endswith("per_s")) or key.endswith("_us")
+            if timing and before.get(key) and not key.endswith("generate_s"):
+                print(f"  {key:40s} {before[key]:12.4f} {value:12.4f} {value / before[key]:6.2f}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "compare":
+        compare(sys.argv[2], sys.argv[3])
+        return
+    sizes = [parse_size(s) for s in (sys.argv[1] if len(sys.argv) > 1 else "10k,100k,1m").split(",")]
+    out_path = sys.argv[2] if len(sys.argv) > 2 else "benchmark_results.json"
+    n_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+    report = {
+        "version": RESULTS_VERSION,
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "queries": n_queries,
+        "results": [],
+    }
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            report["results"].append(run_size(rows, n_queries, workdir))
+        print_result(report["results"][-1])
+        # written after every size, so a long run still leaves the finished sizes behind
+        with open(out_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(f"Results written to {out_path}")
+
+
+if __name__ == "__main__":
+    main()
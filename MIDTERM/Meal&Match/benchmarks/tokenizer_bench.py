@@ -0,0 +1,78 @@
+import csv
+import re
+import sys
+import time
+from core.corpora_builder import CorporaBuilder
+from core.tokenizer import simple_tokenize, tokenize_many
+
+# Run from the Meal&Match folder: python -m benchmarks.tokenizer_bench [recipes.csv] [repeats]
+
+
+def legacy_simple_tokenize(s):
+    # simple_tokenize as it was before core.tokenizer, kept as the reference output
+    if s is None:
+        return []
+    s = s.lower()
+    fraction_pattern = r"(\d+\/\d+)"
+    fractions = re.findall(fraction_pattern, s)
+    for i, frac in enumerate(fractions):
+        s = s.replace(frac, f"__FRACTION_{i}__")
+
+    s = re.sub(r"[^a-z0-9\-]+", " ", s)
+    s = s.replace("-", " ")
+
+    for i, frac in enumerate(fractions):
+        s = s.replace(f"__FRACTION_{i}__", frac)
+    return [tok for tok in s.split() if tok]
+
+
+def corpus_texts(csv_path):
+    # every string the corpus build tokenizes: ingredient parts and instruction sentences
+    builder = CorporaBuilder(csv_path=csv_path)
+    texts = []
+    with open(csv_path, newline="", encoding="utf-8", errors="ignore") as fh:
+        reader = csv.DictReader(fh)
+        _, ing_key, inst_key = builder.detect_columns(reader.fieldnames)
+        for row in reader:
+            texts.extend(builder.ingredient_parts(row.get(ing_key, "")))
+            texts.extend(builder.instruction_sentences(row.get(inst_key, "")))
+    return texts
+
+
+def best_of(repeats, fn, texts):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(texts)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "13k-recipes.csv"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    texts = corpus_texts(csv_path)
+    chars = sum(len(t) for t in texts)
+    print(f"{len(texts)} strings, {chars} characters from {csv_path}")
+
+    expected = [legacy_simple_tokenize(t) for t in texts]
+    if [simple_tokenize(t) for t in texts] != expected or tokenize_many(texts) != expected:
+        raise SystemExit("tokenizer output differs from the legacy implementation")
+    print("Output identical to the legacy tokenizer.")
+
+    runs = [
+        ("legacy simple_tokenize", lambda ts: [legacy_simple_tokenize(t) for t in ts]),
+        ("simple_tokenize", lambda ts: [simple_tokenize(t) for t in ts]),
+        ("tokenize_many", tokenize_many),
+    ]
+    baseline = None
+    for name, fn in runs:
+        elapsed = best_of(repeats, fn, texts)
+        baseline = baseline or elapsed
+        print(f"{name:24s} {elapsed:7.3f}s  {len(texts) / elapsed / 1e6:5.2f}M strings/s  {baseline / elapsed:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
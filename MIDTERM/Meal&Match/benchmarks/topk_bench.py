@@ -0,0 +1,69 @@
+import random
+import sys
+import time
+from core.recommender import CookingRecommender
+from core.tokenizer import simple_tokenize
+
+# Times get_alternative_dishes on queries made of common tokens ("salt", "water", ...) and of
+# rare ones, against the full-sort implementation it replaced.
+# Run from the Meal&Match folder: python -m benchmarks.topk_bench [queries] [top_k]
+
+
+def full_sort_alternatives(recommender, user_text, top_k=3):
+    # get_alternative_dishes before the heap: score every candidate, sort them all
+    user_tokens = [t for t in simple_tokenize(user_text)]
+    if not user_tokens:
+        return []
+    user_set = set(user_tokens)
+    scores = []
+    counts = recommender.match_counts(user_set)
+    for recipe_id in sorted(counts):
+        score = counts[recipe_id] / recommender.recipe_sizes[recipe_id]
+        scores.append((recommender.recipe_titles[recipe_id], int(round(score * 100))))
+    scores.sort(key=lambda x: x[1], reverse=True)
+    return scores[:top_k]
+
+
+def query_sets(recommender, n):
+    random.seed(0)
+    by_df = sorted(recommender.postings, key=lambda tok: len(recommender.postings[tok]), reverse=True)
+    common = by_df[:20]
+    rare = by_df[-max(20, len(by_df) // 10):]
+    titles = recommender.recipe_titles
+    pantry = []
+    for _ in range(n):
+        ings = list(dict.fromkeys(recommender.ingredients_map[random.choice(titles)]))
+        pantry.append(" ".join(random.sample(ings, min(len(ings), random.randint(2, 8)))))
+    return [
+        ("common, 1 token", [random.choice(common) for _ in range(n)]),
+        ("common, 3 tokens", [" ".join(random.sample(common, 3)) for _ in range(n)]),
+        ("rare, 1 token", [random.choice(rare) for _ in range(n)]),
+        ("rare, 3 tokens", [" ".join(random.sample(rare, 3)) for _ in range(n)]),
+        ("pantry, 2-8 tokens", pantry),
+    ]
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    n_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    recommender = CookingRecommender()
+    print(f"{len(recommender.recipe_titles)} recipes, {n_queries} queries per set, top {top_k}")
+    print(f"{'query set':20s} {'full sort':>12s} {'heap':>12s}")
+    for name, queries in query_sets(recommender, n_queries):
+        expected, before = timed(lambda q: full_sort_alternatives(recommender, q, top_k), queries)
+        results, after = timed(lambda q: recommender.get_alternative_dishes(q, top_k=top_k), queries)
+        if results != expected:
+            raise SystemExit(f"{name}: results differ from the full sort")
+        print(f"{name:20s} {before:9.3f} ms {after:9.3f} ms  {before / after:5.1f}x")
+    print("Results identical to the full sort.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import random
+import sys
+import threading
+import time
+from core.recommender import CookingRecommender
+from ui.query_worker import LatencyStats, QueryWorker
+
+# Replays typing against the recommender the way CookingUI sees it, without a display.
+# Run from the Meal&Match folder (uses its corpora/snapshot):
+#   python -m benchmarks.typing_bench [queries] [ms per key]
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda p: ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+    return pick(50) * 1000, pick(95) * 1000
+
+
+def main():
+    n_queries = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    key_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 80
+
+    start = time.perf_counter()
+    recommender = CookingRecommender()
+    print(f"{len(recommender.recipe_titles)} recipes loaded in {time.perf_counter() - start:.2f}s")
+
+    random.seed(0)
+    titles = random.sample(recommender.recipe_titles, min(n_queries, len(recommender.recipe_titles)))
+    texts = [" ".join(recommender.ingredients_map[t][:8]) for t in titles]
+    keystrokes = [text[:i] for text in texts for i in range(1, len(text) + 1)]
+
+    def run_query(text):
+        return recommender.get_suggestions(text, top_k=6), recommender.find_missing_ingredients(text)
+
+    # before: both calls ran on the Tk thread for every key release
+    blocking = []
+    for text in keystrokes:
+        t = time.perf_counter()
+        run_query(text)
+        blocking.append(time.perf_counter() - t)
+
+    # after: every key release only submits to the worker (no debounce, the worst case)
+    stats = LatencyStats(window=len(keystrokes))
+    done = threading.Event()
+    last = {}
+    worker = QueryWorker([
+        ("suggestions", lambda text: recommender.get_suggestions(text, top_k=6)),
+        ("match", recommender.find_missing_ingredients),
+    ], lambda generation, text, results, elapsed: (last.update(text=text), done.set()), stats=stats)
+    submit = []
+    for text in keystrokes:
+        t = time.perf_counter()
+        worker.submit(text)
+        submit.append(time.perf_counter() - t)
+        time.sleep(key_ms / 1000)
+    while last.get("text") != keystrokes[-1]:
+        done.wait(1.0)
+        done.clear()
+    worker.close()
+
+    print(f"{len(keystrokes)} keystrokes at {key_ms:g} ms/key over {len(texts)} ingredient lists")
+    print("Tk thread blocked per key, synchronous:  p50 %.2f ms  p95 %.2f ms" % percentiles(blocking))
+    print("Tk thread blocked per key, worker:       p50 %.3f ms  p95 %.3f ms" % percentiles(submit))
+    print(f"worker queries run: {stats.count}, superseded by newer text: {worker.dropped}")
+    print(stats.summary())
+
+
+if __name__ == "__main__":
+    main()
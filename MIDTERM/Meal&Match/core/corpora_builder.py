@@ -6,29 +6,176 @@ import os
 import csv
 import json
 import re
+import ast
+import tempfile
+import multiprocessing
+import hashlib
+from collections import deque
+from core.snapshot import source_fingerprint, source_matches
+from core.step_store import write_step_store
+from core.tokenizer import simple_tokenize, tokenize_many, phrase_token_sets
 
-def simple_tokenize(s):
-    if s is None:
-        return []
-    s = s.lower()
-    fraction_pattern = r"(\d+\/\d+)"
-    fractions = re.findall(fraction_pattern, s)
-    for i, frac in enumerate(fractions):
-        s = s.replace(frac, f"__FRACTION_{i}__")
+# What universal-newline reading splits a corpus line on. Tokens never contain one, but a
+# title can, so one "title: tokens" line may span several physical lines of the corpus file.
+LINE_BREAK = re.compile(r"\r\n|\r|\n")
 
-    s = re.sub(r"[^a-z0-9\-]+", " ", s)
-    s = s.replace("-", " ")
+# corpora_rows.jsonl: a JSON header line (CSV fingerprint, columns), then one line per CSV
+# row in corpus order: [content hash, title, ingredient corpus lines, process corpus lines]
+ROW_STATE_VERSION = 2
+SENTENCE_END = re.compile(r"[.!?;]+")
 
-    for i, frac in enumerate(fractions):
-        s = s.replace(f"__FRACTION_{i}__", frac)
-    return [tok for tok in s.split() if tok]
+# ingredient_phrases.jsonl: a JSON header line (CSV fingerprint), then [title, phrases] for
+# every CSV row with a title and an ingredient field, in CSV order. Read back into a dict, a
+# repeated title keeps its first position and takes its last phrases, as when reading the CSV.
+PHRASES_VERSION = 1
+
+def tokenize_rows(rows):
+    # pool entry point: [(raw ingredients, raw instructions), ...] -> CorporaBuilder.tokenize_row results
+    builder = CorporaBuilder()
+    return [builder.tokenize_row(raw_ing, raw_inst) for raw_ing, raw_inst in rows]
+
+
+def ingredient_phrases(raw_ing):
+    # the stripped, non-empty phrases of an ingredient field; a field that is not a list of
+    # strings is kept whole as a single phrase
+    if raw_ing[:1] == "[" and raw_ing[-1:] == "]" and '"' not in raw_ing and "\\" not in raw_ing:
+        # the dataset writes ['1 cup flour', ...]: with no double quotes or escapes around,
+        # swapping the quotes makes that JSON, which decodes several times faster
+        try:
+            phrases = json.loads(raw_ing.replace("'", '"'))
+        except ValueError:
+            phrases = None
+        if isinstance(phrases, list) and all(isinstance(p, str) for p in phrases):
+            return [p for p in map(str.strip, phrases) if p]
+    try:
+        phrases = ast.literal_eval(raw_ing)
+    except Exception:
+        return [raw_ing.strip()]
+    if isinstance(phrases, list) and all(isinstance(p, str) for p in phrases):
+        return [p.strip() for p in phrases if p.strip()]
+    return [raw_ing.strip()]
+
+
+def load_phrases(path):
+    # -> (header, [[title, phrases], ...]), (None, None) if unusable
+    if not path or not os.path.exists(path):
+        return None, None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != PHRASES_VERSION:
+                return None, None
+            # decoded as one array, like the row state
+            body = f.read().rstrip("\n")
+            return header, json.loads("[" + body.replace("\n", ",") + "]")
+    except (ValueError, AttributeError):
+        return None, None
+
+
+def row_hash(*fields):
+    h = hashlib.blake2b(digest_size=16)
+    h.update("\x1f".join(f or "" for f in fields).encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def row_title(raw_title, h):
+    # an untitled row is named after its content hash, not its position, so it keeps its name
+    # whatever is added or removed above it
+    return raw_title.strip() or "untitled-" + h[:12]
+
+
+def load_row_state(path, rows=True):
+    # -> (header, [[row hash, title, ingredient lines, process lines], ...]), (None, None) if unusable
+    if not path or not os.path.exists(path):
+        return None, None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != ROW_STATE_VERSION:
+                return None, None
+            if not rows:
+                return header, None
+            # one array for the whole file decodes much faster than a loads() per line; json
+            # escapes line breaks inside strings, so "\n" only ever separates rows
+            body = f.read().rstrip("\n")
+            return header, json.loads("[" + body.replace("\n", ",") + "]")
+    except (ValueError, AttributeError):
+        return None, None
+
+
+class JsonMapSpool:
+    # Writes a {title: list} map in exactly the layout json.dump(indent=2) gives the equivalent
+    # dict, without holding the values in memory. Entries are spooled to a temp file already
+    # formatted, in first-seen order; a repeated title keeps its first position but takes its
+    # last value, so only those entries are rendered again at the end.
+    SEPARATOR = "\x1e"  # json.dumps escapes control characters, so this never occurs in an entry
+
+    def __init__(self, path):
+        self.path = path
+        self.spool = tempfile.TemporaryFile("w+", encoding="utf-8", newline="")
+        self.index = {}
+        self.overrides = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    @staticmethod
+    def render(title, value):
+        # one "title": [...] member as json.dump(indent=2) lays out a list of strings
+        quote = json.encoder.encode_basestring  # what json.dump(ensure_ascii=False) uses for str
+        key = quote(title)
+        if not value:
+            return f"  {key}: []"
+        items = ",\n".join("    " + quote(v) for v in value)
+        return f"  {key}: [\n{items}\n  ]"
+
+    def add(self, title, value):
+        if title in self.index:
+            self.overrides[self.index[title]] = (title, value)
+            return
+        self.index[title] = len(self.index)
+        self.spool.write(self.render(title, value) + self.SEPARATOR)
+
+    def entries(self, block_size=1 << 20):
+        self.spool.seek(0)
+        tail = ""
+        while True:
+            block = self.spool.read(block_size)
+            if not block:
+                break
+            parts = (tail + block).split(self.SEPARATOR)
+            tail = parts.pop()
+            yield from parts
+
+    @staticmethod
+    def dump(mapping, path):
+        # json.dump(mapping, indent=2, ensure_ascii=False), byte for byte, without its pure-Python
+        # indenting encoder
+        with open(path, "w", encoding="utf-8") as f:
+            if not mapping:
+                f.write("{}")
+            else:
+                f.write("{\n" + ",\n".join(JsonMapSpool.render(k, v) for k, v in mapping.items()) + "\n}")
+
+    def write(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            if not self.index:
+                f.write("{}")
+            else:
+                f.write("{\n")
+                for i, entry in enumerate(self.entries()):
+                    if i in self.overrides:
+                        entry = self.render(*self.overrides[i])
+                    f.write((",\n" if i else "") + entry)
+                f.write("\n}")
+        self.spool.close()
 
 
 class CorporaBuilder:
     def __init__(self, csv_path="13k-recipes.csv"):
         self.csv_path = csv_path
 
-    def parse_ingredient_field(self, ing_field):
+    def ingredient_parts(self, ing_field):
         if not ing_field:
             return []
         text = ing_field.strip()
@@ -39,84 +186,118 @@ class CorporaBuilder:
         text = text.replace('"', " ").replace("'", " ")
 
         parts = [p.strip() for p in text.split(",") if p.strip()]
+        return parts or [text]
+
+    def parse_ingredient_field(self, ing_field):
         tokens = []
-        if parts:
-            for p in parts:
-                tokens.extend(simple_tokenize(p))
-        else:
-            tokens = simple_tokenize(text)
+        for toks in tokenize_many(self.ingredient_parts(ing_field)):
+            tokens.extend(toks)
         return tokens
 
+    def instruction_sentences(self, raw_inst):
+        if not raw_inst:
+            return []
+        text = raw_inst.replace("\r", " ").replace("\n", " ").strip()
+        return [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
+
+    def detect_columns(self, fieldnames):
+        fieldnames = fieldnames or []
+        lowered = [c.lower() for c in fieldnames]
+
+        title_key = None
+        ing_key = None
+        inst_key = None
+        for k in fieldnames:
+            lk = k.lower()
+            if lk in ("title", "name", "recipe"):
+                title_key = k
+            if "ingredient" in lk:
+                ing_key = k
+            if "instruction" in lk or "direction" in lk or "step" in lk:
+                inst_key = k
+
+        if title_key is None and "title" in lowered:
+            title_key = "title"
+        if ing_key is None:
+
+            for k in fieldnames:
+                if k.lower() == "ingredients":
+                    ing_key = k
+        if inst_key is None:
+            for k in fieldnames:
+                if k.lower() == "instructions":
+                    inst_key = k
+        if ing_key is None or inst_key is None:
+            raise RuntimeError("CSV missing expected columns. Look for columns named like 'ingredients' and 'instructions'.")
+        return title_key, ing_key, inst_key
+
+    def tokenize_row(self, raw_ing, raw_inst):
+        # -> (ingredient tokens, [(instruction sentence, its tokens), ...])
+        ing_tokens = self.parse_ingredient_field(raw_ing)
+
+        sentences = self.instruction_sentences(raw_inst)
+        steps = [(s, toks) for s, toks in zip(sentences, tokenize_many(sentences)) if toks]
+        return ing_tokens, steps
+
+    def row_state(self, h, title, ing_tokens, steps):
+        # a row's entry in the row state file, see ROW_STATE_VERSION
+        pieces = len(LINE_BREAK.split(title))
+        return [h, title, pieces if ing_tokens else 0, pieces * len(steps)]
+
+    def write_jsonl(self, path, header, rows):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+
     def build_corpora(self,
                       out_ing="ingredients_corpus.txt",
                       out_proc="process_corpus.txt",
                       out_ing_map="ingredients_map.json",
-                      out_proc_map="process_map.json"):
+                      out_proc_map="process_map.json",
+                      out_state="corpora_rows.jsonl",
+                      out_phrases="ingredient_phrases.jsonl",
+                      streaming=False,
+                      workers=1,
+                      chunk_size=2000):
 
         if not os.path.exists(self.csv_path):
             raise FileNotFoundError(f"CSV not found: {self.csv_path}")
+        if streaming:
+            return self.build_corpora_streaming(out_ing, out_proc, out_ing_map, out_proc_map, out_state=out_state,
+                                                out_phrases=out_phrases, workers=workers, chunk_size=chunk_size)
 
         ingredients_lines = []
         process_lines = []
         ingredients_map = {}
         process_map = {}
+        rows_state = []
+        phrase_rows = []
+        fingerprint = source_fingerprint(self.csv_path)
 
         with open(self.csv_path, newline="", encoding="utf-8", errors="ignore") as fh:
             reader = csv.DictReader(fh)
-
-            fieldnames = [c.lower() for c in reader.fieldnames] if reader.fieldnames else []
-
-            title_key = None
-            ing_key = None
-            inst_key = None
-            for k in reader.fieldnames:
-                lk = k.lower()
-                if lk in ("title", "name", "recipe"):
-                    title_key = k
-                if "ingredient" in lk:
-                    ing_key = k
-                if "instruction" in lk or "direction" in lk or "step" in lk:
-                    inst_key = k
-
-            if title_key is None and "title" in fieldnames:
-                title_key = "title"
-            if ing_key is None:
-
-                for k in reader.fieldnames:
-                    if k.lower() == "ingredients":
-                        ing_key = k
-            if inst_key is None:
-                for k in reader.fieldnames:
-                    if k.lower() == "instructions":
-                        inst_key = k
-            if ing_key is None or inst_key is None:
-                raise RuntimeError("CSV missing expected columns. Look for columns named like 'ingredients' and 'instructions'.")
+            title_key, ing_key, inst_key = self.detect_columns(reader.fieldnames)
 
             for row in reader:
-                title = row.get(title_key, "").strip() or ("untitled-" + str(len(ingredients_map)+1))
-                raw_ing = row.get(ing_key, "")
-                raw_inst = row.get(inst_key, "")
-
+                raw_fields = (row.get(title_key, ""), row.get(ing_key, ""), row.get(inst_key, ""))
+                h = row_hash(*raw_fields)
+                title = row_title(raw_fields[0], h)
+                ing_tokens, steps = self.tokenize_row(raw_fields[1], raw_fields[2])
+                rows_state.append(self.row_state(h, title, ing_tokens, steps))
+                if out_phrases and raw_fields[0].strip() and raw_fields[1]:
+                    phrase_rows.append([raw_fields[0].strip(), ingredient_phrases(raw_fields[1])])
 
-                ing_tokens = self.parse_ingredient_field(raw_ing)
                 if ing_tokens:
                     ingredients_lines.append(f"{title}: {' '.join(ing_tokens)}")
                     ingredients_map[title] = ing_tokens
 
-
-                if raw_inst:
-
-                    text = raw_inst.replace("\r", " ").replace("\n", " ").strip()
-
-                    sentences = [s.strip() for s in re.split(r"[.!?;]+", text) if s.strip()]
-                    steps_for_title = []
-                    for s in sentences:
-                        toks = simple_tokenize(s)
-                        if toks:
-                            process_lines.append(f"{title}: {' '.join(toks)}")
-                            steps_for_title.append(s.strip())
-                    if steps_for_title:
-                        process_map[title] = steps_for_title
+                for _, toks in steps:
+                    process_lines.append(f"{title}: {' '.join(toks)}")
+                if steps:
+                    process_map[title] = [sentence for sentence, _ in steps]
 
 
         with open(out_ing, "w", encoding="utf-8") as f:
@@ -127,6 +308,467 @@ class CorporaBuilder:
             json.dump(ingredients_map, f, indent=2, ensure_ascii=False)
         with open(out_proc_map, "w", encoding="utf-8") as f:
             json.dump(process_map, f, indent=2, ensure_ascii=False)
+        if out_state:
+            header = dict(fingerprint, version=ROW_STATE_VERSION, columns=[title_key, ing_key, inst_key])
+            self.write_jsonl(out_state, header, rows_state)
+        if out_phrases:
+            self.write_jsonl(out_phrases, dict(fingerprint, version=PHRASES_VERSION), phrase_rows)
 
         print(f"Built corpora: {out_ing} ({len(ingredients_lines)} lines), {out_proc} ({len(process_lines)} lines)")
         print(f"Saved mapping JSON: {out_ing_map}, {out_proc_map}")
+
+    def iter_tokenized_chunks(self, reader, columns, pool=None, chunk_size=2000, max_in_flight=2):
+        # Yields ([(raw title, (raw ingredients, raw instructions)), ...], tokenize_row results)
+        # chunk by chunk, in CSV order. With a pool at
+        # most max_in_flight chunks are queued, so memory stays bounded by the chunk size.
+        title_key, ing_key, inst_key = columns
+
+        def raw_chunks():
+            chunk = []
+            for row in reader:
+                chunk.append((row.get(title_key, ""), (row.get(ing_key, ""), row.get(inst_key, ""))))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        in_flight = deque()
+        for chunk in raw_chunks():
+            rows = [fields for _, fields in chunk]
+            if pool is None:
+                yield chunk, tokenize_rows(rows)
+                continue
+            in_flight.append((chunk, pool.apply_async(tokenize_rows, (rows,))))
+            if len(in_flight) >= max_in_flight:
+                chunk, result = in_flight.popleft()
+                yield chunk, result.get()
+        while in_flight:
+            chunk, result = in_flight.popleft()
+            yield chunk, result.get()
+
+    def build_corpora_streaming(self,
+                                out_ing="ingredients_corpus.txt",
+                                out_proc="process_corpus.txt",
+                                out_ing_map="ingredients_map.json",
+                                out_proc_map="process_map.json",
+                                out_state="corpora_rows.jsonl",
+                                out_phrases="ingredient_phrases.jsonl",
+                                workers=1,
+                                chunk_size=2000):
+        # Same output as build_corpora, byte for byte, but rows are tokenized chunk by chunk
+        # (optionally in a process pool) and every line is written out as soon as it is ready.
+        if not os.path.exists(self.csv_path):
+            raise FileNotFoundError(f"CSV not found: {self.csv_path}")
+
+        ingredients_map = JsonMapSpool(out_ing_map)
+        process_map = JsonMapSpool(out_proc_map)
+        ing_count = 0
+        proc_count = 0
+        fingerprint = source_fingerprint(self.csv_path)
+        state_path = out_state + ".tmp" if out_state else None
+        phrases_path = out_phrases + ".tmp" if out_phrases else None
+
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        f_state = open(state_path, "w", encoding="utf-8") if state_path else None
+        f_phrases = open(phrases_path, "w", encoding="utf-8") if phrases_path else None
+        try:
+            with open(self.csv_path, newline="", encoding="utf-8", errors="ignore") as fh, \
+                    open(out_ing, "w", encoding="utf-8") as f_ing, \
+                    open(out_proc, "w", encoding="utf-8") as f_proc:
+                reader = csv.DictReader(fh)
+                columns = self.detect_columns(reader.fieldnames)
+                if f_state:
+                    header = dict(fingerprint, version=ROW_STATE_VERSION, columns=list(columns))
+                    f_state.write(json.dumps(header) + "\n")
+                if f_phrases:
+                    f_phrases.write(json.dumps(dict(fingerprint, version=PHRASES_VERSION)) + "\n")
+
+                chunks = self.iter_tokenized_chunks(reader, columns, pool=pool, chunk_size=chunk_size,
+                                                    max_in_flight=2 * max(1, workers))
+                for chunk, results in chunks:
+                    ingredients_lines = []
+                    process_lines = []
+                    rows_state = []
+                    phrase_rows = []
+                    for (raw_title, (raw_ing, raw_inst)), (ing_tokens, steps) in zip(chunk, results):
+                        h = row_hash(raw_title, raw_ing, raw_inst)
+                        title = row_title(raw_title, h)
+                        rows_state.append(self.row_state(h, title, ing_tokens, steps))
+                        if f_phrases and raw_title.strip() and raw_ing:
+                            phrase_rows.append([raw_title.strip(), ingredient_phrases(raw_ing)])
+
+                        if ing_tokens:
+                            ingredients_lines.append(f"{title}: {' '.join(ing_tokens)}")
+                            ingredients_map.add(title, ing_tokens)
+
+                        for _, toks in steps:
+                            process_lines.append(f"{title}: {' '.join(toks)}")
+                        if steps:
+                            process_map.add(title, [sentence for sentence, _ in steps])
+
+                    # lines are "\n"-joined with no trailing newline, as in build_corpora
+                    if ingredients_lines:
+                        f_ing.write(("\n" if ing_count else "") + "\n".join(ingredients_lines))
+                        ing_count += len(ingredients_lines)
+                    if process_lines:
+                        f_proc.write(("\n" if proc_count else "") + "\n".join(process_lines))
+                        proc_count += len(process_lines)
+                    if f_state:
+                        f_state.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows_state))
+                    if f_phrases:
+                        f_phrases.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in phrase_rows))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            if f_state:
+                f_state.close()
+            if f_phrases:
+                f_phrases.close()
+        if state_path:
+            os.replace(state_path, out_state)
+        if phrases_path:
+            os.replace(phrases_path, out_phrases)
+
+        ingredients_map.write()
+        process_map.write()
+
+        print(f"Built corpora: {out_ing} ({ing_count} lines), {out_proc} ({proc_count} lines)")
+        print(f"Saved mapping JSON: {out_ing_map}, {out_proc_map}")
+
+    def corpora_current(self, state_path="corpora_rows.jsonl"):
+        header, _ = load_row_state(state_path, rows=False)
+        return header is not None and source_matches(self.csv_path, header)
+
+    def update_corpora(self,
+                       out_ing="ingredients_corpus.txt",
+                       out_proc="process_corpus.txt",
+                       out_ing_map="ingredients_map.json",
+                       out_proc_map="process_map.json",
+                       out_state="corpora_rows.jsonl",
+                       out_phrases="ingredient_phrases.jsonl"):
+        # Brings the corpora and maps up to date with the CSV by touching only the rows whose
+        # content hash is new or gone since the last build. Rows are matched as a multiset, so
+        # moving rows around costs nothing. Lines of changed rows are dropped in place and their
+        # new version is appended to the corpora; each affected title's map entry comes from its
+        # last row in CSV order, as in a full build.
+        # Returns the delta for update_snapshot, or None after falling back to a full build.
+        if not os.path.exists(self.csv_path):
+            raise FileNotFoundError(f"CSV not found: {self.csv_path}")
+        outputs = (out_ing, out_proc, out_ing_map, out_proc_map)
+        header, old_rows = load_row_state(out_state)
+        if header is None or not all(os.path.exists(p) for p in outputs):
+            self.build_corpora(*outputs, out_state=out_state, out_phrases=out_phrases)
+            return None
+        fingerprint = source_fingerprint(self.csv_path)
+
+        delta = {"old_csv_sha256": header["csv_sha256"], "csv_sha256": fingerprint["csv_sha256"],
+                 "titles": [], "ingredients": ([], []), "process": ([], [])}
+        if header["csv_sha256"] == fingerprint["csv_sha256"]:
+            return delta
+
+        unmatched = {}
+        for i, row in enumerate(old_rows):
+            unmatched.setdefault(row[0], deque()).append(i)
+
+        csv_rows = []  # per CSV row: its old_rows index, or -1 - its index in added
+        added = []  # (row hash, title, ingredient tokens, steps)
+        with open(self.csv_path, newline="", encoding="utf-8", errors="ignore") as fh:
+            reader = csv.DictReader(fh)
+            columns = self.detect_columns(reader.fieldnames)
+            if list(columns) != header["columns"]:
+                self.build_corpora(*outputs, out_state=out_state, out_phrases=out_phrases)
+                return None
+            title_key, ing_key, inst_key = columns
+
+            for row in reader:
+                raw_fields = (row.get(title_key, ""), row.get(ing_key, ""), row.get(inst_key, ""))
+                h = row_hash(*raw_fields)
+                same = unmatched.get(h)
+                if same:
+                    csv_rows.append(same.popleft())
+                    continue
+                csv_rows.append(-1 - len(added))
+                ing_tokens, steps = self.tokenize_row(raw_fields[1], raw_fields[2])
+                added.append((h, row_title(raw_fields[0], h), ing_tokens, steps))
+        removed = set(i for same in unmatched.values() for i in same)
+        if not removed and not added:
+            # only row order or unused columns changed
+            self.write_jsonl(out_state, dict(header, **fingerprint), old_rows)
+            self.update_phrases(out_phrases, header["csv_sha256"], fingerprint, [], {})
+            return delta
+
+        with open(out_ing_map, "r", encoding="utf-8") as f:
+            ingredients_map = json.load(f)
+        with open(out_proc_map, "r", encoding="utf-8") as f:
+            process_map = json.load(f)
+
+        added_rows = []
+        ing_added = []
+        proc_added = []
+        for h, title, ing_tokens, steps in added:
+            if ing_tokens:
+                ing_added.append(f"{title}: {' '.join(ing_tokens)}")
+            for _, toks in steps:
+                proc_added.append(f"{title}: {' '.join(toks)}")
+            added_rows.append(self.row_state(h, title, ing_tokens, steps))
+
+        try:
+            ing_removed = self.apply_corpus_delta(out_ing, [row[2] for row in old_rows], removed, ing_added)
+            proc_removed = self.apply_corpus_delta(out_proc, [row[3] for row in old_rows], removed, proc_added)
+        except ValueError:
+            # corpora no longer line up with the row state (edited by hand?), start over
+            self.build_corpora(*outputs, out_state=out_state, out_phrases=out_phrases)
+            return None
+
+        # last row per affected title in CSV order that has ingredient / process lines; titles
+        # that are new to the maps get appended in CSV order, as a build would
+        titles = list(dict.fromkeys([old_rows[i][1] for i in sorted(removed)] + [row[1] for row in added_rows]))
+        affected = set(titles)
+        ing_source = {}
+        proc_source = {}
+        for ref in reversed(csv_rows):
+            row = old_rows[ref] if ref >= 0 else added_rows[-1 - ref]
+            if row[1] not in affected:
+                continue
+            if row[2] and row[1] not in ing_source:
+                ing_source[row[1]] = ref
+            if row[3] and row[1] not in proc_source:
+                proc_source[row[1]] = ref
+
+        # an unchanged row taking over a title needs its values again, from one more CSV pass
+        wanted = set(old_rows[ref][0] for ref in list(ing_source.values()) + list(proc_source.values()) if ref >= 0)
+        tokenized = {}
+        if wanted:
+            with open(self.csv_path, newline="", encoding="utf-8", errors="ignore") as fh:
+                for row in csv.DictReader(fh):
+                    raw_fields = (row.get(title_key, ""), row.get(ing_key, ""), row.get(inst_key, ""))
+                    h = row_hash(*raw_fields)
+                    if h in wanted and h not in tokenized:
+                        tokenized[h] = self.tokenize_row(raw_fields[1], raw_fields[2])
+        for row, (_, _, ing_tokens, steps) in zip(added_rows, added):
+            tokenized[row[0]] = (ing_tokens, steps)
+
+        def source_tokens(ref):
+            return tokenized[(old_rows[ref] if ref >= 0 else added_rows[-1 - ref])[0]]
+
+        for title in titles:
+            if title in ing_source:
+                ingredients_map[title] = source_tokens(ing_source[title])[0]
+            else:
+                ingredients_map.pop(title, None)
+            if title in proc_source:
+                process_map[title] = [sentence for sentence, _ in source_tokens(proc_source[title])[1]]
+            else:
+                process_map.pop(title, None)
+
+        JsonMapSpool.dump(ingredients_map, out_ing_map)
+        JsonMapSpool.dump(process_map, out_proc_map)
+        rows_state = [row for i, row in enumerate(old_rows) if i not in removed] + added_rows
+        self.write_jsonl(out_state, dict(header, **fingerprint), rows_state)
+        # the affected titles' phrases, for the phrases file and update_snapshot
+        phrases = self.read_original_phrases(titles=affected)
+        self.update_phrases(out_phrases, header["csv_sha256"], fingerprint, titles, phrases)
+
+        delta["titles"] = titles
+        delta["phrases"] = phrases
+        delta["ingredients"] = (ing_removed, [p for line in ing_added for p in LINE_BREAK.split(line)])
+        delta["process"] = (proc_removed, [p for line in proc_added for p in LINE_BREAK.split(line)])
+        print(f"Updated corpora: {len(removed)} rows removed, {len(added)} rows added")
+        return delta
+
+    def update_phrases(self, path, old_sha256, fingerprint, titles, phrases):
+        # carries a phrases file that was current for the previous CSV over to the new one
+        header, rows = load_phrases(path)
+        if header is None or header.get("csv_sha256") != old_sha256:
+            return
+        phrases_map = dict(rows)
+        for title in titles:
+            if title in phrases:
+                phrases_map[title] = phrases[title]
+            else:
+                phrases_map.pop(title, None)
+        self.write_jsonl(path, dict(fingerprint, version=PHRASES_VERSION), list(phrases_map.items()))
+
+    def apply_corpus_delta(self, path, line_counts, removed, added_lines):
+        # Copies the corpus without the lines of the removed rows (line_counts[i] physical lines
+        # belong to row i) and appends added_lines. Returns the dropped physical lines.
+        dropped = []
+        tmp_path = path + ".tmp"
+        # newline="" keeps any "\r" inside a title as it is instead of translating it
+        with open(path, "r", encoding="utf-8", errors="ignore", newline="") as src, \
+                open(tmp_path, "w", encoding="utf-8", newline="") as dst:
+            sep = None
+            in_sync = True
+            for i, count in enumerate(line_counts):
+                for _ in range(count):
+                    line = next(src, None)
+                    if line is None:
+                        in_sync = False
+                        break
+                    if i in removed:
+                        if line.strip():
+                            dropped.append(line.strip())
+                        continue
+                    body = line.rstrip("\r\n")
+                    if sep is not None:
+                        dst.write(sep)
+                    dst.write(body)
+                    sep = line[len(body):] or "\n"
+            in_sync = in_sync and next(src, None) is None
+            for line in added_lines:
+                if sep is not None:
+                    dst.write(sep)
+                dst.write(line)
+                sep = "\n"
+        if not in_sync:
+            os.remove(tmp_path)
+            raise ValueError(f"{path} does not match its row state")
+        os.replace(tmp_path, path)
+        return dropped
+
+    def update_snapshot(self,
+                        delta,
+                        out_snapshot="meal_match.snapshot",
+                        ing_map="ingredients_map.json",
+                        proc_map="process_map.json",
+                        ngram_order=4,
+                        ngram_backend="dict",
+                        steps_file="recipe_steps.store"):
+        # Applies an update_corpora delta to the compiled snapshot: counts of dropped lines are
+        # decremented, new lines trained, and only the affected titles' phrases are reparsed.
+        # Returns False when the snapshot is not the one the delta was computed against.
+        from core.ngram_model import NGramModel
+        from core.snapshot import open_snapshot, write_snapshot
+
+        snap = open_snapshot(out_snapshot, ngram_order=ngram_order, ngram_backend=ngram_backend)
+        if snap is None:
+            return False
+        with snap:
+            if snap.meta.get("csv_sha256") != delta["old_csv_sha256"]:
+                return False
+            ingredient_model = NGramModel.from_state(snap.load("ingredient_model"))
+            process_model = NGramModel.from_state(snap.load("process_model"))
+            phrases_map = snap.load("original_ingredients_phrases")
+            phrase_tokens = snap.load("phrase_tokens")
+
+        ing_removed, ing_added = delta["ingredients"]
+        proc_removed, proc_added = delta["process"]
+        ingredient_model.untrain(ing_removed)
+        ingredient_model.train([l.strip() for l in ing_added if l.strip()])
+        process_model.untrain(proc_removed)
+        process_model.train([l.strip() for l in proc_added if l.strip()])
+
+        if delta["titles"]:
+            phrases = delta["phrases"]
+            for title in delta["titles"]:
+                if title in phrases:
+                    phrases_map[title] = phrases[title]
+                    phrase_tokens[title] = phrase_token_sets(phrases[title])
+                else:
+                    phrases_map.pop(title, None)
+                    phrase_tokens.pop(title, None)
+
+        meta = source_fingerprint(self.csv_path)
+        meta["ngram_order"] = ngram_order
+        meta["ngram_backend"] = ngram_backend
+        with open(ing_map, "r", encoding="utf-8") as f:
+            ingredients_map = json.load(f)
+        with open(proc_map, "r", encoding="utf-8") as f:
+            process_map = json.load(f)
+
+        write_snapshot(out_snapshot, {
+            "ingredient_model": ingredient_model.to_state(),
+            "process_model": process_model.to_state(),
+            "ingredients_map": ingredients_map,
+            "original_ingredients_phrases": phrases_map,
+            "phrase_tokens": phrase_tokens,
+        }, meta=meta)
+        print(f"Updated model snapshot: {out_snapshot} ({os.path.getsize(out_snapshot)} bytes)")
+        self.build_step_store(steps_file, process_map=process_map)
+        return True
+
+    def load_original_phrases(self, titles=None, phrases_path="ingredient_phrases.jsonl"):
+        # from the phrases file while it matches the CSV; otherwise from the CSV, after which a
+        # full read is saved as the phrases file for next time
+        if not os.path.exists(self.csv_path):
+            return {}
+        header, rows = load_phrases(phrases_path)
+        if header is not None and source_matches(self.csv_path, header):
+            return {title: phrases for title, phrases in rows if titles is None or title in titles}
+        fingerprint = source_fingerprint(self.csv_path)
+        phrases_map = self.read_original_phrases(titles)
+        if titles is None and phrases_path:
+            try:
+                self.write_jsonl(phrases_path, dict(fingerprint, version=PHRASES_VERSION), list(phrases_map.items()))
+            except OSError:
+                pass  # a read-only folder only costs the CSV read next time
+        return phrases_map
+
+    def read_original_phrases(self, titles=None):
+        phrases_map = {}
+        if not os.path.exists(self.csv_path):
+            return phrases_map
+        with open(self.csv_path, newline='', encoding='utf-8', errors='ignore') as fh:
+            reader = csv.DictReader(fh)
+
+            title_key = None
+            ing_key = None
+            for k in reader.fieldnames:
+                lk = k.lower()
+                if lk in ("title", "name", "recipe"):
+                    title_key = k
+                if "ingredient" in lk:
+                    ing_key = k
+            for row in reader:
+                title = row.get(title_key, "").strip() if title_key else None
+                raw_ing = row.get(ing_key, "") if ing_key else None
+                if title and raw_ing and (titles is None or title in titles):
+                    phrases_map[title] = ingredient_phrases(raw_ing)
+        return phrases_map
+
+    def build_snapshot(self,
+                       out_snapshot="meal_match.snapshot",
+                       ingredients_file="ingredients_corpus.txt",
+                       process_file="process_corpus.txt",
+                       ing_map="ingredients_map.json",
+                       proc_map="process_map.json",
+                       ngram_order=4,
+                       ngram_backend="dict",
+                       phrases_file="ingredient_phrases.jsonl",
+                       steps_file="recipe_steps.store"):
+        from core.ngram_model import NGramModel
+        from core.snapshot import source_fingerprint, write_snapshot
+
+        if not os.path.exists(self.csv_path):
+            raise FileNotFoundError(f"CSV not found: {self.csv_path}")
+        meta = source_fingerprint(self.csv_path)
+        meta["ngram_order"] = ngram_order
+        meta["ngram_backend"] = ngram_backend
+
+        ingredient_model = NGramModel(corpus_file=ingredients_file, max_n=ngram_order, backend=ngram_backend)
+        process_model = NGramModel(corpus_file=process_file, max_n=min(ngram_order, 3), backend=ngram_backend)
+        with open(ing_map, "r", encoding="utf-8") as f:
+            ingredients_map = json.load(f)
+        with open(proc_map, "r", encoding="utf-8") as f:
+            process_map = json.load(f)
+        phrases_map = self.load_original_phrases(phrases_path=phrases_file)
+
+        write_snapshot(out_snapshot, {
+            "ingredient_model": ingredient_model.to_state(),
+            "process_model": process_model.to_state(),
+            "ingredients_map": ingredients_map,
+            "original_ingredients_phrases": phrases_map,
+            "phrase_tokens": {title: phrase_token_sets(phrases) for title, phrases in phrases_map.items()},
+        }, meta=meta)
+        print(f"Saved model snapshot: {out_snapshot} ({os.path.getsize(out_snapshot)} bytes)")
+        self.build_step_store(steps_file, process_map=process_map)
+
+    def build_step_store(self, out_steps="recipe_steps.store", proc_map="process_map.json", process_map=None):
+        # the recipe steps as an on-disk store the recommender reads one dish at a time
+        if process_map is None:
+            with open(proc_map, "r", encoding="utf-8") as f:
+                process_map = json.load(f)
+        write_step_store(out_steps, process_map, meta=source_fingerprint(self.csv_path))
+        print(f"Saved recipe step store: {out_steps} ({os.path.getsize(out_steps)} bytes)")
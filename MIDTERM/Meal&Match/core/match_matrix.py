@@ -0,0 +1,97 @@
+from collections import Counter
+from itertools import chain, compress, repeat
+from operator import add, ge
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional, batches are then scored by the pure Python product below
+    np = sparse = None
+
+
+class IngredientMatrix:
+    # The recipe x ingredient-token incidence matrix A, kept transposed: row t of A^T holds the
+    # ids of the recipes using token t, which is exactly the recommender's postings list. Match
+    # counts for a batch of queries Q (query x token, 0/1) are the sparse product Q . A^T, scored
+    # against the recipes' distinct-token counts like CookingRecommender.get_alternative_dishes.
+    SCIPY_CHUNK = 256  # queries per product, bounds the size of the count matrix
+
+    def __init__(self, recipe_sizes, postings):
+        self.columns = {tok: col for col, tok in enumerate(postings)}
+        self.rows = list(postings.values())
+        self.n_recipes = len(recipe_sizes)
+        # int(round(count / size * 100)) for every count up to the size, looked up at
+        # offsets[recipe_id] + count, so scoring a candidate does no float work. One row per
+        # size the catalogue has, packed: one huge recipe adds its size, not its size squared.
+        starts = {}
+        self.pct_table = []
+        for size in sorted(set(recipe_sizes)):
+            starts[size] = len(self.pct_table)
+            self.pct_table.extend(int(round(count / size * 100)) if size else 0 for count in range(size + 1))
+        self.offsets = [starts[size] for size in recipe_sizes]
+        self._scipy = None
+
+    def query_rows(self, token_sets):
+        columns = self.columns
+        return [sorted(columns[tok] for tok in toks if tok in columns) for toks in token_sets]
+
+    def top_matches(self, token_sets, top_k=3):
+        # [(recipe_id, pct), ...] per query, best first, ties in catalogue order
+        rows = self.query_rows(token_sets)
+        if top_k <= 0:
+            return [[] for _ in rows]
+        if sparse is not None:
+            return self.scipy_top_matches(rows, top_k)
+        return [self.row_top_matches(row, top_k) for row in rows]
+
+    def row_top_matches(self, row, top_k):
+        # one row of Q . A^T summed from the postings, everything in C-level iterators
+        rows = self.rows
+        counts = Counter(chain.from_iterable(rows[col] for col in row))
+        if not counts:
+            return []
+        ids = list(counts)
+        pcts = list(map(self.pct_table.__getitem__, map(add, map(self.offsets.__getitem__, ids), counts.values())))
+        if len(ids) > top_k:
+            # lowest percentage that still reaches the top k, so only those get sorted
+            seen = 0
+            for threshold, n in sorted(Counter(pcts).items(), reverse=True):
+                seen += n
+                if seen >= top_k:
+                    break
+            keep = list(map(ge, pcts, repeat(threshold)))
+            ids, pcts = compress(ids, keep), compress(pcts, keep)
+        return sorted(zip(ids, pcts), key=lambda match: (-match[1], match[0]))[:top_k]
+
+    def scipy_matrix(self):
+        if self._scipy is None:
+            lengths = np.fromiter(map(len, self.rows), dtype=np.int64, count=len(self.rows))
+            indptr = np.zeros(len(self.rows) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            indices = np.fromiter(chain.from_iterable(self.rows), dtype=np.int64, count=int(indptr[-1]))
+            self._scipy = (sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                                             shape=(len(self.rows), self.n_recipes)),
+                           np.array(self.pct_table, dtype=np.int64), np.array(self.offsets, dtype=np.int64))
+        return self._scipy
+
+    def scipy_top_matches(self, rows, top_k):
+        matrix, pct_table, offsets = self.scipy_matrix()
+        results = []
+        for start in range(0, len(rows), self.SCIPY_CHUNK):
+            block = rows[start:start + self.SCIPY_CHUNK]
+            indptr = np.zeros(len(block) + 1, dtype=np.int64)
+            np.cumsum([len(row) for row in block], out=indptr[1:])
+            indices = np.fromiter(chain.from_iterable(block), dtype=np.int64, count=int(indptr[-1]))
+            queries = sparse.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                                        shape=(len(block), len(self.rows)))
+            counts = queries @ matrix
+            for i in range(len(block)):
+                lo, hi = counts.indptr[i], counts.indptr[i + 1]
+                ids = counts.indices[lo:hi]
+                pcts = pct_table[offsets[ids] + counts.data[lo:hi]]
+                if len(ids) > top_k:
+                    keep = pcts >= np.partition(pcts, len(ids) - top_k)[len(ids) - top_k]
+                    ids, pcts = ids[keep], pcts[keep]
+                order = np.lexsort((ids, -pcts))[:top_k]
+                results.append(list(zip(ids[order].tolist(), pcts[order].tolist())))
+        return results
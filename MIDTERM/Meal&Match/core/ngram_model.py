@@ -1,13 +1,33 @@
 import os
-from core.corpora_builder import simple_tokenize
+from collections import OrderedDict
+from core.tokenizer import simple_tokenize, split_partial
+from core.ngram_store import COUNT_STORES, make_count_store
+from core.ngram_smoothing import KneserNey
+from core.prefix_index import PrefixIndex
+
+# "backoff" returns the relative frequencies of the longest history seen, as it always has;
+# "kneser_ney" interpolates every order with Kneser-Ney smoothing (see core.ngram_smoothing)
+SCORING_MODES = ("backoff", "kneser_ney")
 
 class NGramModel:
-    def __init__(self, corpus_file=None, corpus_lines=None, max_n=4):
+    def __init__(self, corpus_file=None, corpus_lines=None, max_n=4, backend="dict",
+                 cache_size=4096, cache_top_k=10, scoring="backoff"):
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown n-gram scoring: {scoring!r} (expected one of {list(SCORING_MODES)})")
         self.max_n = max_n
+        self.scoring = scoring
+        self.smoothing = None
 
-        self.context_counts = {n: {} for n in range(1, max_n + 1)}
+        # (order, history) -> (total count, followers ranked by count), least recently used first
+        self.cache_size = cache_size
+        self.cache_top_k = cache_top_k
+        self._ranked = OrderedDict()
+        # prefix completion indexes, built on first use (see prefix_index)
+        self._prefix_indexes = {}
 
-        self.vocab = set()
+        # "dict" keeps string-keyed dicts of dicts; "array" interns tokens and packs counts
+        # into sorted integer arrays (see core.ngram_store)
+        self.store = make_count_store(backend, max_n)
 
         lines = []
         if corpus_file and os.path.exists(corpus_file):
@@ -19,46 +39,175 @@ class NGramModel:
         if lines:
             self.train(lines)
 
+    @property
+    def backend(self):
+        return self.store.backend
+
+    @property
+    def context_counts(self):
+        return self.store.context_counts
+
+    @property
+    def vocab(self):
+        return self.store.vocab
+
+    def to_state(self):
+        return self.store.to_state()
+
+    @classmethod
+    def from_state(cls, state, scoring="backoff"):
+        model = cls(max_n=state["max_n"], backend=state["backend"], scoring=scoring)
+        model.store = COUNT_STORES[state["backend"]].from_state(state)
+        model.fit_scoring()
+        return model
+
+    def fit_scoring(self):
+        # smoothing constants depend on every count, so they are redone after each (un)training
+        self.smoothing = None
+        if self.scoring == "kneser_ney":
+            self.smoothing = KneserNey(self.store, self.max_n, self.cache_size, self.cache_top_k)
+
+    def line_tokens(self, line):
+        if ":" in line:
+            _, rest = line.split(":", 1)
+            text = rest.strip()
+        else:
+            text = line
+        return [t for t in text.split() if t]
+
     def train(self, lines):
 
         for line in lines:
+            self.store.add(self.line_tokens(line))
+        self.store.flush()
+        self.fit_scoring()
+        self._ranked.clear()
+        self._prefix_indexes.clear()
+
+    def untrain(self, lines):
+        # exact inverse of train() for lines it has seen, used to drop removed recipes in place
+        for line in lines:
+            self.store.remove(self.line_tokens(line))
+        self.store.flush()
+        self.fit_scoring()
+        self._ranked.clear()
+        self._prefix_indexes.clear()
 
-            if ":" in line:
-                _, rest = line.split(":", 1)
-                text = rest.strip()
-            else:
-                text = line
-            tokens = [t for t in text.split() if t]
-            for t in tokens:
-                self.vocab.add(t)
-            L = len(tokens)
-            for n in range(1, self.max_n + 1):
-                if L < n:
-                    continue
-                for i in range(L - n + 1):
-                    ngram = tokens[i : i + n]
-                    history = " ".join(ngram[:-1]) if n > 1 else ""
-                    word = ngram[-1]
-                    ctx = self.context_counts[n].setdefault(history, {})
-                    ctx[word] = ctx.get(word, 0) + 1
+    def ranked_followers(self, n, history, top_k):
+        key = (n, history)
+        entry = self._ranked.get(key)
+        if entry is not None and (top_k <= len(entry[1]) or entry[2]):
+            self._ranked.move_to_end(key)
+            return entry[0], entry[1]
+
+        ctx_dict = self.context_counts.get(n, {}).get(history)
+        if ctx_dict:
+            total = sum(ctx_dict.values())
+            sorted_items = sorted(ctx_dict.items(), key=lambda kv: kv[1], reverse=True)
+            keep = max(top_k, self.cache_top_k)
+            entry = (total, sorted_items[:keep], len(sorted_items) <= keep)
+        else:
+            # unknown histories are cached too, they are the common case while typing
+            entry = (0, [], True)
+        self._ranked[key] = entry
+        if len(self._ranked) > self.cache_size:
+            self._ranked.popitem(last=False)
+        return entry[0], entry[1]
+
+    def word_prob(self, word, context):
+        # P(word | preceding tokens) under the smoothed model
+        return self.smoothing.prob(word, context)
 
     def predict_next_words(self, current_text, top_k=3):
 
         tokens = [t for t in simple_tokenize(current_text)]
+        if self.smoothing is not None:
+            return self.smoothing.ranked(tokens, top_k)
         for n in range(self.max_n, 0, -1):
             history_len = n - 1
             if len(tokens) < history_len:
                 continue
             history = " ".join(tokens[-history_len:]) if history_len > 0 else ""
-            ctx_dict = self.context_counts.get(n, {}).get(history)
-            if ctx_dict:
-                total = sum(ctx_dict.values())
-                sorted_items = sorted(ctx_dict.items(), key=lambda kv: kv[1], reverse=True)
+            total, sorted_items = self.ranked_followers(n, history, top_k)
+            if sorted_items:
                 return [(w, cnt / total) for w, cnt in sorted_items[:top_k]]
 
-        uni = self.context_counts[1].get("", {})
-        if not uni:
+        total, sorted_items = self.ranked_followers(1, "", top_k)
+        if not sorted_items:
             return []
-        total = sum(uni.values())
-        sorted_items = sorted(uni.items(), key=lambda kv: kv[1], reverse=True)
         return [(w, cnt / total) for w, cnt in sorted_items[:top_k]]
+
+    def prefix_index(self, continuation=False):
+        # over the unigram counts, or the Kneser-Ney continuation unigrams the lower orders use
+        key = "continuation" if continuation else "counts"
+        index = self._prefix_indexes.get(key)
+        if index is None:
+            scores = self.smoothing.unigrams[False][0] if continuation else self.context_counts[1].get("", {})
+            index = self._prefix_indexes[key] = PrefixIndex(scores, self.cache_top_k)
+        return index
+
+    def suggest(self, current_text, top_k=3):
+        # next words after the text, or, while a word is half typed, completions of it
+        head, partial = split_partial(current_text)
+        if not partial:
+            return self.predict_next_words(current_text, top_k=top_k)
+        return self.complete_word(simple_tokenize(head), partial, top_k=top_k)
+
+    def complete_word(self, context, prefix, top_k=3):
+        # words starting with prefix, ranked as the next word after the context tokens
+        context = tuple(context[max(0, len(context) - self.max_n + 1):]) if self.max_n > 1 else ()
+        key = ("complete", context, prefix)
+        entry = self._ranked.get(key)
+        if entry is not None and (top_k <= len(entry[0]) or entry[1]):
+            self._ranked.move_to_end(key)
+            return entry[0][:top_k]
+
+        keep = max(top_k, self.cache_top_k)
+        if self.smoothing is not None:
+            entry = self.smoothed_completions(context, prefix, keep)
+        else:
+            entry = self.backoff_completions(context, prefix, keep)
+        self._ranked[key] = entry
+        if len(self._ranked) > self.cache_size:
+            self._ranked.popitem(last=False)
+        return entry[0][:top_k]
+
+    def backoff_completions(self, context, prefix, keep):
+        # matching followers of the longest history first, then of shorter ones, then any word
+        index = self.prefix_index()
+        ranked = []
+        seen = set()
+        for n in range(len(context) + 1, 1, -1):
+            history = " ".join(context[len(context) - n + 1:])
+            followers = self.context_counts[n].get(history)
+            if not followers:
+                continue
+            total = self.ranked_followers(n, history, 0)[0]
+            for w in sorted(index.matching(prefix, followers), key=lambda w: (-followers[w], w)):
+                if w not in seen:
+                    seen.add(w)
+                    ranked.append((w, followers[w] / total))
+            if len(ranked) >= keep:
+                return ranked[:keep], False
+
+        total = self.ranked_followers(1, "", 0)[0]
+        words = index.complete(prefix, keep + len(seen))
+        ranked.extend((w, index.scores[w] / total) for w in words if w not in seen)
+        return ranked[:keep], len(words) < keep + len(seen) and len(ranked) <= keep
+
+    def smoothed_completions(self, context, prefix, keep):
+        # A word with the prefix that follows none of the context's histories scores the product
+        # of their gammas times its unigram probability, so past the matching followers the
+        # unigram ranking decides and its first keep words complete the candidates.
+        smoothing = self.smoothing
+        n, history = smoothing.top_level(context)
+        unigram, levels = smoothing.chain(n, history, True)
+        index = self.prefix_index()
+        candidates = {}
+        for _, _, _, followers in levels:
+            candidates.update(dict.fromkeys(index.matching(prefix, followers)))
+        filler = self.prefix_index(continuation=n > 1).complete(prefix, keep)
+        candidates.update(dict.fromkeys(filler))
+        scored = sorted(((w, smoothing.score(w, unigram, levels)) for w in candidates),
+                        key=lambda item: (-item[1], item[0]))
+        return scored[:keep], len(filler) < keep and len(scored) <= keep
@@ -0,0 +1,171 @@
+import heapq
+from collections import Counter, OrderedDict
+
+# Interpolated Kneser-Ney on top of a count store (see core.ngram_store):
+#   P_n(w | h) = max(c(h w) - D_n, 0) / c(h) + gamma(h) * P_n-1(w | h minus its first token)
+#   gamma(h) = D_n * (distinct followers of h) / c(h)
+# The longest history seen uses the raw counts; the orders below it use continuation counts,
+# the number of distinct tokens seen in front of an n-gram. Unigrams are interpolated with a
+# uniform distribution over the vocabulary plus one slot for unseen words, so every word gets
+# some probability. Everything that does not depend on the word is computed here once, which
+# leaves scoring a candidate at one count lookup and one multiply-add per order. Equal scores
+# are ranked alphabetically, the count stores list followers in different orders.
+
+
+def absolute_discount(count_of_counts):
+    # D = n1 / (n1 + 2 n2), from how many n-grams were seen once and twice
+    n1, n2 = count_of_counts[1], count_of_counts[2]
+    if n1 == 0 or n2 == 0:
+        return 0.5
+    return n1 / (n1 + 2 * n2)
+
+
+def lower_history(history):
+    return history.split(" ", 1)[1] if " " in history else ""
+
+
+class KneserNey:
+    def __init__(self, store, max_n, cache_size=4096, cache_top_k=10):
+        self.max_n = max_n
+        self.raw = store.context_counts
+        # order -> history -> {word: continuation count}, for every order below max_n
+        self.continuation = {n: {} for n in range(1, max_n)}
+        for n in range(max_n, 1, -1):
+            lower_level = self.continuation[n - 1]
+            for history, followers in self.raw[n].items():
+                lower_followers = lower_level.setdefault(lower_history(history), {})
+                for w in followers:
+                    lower_followers[w] = lower_followers.get(w, 0) + 1
+
+        # (order, history, raw) -> (discount, total count, gamma), for the raw and continuation counts
+        self.stats = {}
+        self.fit(self.raw, range(1, max_n + 1), True)
+        self.fit(self.continuation, range(1, max_n), False)
+
+        # raw -> ({word: P_1(w)}, words ranked by it, P_1 of a word never counted)
+        uniform = 1 / (len(store.vocab) + 1)
+        self.unigrams = {}
+        for raw, level in ((True, self.raw.get(1, {})), (False, self.continuation.get(1, {}))):
+            counts = level.get("", {})
+            discount, total, gamma = self.stats.get((1, "", raw), (0.0, 1, 1.0))
+            probs = {w: max(c - discount, 0) / total + gamma * uniform for w, c in counts.items()}
+            self.unigrams[raw] = (probs, sorted(probs, key=lambda w: (-probs[w], w)), gamma * uniform)
+
+        # (order, history, raw) -> (ranked [(word, p)], complete), least recently used first
+        self.cache_size = cache_size
+        self.cache_top_k = cache_top_k
+        self._ranked = OrderedDict()
+
+    def fit(self, levels, orders, raw):
+        for n in orders:
+            count_of_counts = Counter()
+            sizes = []
+            for history, followers in levels[n].items():
+                count_of_counts.update(followers.values())
+                sizes.append((history, sum(followers.values()), len(followers)))
+            discount = absolute_discount(count_of_counts)
+            for history, total, types in sizes:
+                self.stats[(n, history, raw)] = (discount, total, discount * types / total)
+
+    def top_level(self, context):
+        # the longest history of the context that was seen, scored with its raw counts
+        tokens = list(context[max(0, len(context) - self.max_n + 1):]) if self.max_n > 1 else []
+        for n in range(len(tokens) + 1, 1, -1):
+            history = " ".join(tokens[len(tokens) - n + 1:])
+            if (n, history, True) in self.stats:
+                return n, history
+        return 1, ""
+
+    def chain(self, n, history, raw):
+        # the unigram distribution and (discount, total, gamma, followers) of orders 2..n
+        levels = []
+        for m in range(n, 1, -1):
+            top = raw and m == n
+            discount, total, gamma = self.stats[(m, history, top)]
+            followers = (self.raw if top else self.continuation)[m][history]
+            levels.append((discount, total, gamma, followers))
+            history = lower_history(history)
+        levels.reverse()
+        return self.unigrams[raw and n == 1], levels
+
+    def score(self, word, unigram, levels):
+        p = unigram[0].get(word, unigram[2])
+        for discount, total, gamma, followers in levels:
+            p = max(followers.get(word, 0) - discount, 0) / total + gamma * p
+        return p
+
+    def prob(self, word, context):
+        return self.score(word, *self.chain(*self.top_level(context), True))
+
+    def ranked(self, context, top_k):
+        n, history = self.top_level(context)
+        return self.ranked_level(n, history, True, top_k)[0][:top_k]
+
+    def ranked_level(self, n, history, raw, top_k):
+        # Best words of one level, as (ranked [(word, p)], complete). A word scores at most its own
+        # discounted count plus gamma times the best probability of the level below, so followers
+        # are visited by count and dropped once that bound falls under the k-th best; a word that
+        # follows nothing here scores gamma * P_n-1(w), and comes ranked from the level below.
+        key = (n, history, raw)
+        entry = self._ranked.get(key)
+        if entry is not None and (top_k <= len(entry[0]) or entry[1]):
+            self._ranked.move_to_end(key)
+            return entry
+
+        keep = max(top_k, self.cache_top_k)
+        if n == 1:
+            probs, ranked, _ = self.unigrams[raw]
+            entry = ([(w, probs[w]) for w in ranked[:keep]], len(ranked) <= keep)
+        else:
+            entry = self.merge_level(n, history, raw, keep)
+
+        self._ranked[key] = entry
+        if len(self._ranked) > self.cache_size:
+            self._ranked.popitem(last=False)
+        return entry
+
+    def merge_level(self, n, history, raw, keep):
+        # Threshold algorithm over two ranked lists: the followers by count and the level below
+        # by probability. A word not reached in either yet scores at most the next follower's
+        # discounted count plus gamma times the next probability below, so once that bound
+        # falls under the k-th best score nothing further down can make the list.
+        unigram, levels = self.chain(n, history, raw)
+        discount, total, gamma, followers = levels[-1]
+        below = lower_history(history)
+        lower, lower_complete = self.ranked_level(n - 1, below, False, keep)
+        by_count = sorted(followers, key=followers.get, reverse=True)
+        seen = {}
+        best = []  # min-heap of the keep best scores so far
+        slack = 1 - 1e-12  # keeps float rounding in the bound from dropping a tie
+
+        def add(w, p):
+            seen[w] = p
+            heapq.heappush(best, p)
+            if len(best) > keep:
+                heapq.heappop(best)
+
+        i = j = 0
+        pruned = False
+        while True:
+            if j == len(lower) and not lower_complete:
+                lower, lower_complete = self.ranked_level(n - 1, below, False, 2 * len(lower))
+            follower_bound = max(followers[by_count[i]] - discount, 0) / total if i < len(by_count) else 0.0
+            lower_p = lower[j][1] if j < len(lower) else 0.0
+            if i == len(by_count) and j == len(lower):
+                break
+            if len(best) >= keep and follower_bound + gamma * lower_p < best[0] * slack:
+                pruned = True
+                break
+            if i < len(by_count):
+                w = by_count[i]
+                i += 1
+                if w not in seen:
+                    add(w, self.score(w, unigram, levels))
+            if j < len(lower):
+                w, p = lower[j]
+                j += 1
+                if w not in seen:
+                    add(w, max(followers.get(w, 0) - discount, 0) / total + gamma * p)
+
+        scored = sorted(seen.items(), key=lambda item: (-item[1], item[0]))
+        return scored[:keep], not pruned and len(scored) <= keep
@@ -0,0 +1,351 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Mapping
+
+# Array backend layout: one sorted level per order. Every entry carries a stable id, the
+# corpus position where it was first seen (unique within a level). An entry's key packs its
+# prefix entry's id with the id of its last token, so the followers of a history are one
+# contiguous run of the next level: a trie flattened into sorted arrays. Ordering followers
+# by first-seen position also reproduces the dict backend's insertion order for ties.
+WORD_BITS = 32
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+class DictCountStore:
+    backend = "dict"
+
+    def __init__(self, max_n):
+        self.max_n = max_n
+        self.context_counts = {n: {} for n in range(1, max_n + 1)}
+        self.vocab = set()
+
+    def add(self, tokens):
+        for t in tokens:
+            self.vocab.add(t)
+        L = len(tokens)
+        for n in range(1, self.max_n + 1):
+            if L < n:
+                continue
+            for i in range(L - n + 1):
+                ngram = tokens[i : i + n]
+                history = " ".join(ngram[:-1]) if n > 1 else ""
+                word = ngram[-1]
+                ctx = self.context_counts[n].setdefault(history, {})
+                ctx[word] = ctx.get(word, 0) + 1
+
+    def remove(self, tokens):
+        # undoes add(tokens); n-grams whose count reaches zero are dropped, as if never seen
+        L = len(tokens)
+        for n in range(1, self.max_n + 1):
+            if L < n:
+                continue
+            level = self.context_counts[n]
+            for i in range(L - n + 1):
+                ngram = tokens[i : i + n]
+                history = " ".join(ngram[:-1]) if n > 1 else ""
+                word = ngram[-1]
+                ctx = level.get(history)
+                if ctx is None or word not in ctx:
+                    continue
+                if ctx[word] > 1:
+                    ctx[word] -= 1
+                    continue
+                del ctx[word]
+                if not ctx:
+                    del level[history]
+                if n == 1:
+                    self.vocab.discard(word)
+
+    def flush(self):
+        pass
+
+    def to_state(self):
+        return {"backend": self.backend, "max_n": self.max_n, "vocab": sorted(self.vocab),
+                "context_counts": self.context_counts}
+
+    @classmethod
+    def from_state(cls, state):
+        store = cls(state["max_n"])
+        store.vocab = set(state["vocab"])
+        store.context_counts = state["context_counts"]
+        return store
+
+
+class ArrayCountStore:
+    backend = "array"
+
+    def __init__(self, max_n, flush_every=250000):
+        self.max_n = max_n
+        self.flush_every = flush_every
+        self.token_ids = {}
+        self.tokens = []
+        self.keys = {n: array("Q") for n in range(1, max_n + 1)}
+        self.counts = {n: array("I") for n in range(1, max_n + 1)}
+        self.order = {n: array("Q") for n in range(1, max_n + 1)}
+        self.position = 0
+        self.context_counts = {n: ArrayContextView(self, n) for n in range(1, max_n + 1)}
+        # n-grams seen since the last flush, keyed by their packed token ids
+        self._pending = {n: Counter() for n in range(1, max_n + 1)}
+        self._pending_first = {n: {} for n in range(1, max_n + 1)}
+        self._pending_size = 0
+        self._vocab = None
+
+    @property
+    def vocab(self):
+        # tokens with a live unigram; interned ids are never reused, so this is not token_ids
+        if self._vocab is None:
+            tokens = self.tokens
+            self._vocab = {tokens[k] for k in self.keys[1]}
+        return self._vocab
+
+    def intern(self, tokens):
+        ids = []
+        for t in tokens:
+            tid = self.token_ids.get(t)
+            if tid is None:
+                tid = self.token_ids[t] = len(self.tokens)
+                self.tokens.append(t)
+            ids.append(tid)
+        return ids
+
+    def add(self, tokens):
+        ids = self.intern(tokens)
+        L = len(ids)
+        position = self.position
+        keys = ids
+        for n in range(1, min(self.max_n, L) + 1):
+            if n > 1:
+                keys = [(k << WORD_BITS) | t for k, t in zip(keys, ids[n - 1:])]
+            self._pending[n].update(keys)
+
+            # earliest position of each n-gram in this line, recorded only for unseen ones
+            first = self._pending_first[n]
+            line_first = dict(zip(reversed(keys), range(position + L - 1, position + n - 2, -1)))
+            for k, pos in line_first.items():
+                if k not in first:
+                    first[k] = pos
+                    self._pending_size += 1
+        self.position = position + L
+
+        # the pending buffers are the only part that grows with the input, so cap them
+        if self._pending_size >= self.flush_every:
+            self.flush()
+
+    def remove(self, tokens):
+        # negative counts are folded in by the next flush; entries that reach zero are dropped
+        ids = self.intern(tokens)
+        keys = ids
+        for n in range(1, min(self.max_n, len(ids)) + 1):
+            if n > 1:
+                keys = [(k << WORD_BITS) | t for k, t in zip(keys, ids[n - 1:])]
+            self._pending[n].subtract(keys)
+            self._pending_size += len(keys)
+        if self._pending_size >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        # Fold pending counts into the sorted levels, lowest order first so every n-gram's
+        # prefix id is already known when its own level is merged.
+        if not any(self._pending.values()):
+            return
+        prefix_ids = None
+        for n in range(1, self.max_n + 1):
+            pending = self._pending[n]
+            first = self._pending_first[n]
+            keys = self.keys[n]
+            counts = self.counts[n]
+            order = self.order[n]
+            size = len(keys)
+            entry_ids = {}
+            fresh = []
+            dead = []
+            for packed, delta in pending.items():
+                if n == 1:
+                    key = packed
+                else:
+                    parent = prefix_ids.get(packed >> WORD_BITS)
+                    if parent is None:
+                        continue
+                    key = (parent << WORD_BITS) | (packed & WORD_MASK)
+                i = bisect_left(keys, key) if size else 0
+                if i < size and keys[i] == key:
+                    entry_ids[packed] = order[i]
+                    count = counts[i] + delta
+                    if count > 0:
+                        counts[i] = count
+                    else:
+                        dead.append(i)
+                elif delta > 0:
+                    entry_ids[packed] = first[packed]
+                    fresh.append((key, delta, first[packed]))
+
+            if dead:
+                self._drop(n, sorted(dead))
+            if fresh:
+                fresh.sort()
+                self._insert(n, fresh)
+            pending.clear()
+            first.clear()
+            prefix_ids = entry_ids
+        self._pending_size = 0
+        self._vocab = None
+
+    def _drop(self, n, dead):
+        for level in (self.keys, self.counts, self.order):
+            old = level[n]
+            new = array(old.typecode)
+            prev = 0
+            for i in dead:
+                new += old[prev:i]
+                prev = i + 1
+            new += old[prev:]
+            level[n] = new
+
+    def _insert(self, n, fresh):
+        # splice the sorted new entries between slices of the existing arrays
+        levels = (self.keys, self.counts, self.order)
+        olds = [level[n] for level in levels]
+        news = [array(old.typecode, column) for old, column in zip(olds, zip(*fresh))]
+        outs = [array(old.typecode) for old in olds]
+        cuts = [bisect_left(olds[0], key) for key, _, _ in fresh]
+        prev = 0
+        j = 0
+        while j < len(fresh):
+            cut = cuts[j]
+            end = j + 1
+            while end < len(fresh) and cuts[end] == cut:
+                end += 1
+            for out, old, new in zip(outs, olds, news):
+                out += old[prev:cut]
+                out += new[j:end]
+            prev = cut
+            j = end
+        for level, out, old in zip(levels, outs, olds):
+            out += old[prev:]
+            level[n] = out
+
+    def _find(self, n, parent, token_id):
+        key = token_id if n == 1 else (parent << WORD_BITS) | token_id
+        keys = self.keys[n]
+        i = bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            return i
+        return -1
+
+    def history_id(self, history_tokens):
+        entry = None
+        for depth, tok in enumerate(history_tokens, 1):
+            tid = self.token_ids.get(tok)
+            if tid is None:
+                return None
+            i = self._find(depth, entry, tid)
+            if i < 0:
+                return None
+            entry = self.order[depth][i]
+        return entry
+
+    def follower_range(self, n, entry):
+        keys = self.keys[n]
+        if n == 1:
+            return 0, len(keys)
+        lo = bisect_left(keys, entry << WORD_BITS)
+        hi = bisect_left(keys, (entry + 1) << WORD_BITS, lo)
+        return lo, hi
+
+    def followers(self, history_tokens):
+        n = len(history_tokens) + 1
+        if n > self.max_n:
+            return None
+        entry = self.history_id(history_tokens) if n > 1 else None
+        if n > 1 and entry is None:
+            return None
+        lo, hi = self.follower_range(n, entry)
+        return self.range_dict(n, lo, hi) if lo < hi else None
+
+    def range_dict(self, n, lo, hi):
+        keys = self.keys[n]
+        counts = self.counts[n]
+        order = self.order[n]
+        tokens = self.tokens
+        return {tokens[keys[i] & WORD_MASK]: counts[i] for i in sorted(range(lo, hi), key=order.__getitem__)}
+
+    def iter_histories(self, n):
+        # (history tokens, lo, hi) for every history that has followers on level n
+        if n == 1:
+            if len(self.keys[1]):
+                yield [], 0, len(self.keys[1])
+            return
+
+        def walk(depth, lo, hi, prefix):
+            keys = self.keys[depth]
+            order = self.order[depth]
+            for i in range(lo, hi):
+                path = prefix + [self.tokens[keys[i] & WORD_MASK]]
+                child_lo, child_hi = self.follower_range(depth + 1, order[i])
+                if child_lo == child_hi:
+                    continue
+                if depth + 1 == n:
+                    yield path, child_lo, child_hi
+                else:
+                    yield from walk(depth + 1, child_lo, child_hi, path)
+
+        yield from walk(1, 0, len(self.keys[1]), [])
+
+    def nbytes(self):
+        return sum(arr.itemsize * len(arr) for level in (self.keys, self.counts, self.order) for arr in level.values())
+
+    def to_state(self):
+        self.flush()
+        return {"backend": self.backend, "max_n": self.max_n, "tokens": self.tokens, "position": self.position,
+                "keys": {n: self.keys[n].tobytes() for n in self.keys},
+                "counts": {n: self.counts[n].tobytes() for n in self.counts},
+                "order": {n: self.order[n].tobytes() for n in self.order}}
+
+    @classmethod
+    def from_state(cls, state):
+        store = cls(state["max_n"])
+        store.tokens = list(state["tokens"])
+        store.token_ids = {t: i for i, t in enumerate(store.tokens)}
+        store.position = state["position"]
+        for n in store.keys:
+            store.keys[n].frombytes(state["keys"][n])
+            store.counts[n].frombytes(state["counts"][n])
+            store.order[n].frombytes(state["order"][n])
+        return store
+
+
+class ArrayContextView(Mapping):
+    # Read-only stand-in for DictCountStore.context_counts[n]: history string -> {word: count}
+    def __init__(self, store, n):
+        self.store = store
+        self.n = n
+
+    def __getitem__(self, history):
+        history_tokens = history.split() if history else []
+        if len(history_tokens) != self.n - 1:
+            raise KeyError(history)
+        followers = self.store.followers(history_tokens)
+        if followers is None:
+            raise KeyError(history)
+        return followers
+
+    def __iter__(self):
+        for history_tokens, _, _ in self.store.iter_histories(self.n):
+            yield " ".join(history_tokens)
+
+    def __len__(self):
+        return sum(1 for _ in self.store.iter_histories(self.n))
+
+    def items(self):
+        for history_tokens, lo, hi in self.store.iter_histories(self.n):
+            yield " ".join(history_tokens), self.store.range_dict(self.n, lo, hi)
+
+
+COUNT_STORES = {DictCountStore.backend: DictCountStore, ArrayCountStore.backend: ArrayCountStore}
+
+
+def make_count_store(backend, max_n):
+    if backend not in COUNT_STORES:
+        raise ValueError(f"Unknown n-gram backend: {backend!r} (expected one of {sorted(COUNT_STORES)})")
+    return COUNT_STORES[backend](max_n)
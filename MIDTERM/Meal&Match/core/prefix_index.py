@@ -0,0 +1,40 @@
+from bisect import bisect_left
+
+
+class PrefixIndex:
+    # Completions for a partly typed word. Every prefix of every word maps to its best words,
+    # so a lookup costs one hash of the prefix plus k; the sorted word list gives the range of
+    # all words with a prefix, for callers that need more than the precomputed best.
+    def __init__(self, scores, top_k=10):
+        self.scores = scores
+        self.top_k = top_k
+        self.words = sorted(scores)
+        best = {}
+        for word in sorted(scores, key=lambda w: (-scores[w], w)):
+            for end in range(1, len(word) + 1):
+                prefix = word[:end]
+                words = best.get(prefix)
+                if words is None:
+                    best[prefix] = [word]
+                elif len(words) < top_k:
+                    words.append(word)
+        self.best = {prefix: tuple(words) for prefix, words in best.items()}
+
+    def prefix_range(self, prefix):
+        lo = bisect_left(self.words, prefix)
+        return lo, bisect_left(self.words, prefix + "\uffff", lo)
+
+    def complete(self, prefix, k):
+        # the k highest scoring words starting with prefix, ties alphabetical
+        if k <= self.top_k:
+            return self.best.get(prefix, ())[:k]
+        lo, hi = self.prefix_range(prefix)
+        scores = self.scores
+        return tuple(sorted(self.words[lo:hi], key=lambda w: (-scores[w], w))[:k])
+
+    def matching(self, prefix, candidates):
+        # the members of candidates (a dict or set) that start with prefix, from whichever side is smaller
+        lo, hi = self.prefix_range(prefix)
+        if hi - lo <= len(candidates):
+            return [w for w in self.words[lo:hi] if w in candidates]
+        return [w for w in candidates if w.startswith(prefix)]
@@ -1,12 +1,46 @@
+import heapq
 import os
 import json
+from collections import Counter
+from itertools import chain
 from core.ngram_model import NGramModel
-from core.corpora_builder import simple_tokenize
+from core.corpora_builder import CorporaBuilder
+from core.tokenizer import simple_tokenize, tokenize_many, phrase_token_sets
+from core.match_matrix import IngredientMatrix
+from core.snapshot import open_snapshot
+from core.step_store import open_step_store
 
 class CookingRecommender:
+    PRUNE_MIN_POSTINGS = 256  # below this many postings get_alternative_dishes scores every candidate
+
     def __init__(self, ingredients_file="ingredients_corpus.txt", process_file="process_corpus.txt", 
-                 ing_map="ingredients_map.json", proc_map="process_map.json", ngram_order=4, csv_path="13k-recipes.csv"):
+                 ing_map="ingredients_map.json", proc_map="process_map.json", ngram_order=4, csv_path="13k-recipes.csv",
+                 snapshot_path="meal_match.snapshot", ngram_backend="dict", ngram_scoring="backoff",
+                 phrases_file="ingredient_phrases.jsonl", steps_file="recipe_steps.store"):
+        self.ngram_scoring = ngram_scoring
+        # steps are only needed once a dish is picked, so their store is opened on first use
+        self.steps_sources = (steps_file, csv_path, proc_map, process_file)
+        self.step_store = None
+
+        snap = open_snapshot(snapshot_path, csv_path=csv_path, ngram_order=ngram_order, ngram_backend=ngram_backend)
+        if snap is not None:
+            with snap:
+                self.load_snapshot(snap)
+        else:
+            self.load_sources(ingredients_file, process_file, ing_map, proc_map, ngram_order, csv_path, ngram_backend,
+                              phrases_file)
+
+        self.build_index()
+
+    def load_snapshot(self, snap):
+        self.ingredients_map = snap.load("ingredients_map")
+        self.ingredient_model = NGramModel.from_state(snap.load("ingredient_model"), scoring=self.ngram_scoring)
+        self.process_model = NGramModel.from_state(snap.load("process_model"), scoring=self.ngram_scoring)
+        self.original_ingredients_phrases = snap.load("original_ingredients_phrases")
+        self.phrase_tokens = snap.load("phrase_tokens")
 
+    def load_sources(self, ingredients_file, process_file, ing_map, proc_map, ngram_order, csv_path, ngram_backend="dict",
+                     phrases_file="ingredient_phrases.jsonl"):
         if os.path.exists(ing_map):
             with open(ing_map, "r", encoding="utf-8") as f:
                 self.ingredients_map = json.load(f)
@@ -14,45 +48,47 @@ class CookingRecommender:
 
             self.ingredients_map = self.parse_ingredients_file(ingredients_file)
 
-        if os.path.exists(proc_map):
-            with open(proc_map, "r", encoding="utf-8") as f:
-                self.process_map = json.load(f)
-        else:
-            self.process_map = self.parse_process_file(process_file)
-
-
-        self.ingredient_model = NGramModel(corpus_file=ingredients_file, max_n=ngram_order)
-        self.process_model = NGramModel(corpus_file=process_file, max_n=min(ngram_order, 3))
-
-
-        self.original_ingredients_phrases = {}
-        if os.path.exists(csv_path):
-            import csv
-            with open(csv_path, newline='', encoding='utf-8', errors='ignore') as fh:
-                reader = csv.DictReader(fh)
-
-                title_key = None
-                ing_key = None
-                for k in reader.fieldnames:
-                    lk = k.lower()
-                    if lk in ("title", "name", "recipe"):
-                        title_key = k
-                    if "ingredient" in lk:
-                        ing_key = k
-                for row in reader:
-                    title = row.get(title_key, "").strip() if title_key else None
-                    raw_ing = row.get(ing_key, "") if ing_key else None
-                    if title and raw_ing:
-
-                        try:
-                            import ast
-                            phrases = ast.literal_eval(raw_ing)
-                            if isinstance(phrases, list):
-                                self.original_ingredients_phrases[title] = [p.strip() for p in phrases if p.strip()]
-                            else:
-                                self.original_ingredients_phrases[title] = [raw_ing.strip()]
-                        except Exception:
-                            self.original_ingredients_phrases[title] = [raw_ing.strip()]
+        self.ingredient_model = NGramModel(corpus_file=ingredients_file, max_n=ngram_order, backend=ngram_backend,
+                                           scoring=self.ngram_scoring)
+        self.process_model = NGramModel(corpus_file=process_file, max_n=min(ngram_order, 3), backend=ngram_backend,
+                                        scoring=self.ngram_scoring)
+
+        self.original_ingredients_phrases = CorporaBuilder(csv_path=csv_path).load_original_phrases(phrases_path=phrases_file)
+        self.phrase_tokens = {title: phrase_token_sets(phrases) for title, phrases in self.original_ingredients_phrases.items()}
+
+    def build_index(self):
+        # token -> ids of the recipes using it, so a query only scores recipes sharing a token
+        self.recipe_titles = []
+        self.recipe_sizes = []
+        self.postings = {}
+        # the same postings split by recipe size, so recipes can be visited best-possible-score first
+        self.size_postings = {}
+        for title, ing_list in self.ingredients_map.items():
+            if not ing_list:
+                continue
+            ing_set = set(ing_list)
+            recipe_id = len(self.recipe_titles)
+            self.recipe_titles.append(title)
+            self.recipe_sizes.append(len(ing_set))
+            bucket = self.size_postings.setdefault(len(ing_set), {})
+            for tok in ing_set:
+                self.postings.setdefault(tok, []).append(recipe_id)
+                bucket.setdefault(tok, []).append(recipe_id)
+        self.sizes_ascending = sorted(self.size_postings)
+        self.matrix = None  # built on the first batch query
+
+    def match_counts(self, user_set):
+        counts = {}
+        for tok in user_set:
+            for recipe_id in self.postings.get(tok, ()):
+                counts[recipe_id] = counts.get(recipe_id, 0) + 1
+        return counts
+
+    def query_postings(self, user_text):
+        # how many postings a match or an alternatives query for user_text walks, a cheap
+        # estimate of its cost
+        postings = self.postings
+        return sum(len(postings[tok]) for tok in postings.keys() & simple_tokenize(user_text))
 
     def parse_ingredients_file(self, path):
         mapping = {}
@@ -86,7 +122,7 @@ class CookingRecommender:
 
     def get_suggestions(self, partial_text, top_k=5):
 
-        preds = self.ingredient_model.predict_next_words(partial_text, top_k=top_k)
+        preds = self.ingredient_model.suggest(partial_text, top_k=top_k)
         return preds  
 
     def find_missing_ingredients(self, user_text, min_matches=2):
@@ -100,65 +136,111 @@ class CookingRecommender:
         best_score = 0.0
         best_match_count = 0
         best_total = 1
-        for title, ing_list in self.ingredients_map.items():
-            if not ing_list:
-                continue
-            ing_set = set(ing_list)
-            match_count = len(user_set & ing_set)
-            if match_count == 0:
-                continue
-            score = match_count / max(1, len(ing_set))
+        counts = self.match_counts(user_set)
+        # visit candidates in catalogue order so ties resolve exactly as a full scan would
+        for recipe_id in sorted(counts):
+            match_count = counts[recipe_id]
+            size = self.recipe_sizes[recipe_id]
+            score = match_count / size
 
             if score > best_score or (abs(score - best_score) < 1e-9 and match_count > best_match_count):
                 best_score = score
-                best_dish = title
+                best_dish = self.recipe_titles[recipe_id]
                 best_match_count = match_count
-                best_total = len(ing_set)
+                best_total = size
 
         if best_dish and best_match_count >= min_matches:
             missing_tokens = [i for i in self.ingredients_map[best_dish] if i not in user_set]
-
-            phrases = self.original_ingredients_phrases.get(best_dish, [])
-            missing_phrases = []
-            used = set()
-            for phrase in phrases:
-                phrase_tokens = set(simple_tokenize(phrase))
-                if phrase_tokens & set(missing_tokens) and phrase not in used:
-                    missing_phrases.append(phrase)
-                    used.add(phrase)
-
-            covered = set()
-            for phrase in missing_phrases:
-                covered |= set(simple_tokenize(phrase))
-            for token in missing_tokens:
-                if token not in covered:
-                    missing_phrases.append(token)
+            missing_phrases = self.describe_missing(best_dish, missing_tokens)
             confidence = int(round(best_score * 100))
             return best_dish, missing_phrases, confidence
         return None, [], 0
 
+    def describe_missing(self, dish, missing_tokens):
+        # original phrases naming a missing token, then any missing token none of them covers
+        missing_set = set(missing_tokens)
+        missing_phrases = []
+        used = set()
+        covered = set()
+        phrases = self.original_ingredients_phrases.get(dish, [])
+        for phrase, tokens in zip(phrases, self.phrase_tokens.get(dish, ())):
+            if phrase not in used and not missing_set.isdisjoint(tokens):
+                missing_phrases.append(phrase)
+                used.add(phrase)
+                covered.update(tokens)
+        missing_phrases.extend(token for token in missing_tokens if token not in covered)
+        return missing_phrases
+
+    def recipe_steps(self):
+        # the on-disk step store, or without a current one the whole process map as before
+        if self.step_store is None:
+            steps_file, csv_path, proc_map, process_file = self.steps_sources
+            self.step_store = open_step_store(steps_file, csv_path=csv_path)
+            if self.step_store is None:
+                if os.path.exists(proc_map):
+                    with open(proc_map, "r", encoding="utf-8") as f:
+                        self.step_store = json.load(f)
+                else:
+                    self.step_store = self.parse_process_file(process_file)
+        return self.step_store
+
+    def close(self):
+        # the step store keeps its file mapped; a dict from the process map has nothing to close
+        if self.step_store is not None and hasattr(self.step_store, "close"):
+            self.step_store.close()
+        self.step_store = None
+
     def get_recipe_steps(self, dish, max_steps=6):
 
-        if dish not in self.process_map:
+        steps = self.recipe_steps().get(dish)
+        if steps is None:
             return []
 
-        return self.process_map[dish][:max_steps]
+        return steps[:max_steps]
 
     def get_alternative_dishes(self, user_text, top_k=3):
 
         user_tokens = [t for t in simple_tokenize(user_text)]
         if not user_tokens:
             return []
-        user_set = set(user_tokens)
-        scores = []
-        for title, ing_list in self.ingredients_map.items():
-            if not ing_list:
-                continue
-            ing_set = set(ing_list)
-            match_count = len(user_set & ing_set)
-            if match_count == 0:
-                continue
-            score = match_count / max(1, len(ing_set))
-            scores.append((title, int(round(score * 100))))
-        scores.sort(key=lambda x: x[1], reverse=True)
-        return scores[:top_k]
+        user_set = self.postings.keys() & user_tokens
+        if not user_set or top_k < 1:
+            return []
+
+        if sum(len(self.postings[tok]) for tok in user_set) <= self.PRUNE_MIN_POSTINGS:
+            # few candidates: scoring them all beats walking the size buckets
+            counts = self.match_counts(user_set)
+            sizes = self.recipe_sizes
+            best = heapq.nlargest(top_k, ((int(round(count / sizes[recipe_id] * 100)), -recipe_id)
+                                          for recipe_id, count in counts.items()))
+        else:
+            best = self.pruned_alternatives(user_set, top_k)
+        return [(self.recipe_titles[-neg_id], pct) for pct, neg_id in best]
+
+    def pruned_alternatives(self, user_set, top_k):
+        # A recipe of size s matching c tokens scores c / s and c <= min(len(user_set), s), so
+        # going through the sizes in ascending order visits the best possible scores first and
+        # stops once even that bound cannot reach the k-th best. Heap items are (pct, -id),
+        # the smallest being the current k-th best: lower pct, or later in the catalogue.
+        heap = []
+        for size in self.sizes_ascending:
+            if len(heap) == top_k and int(round(min(len(user_set), size) / size * 100)) < heap[0][0]:
+                break
+            bucket = self.size_postings[size]
+            counts = Counter(chain.from_iterable(bucket[tok] for tok in user_set if tok in bucket))
+            for recipe_id, match_count in counts.items():
+                item = (int(round(match_count / size * 100)), -recipe_id)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        heap.sort(reverse=True)
+        return heap
+
+    def get_alternative_dishes_batch(self, user_texts, top_k=3):
+        # get_alternative_dishes for every text, scored together as one sparse product
+        if self.matrix is None:
+            self.matrix = IngredientMatrix(self.recipe_sizes, self.postings)
+        token_sets = [set(tokens) for tokens in tokenize_many(user_texts)]
+        titles = self.recipe_titles
+        return [[(titles[recipe_id], pct) for recipe_id, pct in top] for top in self.matrix.top_matches(token_sets, top_k)]
@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import marshal
+import hashlib
+
+# File layout: MAGIC | header length (u32) | JSON header | marshal-encoded sections.
+# The header lists every section's (offset, length) relative to the start of the file.
+SNAPSHOT_MAGIC = b"MMSNAP\r\n"
+SNAPSHOT_VERSION = 4
+
+
+def file_sha256(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while True:
+            block = fh.read(block_size)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_fingerprint(csv_path):
+    st = os.stat(csv_path)
+    return {"csv_sha256": file_sha256(csv_path), "csv_size": st.st_size, "csv_mtime": st.st_mtime}
+
+
+def source_matches(csv_path, meta):
+    st = os.stat(csv_path)
+    # size+mtime match means the CSV is untouched; otherwise fall back to the content hash
+    if st.st_size == meta.get("csv_size") and st.st_mtime == meta.get("csv_mtime"):
+        return True
+    return file_sha256(csv_path) == meta.get("csv_sha256")
+
+
+def write_snapshot(path, sections, meta=None):
+    payloads = [(name, marshal.dumps(obj)) for name, obj in sections.items()]
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "python": list(sys.version_info[:2]),
+        "byteorder": sys.byteorder,
+        "meta": meta or {},
+        "sections": {},
+    }
+    # offsets depend on the header size, so grow the header until its length settles
+    header_len = 0
+    while True:
+        offset = len(SNAPSHOT_MAGIC) + 4 + header_len
+        for name, data in payloads:
+            header["sections"][name] = [offset, len(data)]
+            offset += len(data)
+        raw_header = json.dumps(header).encode("utf-8")
+        if len(raw_header) == header_len:
+            break
+        header_len = len(raw_header)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(SNAPSHOT_MAGIC)
+        fh.write(struct.pack("<I", len(raw_header)))
+        fh.write(raw_header)
+        for _, data in payloads:
+            fh.write(data)
+    os.replace(tmp_path, path)
+
+
+class Snapshot:
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fh.close()
+            raise ValueError(f"Empty snapshot: {path}")
+        self._view = memoryview(self._mm)
+
+        start = len(SNAPSHOT_MAGIC)
+        if bytes(self._view[:start]) != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError(f"Not a Meal&Match snapshot: {path}")
+        (header_len,) = struct.unpack("<I", self._view[start:start + 4])
+        self.header = json.loads(bytes(self._view[start + 4:start + 4 + header_len]).decode("utf-8"))
+        self.meta = self.header.get("meta", {})
+        self.sections = self.header.get("sections", {})
+
+    def is_compatible(self):
+        return (self.header.get("version") == SNAPSHOT_VERSION
+                and self.header.get("python") == list(sys.version_info[:2])
+                and self.header.get("byteorder") == sys.byteorder)
+
+    def load(self, name):
+        offset, length = self.sections[name]
+        return marshal.loads(self._view[offset:offset + length])
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_snapshot(path, csv_path=None, **expected_meta):
+    # Returns an open Snapshot when it is usable for this CSV and build settings, otherwise None.
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        snap = Snapshot(path)
+    except (OSError, ValueError):
+        return None
+
+    fresh = snap.is_compatible()
+    if fresh and any(snap.meta.get(k) != v for k, v in expected_meta.items()):
+        fresh = False
+    if fresh and csv_path and os.path.exists(csv_path):
+        fresh = source_matches(csv_path, snap.meta)
+    if not fresh:
+        snap.close()
+        return None
+    return snap
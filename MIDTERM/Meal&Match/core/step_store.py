@@ -0,0 +1,136 @@
+import os
+import sys
+import json
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from core.snapshot import source_matches
+
+# File layout: MAGIC | each dish's steps as a UTF-8 JSON array, back to back | the titles as
+# a sorted JSON array | int64 offsets into the steps, one per title plus the end (native byte
+# order) | JSON header | header length (u32). Only the titles and offsets are read when the
+# store is opened; a dish's steps are decoded from the mapped file when first asked for.
+STEP_STORE_MAGIC = b"MMSTEPS\n"
+STEP_STORE_VERSION = 1
+
+
+def write_step_store(path, steps_map, meta=None):
+    titles = sorted(steps_map)
+    offsets = array("q")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(STEP_STORE_MAGIC)
+        offset = len(STEP_STORE_MAGIC)
+        for title in titles:
+            offsets.append(offset)
+            data = json.dumps(steps_map[title], ensure_ascii=False).encode("utf-8")
+            fh.write(data)
+            offset += len(data)
+        offsets.append(offset)
+
+        raw_titles = json.dumps(titles, ensure_ascii=False).encode("utf-8")
+        raw_offsets = offsets.tobytes()
+        header = {
+            "version": STEP_STORE_VERSION,
+            "byteorder": sys.byteorder,
+            "meta": meta or {},
+            "titles": [offset, len(raw_titles)],
+            "offsets": [offset + len(raw_titles), len(raw_offsets)],
+        }
+        raw_header = json.dumps(header).encode("utf-8")
+        fh.write(raw_titles)
+        fh.write(raw_offsets)
+        fh.write(raw_header)
+        fh.write(struct.pack("<I", len(raw_header)))
+    os.replace(tmp_path, path)
+
+
+class StepStore:
+    def __init__(self, path, cache_size=256):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fh.close()
+            raise ValueError(f"Empty step store: {path}")
+
+        size = len(self._mm)
+        if size < len(STEP_STORE_MAGIC) + 4 or self._mm[:len(STEP_STORE_MAGIC)] != STEP_STORE_MAGIC:
+            self.close()
+            raise ValueError(f"Not a Meal&Match step store: {path}")
+        (header_len,) = struct.unpack("<I", self._mm[size - 4:])
+        try:
+            self.header = json.loads(self._mm[size - 4 - header_len:size - 4].decode("utf-8"))
+            offset, length = self.header["titles"]
+            self.titles = json.loads(self._mm[offset:offset + length].decode("utf-8"))
+            offset, length = self.header["offsets"]
+            self.offsets = array("q")
+            self.offsets.frombytes(self._mm[offset:offset + length])
+        except (ValueError, KeyError, TypeError):
+            self.close()
+            raise ValueError(f"Corrupt step store: {path}")
+        if self.header.get("byteorder") != sys.byteorder:
+            self.offsets.byteswap()
+        self.meta = self.header.get("meta", {})
+
+        # title -> steps, least recently used first
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def is_compatible(self):
+        return self.header.get("version") == STEP_STORE_VERSION
+
+    def __len__(self):
+        return len(self.titles)
+
+    def position(self, title):
+        i = bisect_left(self.titles, title)
+        return i if i < len(self.titles) and self.titles[i] == title else -1
+
+    def __contains__(self, title):
+        return title in self._cache or self.position(title) >= 0
+
+    def get(self, title, default=None):
+        steps = self._cache.get(title)
+        if steps is not None:
+            self._cache.move_to_end(title)
+            return steps
+        i = self.position(title)
+        if i < 0:
+            return default
+        steps = json.loads(self._mm[self.offsets[i]:self.offsets[i + 1]].decode("utf-8"))
+        self._cache[title] = steps
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return steps
+
+    def close(self):
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_step_store(path, csv_path=None, cache_size=256):
+    # Returns an open StepStore when it is usable for this CSV, otherwise None.
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        store = StepStore(path, cache_size=cache_size)
+    except (OSError, ValueError):
+        return None
+
+    fresh = store.is_compatible()
+    if fresh and csv_path and os.path.exists(csv_path):
+        fresh = source_matches(csv_path, store.meta)
+    if not fresh:
+        store.close()
+        return None
+    return store
@@ -0,0 +1,88 @@
+import re
+
+# simple_tokenize() used to hide fractions behind "__FRACTION_i__" placeholders while it
+# stripped punctuation, but that filter strips the placeholder's underscores and capitals as
+# well, so a fraction has always come out as the bare index i of its first occurrence among
+# the string's fractions ("1/2 cup" -> ["0", "cup"]). Every corpus and map is built on that
+# output, so the engine below reproduces it exactly, in one scan instead of six passes.
+FRACTION = re.compile(r"\d+/\d+")
+WORD = re.compile(r"[a-z0-9]+")
+# a fraction, or a run of word characters none of which is where a fraction starts
+TOKEN = re.compile(r"(\d+/\d+)|(?:(?!\d+/\d)[a-z0-9])+")
+# a fraction next to one of these overlaps or runs into another one
+FRACTION_EDGE = frozenset("0123456789/")
+# the word still being typed: word characters running up to the end of the text
+PARTIAL = re.compile(r"[A-Za-z0-9]+$")
+
+
+def tokenize_by_replacement(s):
+    # The original replace-based algorithm on already lowered text. Only needed when a
+    # fraction also occurs inside another one ("1/2 11/2"), where str.replace rewrites both,
+    # or fractions touch ("211/21/22"), where one replace can split the next fraction.
+    for i, frac in enumerate(FRACTION.findall(s)):
+        s = s.replace(frac, f"__FRACTION_{i}__")
+    return WORD.findall(s)
+
+
+def tokenize_lowered(s):
+    slashes = s.count("/")
+    if not slashes:
+        return WORD.findall(s)
+    if slashes == 1:
+        # at most one fraction, so it is fraction 0 and cannot occur inside another
+        m = FRACTION.search(s)
+        if m is None:
+            return WORD.findall(s)
+        return WORD.findall(s, 0, m.start()) + ["0"] + WORD.findall(s, m.end())
+
+    tokens = []
+    fractions = {}  # fraction -> [index of its first occurrence, occurrences]
+    count = 0
+    for m in TOKEN.finditer(s):
+        frac = m.group(1)
+        if frac is None:
+            tokens.append(m.group())
+            continue
+        start, end = m.span()
+        if (start and s[start - 1] in FRACTION_EDGE) or s[end:end + 1] in FRACTION_EDGE:
+            return tokenize_by_replacement(s)
+        seen = fractions.get(frac)
+        if seen is None:
+            seen = fractions[frac] = [str(count), 0]
+        seen[1] += 1
+        count += 1
+        tokens.append(seen[0])
+    # The exactness guard: the scan above only matches the sequential replaces when no
+    # fraction can reach into another, so anything less clear-cut goes the old way
+    for frac, (_, occurrences) in fractions.items():
+        if s.count(frac) != occurrences or any(frac != other and frac in other for other in fractions):
+            return tokenize_by_replacement(s)
+    return tokens
+
+
+def simple_tokenize(s):
+    if s is None:
+        return []
+    return tokenize_lowered(s.lower())
+
+
+def tokenize_many(texts):
+    # [simple_tokenize(t) for t in texts] without the per-call overhead
+    lowered = tokenize_lowered
+    return [lowered(t.lower()) if t is not None else [] for t in texts]
+
+
+def phrase_token_sets(phrases):
+    # The distinct tokens of each phrase, parallel to the list. Kept as tuples rather than
+    # frozensets: set.isdisjoint()/update() take them just the same, and in the snapshot they
+    # load about 4x faster in half the memory.
+    return [tuple(dict.fromkeys(toks)) for toks in tokenize_many(phrases)]
+
+
+def split_partial(text):
+    # (text before the word being typed, that word so far, lowered); the word is "" once the
+    # text ends in a space or punctuation, and the tail of a fraction ("1/2") never counts
+    m = PARTIAL.search(text)
+    if m is None or text[m.start() - 1:m.start()] == "/":
+        return text, ""
+    return text[:m.start()], m.group().lower()
@@ -1,24 +1,76 @@
 from core.corpora_builder import CorporaBuilder
 from core.recommender import CookingRecommender
-from ui.ui import CookingUI
+from core.snapshot import open_snapshot
+from core.step_store import open_step_store
+import asyncio
 import os
+import sys
+import time
 
-def main():
+def load_recommender():
     csv_path = "13k-recipes.csv"
     ing_file = "ingredients_corpus.txt"
     proc_file = "process_corpus.txt"
     ing_map = "ingredients_map.json"
     proc_map = "process_map.json"
+    row_state = "corpora_rows.jsonl"
+    phrases = "ingredient_phrases.jsonl"
+    snapshot = "meal_match.snapshot"
+    steps = "recipe_steps.store"
+    ngram_order = 4
+    ngram_backend = "dict"  # "array" trades some lookup speed for a much smaller footprint
+    ngram_scoring = "backoff"  # "kneser_ney" mixes in every order for smoother suggestions
 
+    builder = CorporaBuilder(csv_path=csv_path)
+    delta = None
     if not (os.path.exists(ing_file) and os.path.exists(proc_file) and os.path.exists(ing_map) and os.path.exists(proc_map)):
         print("Building corpora from CSV (this runs once) ...")
-        builder = CorporaBuilder(csv_path=csv_path)
-        builder.build_corpora(out_ing=ing_file, out_proc=proc_file, out_ing_map=ing_map, out_proc_map=proc_map)
+        builder.build_corpora(out_ing=ing_file, out_proc=proc_file, out_ing_map=ing_map, out_proc_map=proc_map,
+                              out_state=row_state, out_phrases=phrases)
+    elif os.path.exists(csv_path) and not builder.corpora_current(row_state):
+        print("Recipe CSV changed, updating corpora ...")
+        delta = builder.update_corpora(out_ing=ing_file, out_proc=proc_file, out_ing_map=ing_map, out_proc_map=proc_map,
+                                       out_state=row_state, out_phrases=phrases)
     else:
         print("Corpora and maps found. Skipping build step.")
 
-    print("Loading recommender (this may take a few seconds)...")
-    recommender = CookingRecommender(ingredients_file=ing_file, process_file=proc_file, ing_map=ing_map, proc_map=proc_map, ngram_order=4)
+    snap = open_snapshot(snapshot, csv_path=csv_path, ngram_order=ngram_order, ngram_backend=ngram_backend)
+    if snap is None and delta is not None and builder.update_snapshot(delta, out_snapshot=snapshot, ing_map=ing_map,
+                                                                      proc_map=proc_map, ngram_order=ngram_order,
+                                                                      ngram_backend=ngram_backend, steps_file=steps):
+        snap = open_snapshot(snapshot, csv_path=csv_path, ngram_order=ngram_order, ngram_backend=ngram_backend)
+    if snap is not None:
+        snap.close()
+        print("Model snapshot is up to date.")
+        store = open_step_store(steps, csv_path=csv_path)
+        if store is not None:
+            store.close()
+        elif os.path.exists(csv_path) and os.path.exists(proc_map):
+            builder.build_step_store(out_steps=steps, proc_map=proc_map)
+    elif os.path.exists(csv_path):
+        print("Compiling model snapshot (runs again only when the CSV changes) ...")
+        builder.build_snapshot(out_snapshot=snapshot, ingredients_file=ing_file, process_file=proc_file,
+                               ing_map=ing_map, proc_map=proc_map, ngram_order=ngram_order, ngram_backend=ngram_backend,
+                               phrases_file=phrases, steps_file=steps)
+
+    print("Loading recommender...")
+    start = time.perf_counter()
+    recommender = CookingRecommender(ingredients_file=ing_file, process_file=proc_file, ing_map=ing_map, proc_map=proc_map,
+                                     ngram_order=ngram_order, csv_path=csv_path, snapshot_path=snapshot,
+                                     ngram_backend=ngram_backend, ngram_scoring=ngram_scoring, phrases_file=phrases,
+                                     steps_file=steps)
+    print(f"Recommender loaded in {time.perf_counter() - start:.2f}s")
+    return recommender
+
+def main():
+    recommender = load_recommender()
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # python main.py serve [port]: the HTTP/JSON service instead of the window
+        from server.http_server import serve
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
+        asyncio.run(serve(recommender, port=port))
+        return
+    from ui.ui import CookingUI
     print("Launching UI...")
     app = CookingUI(recommender)
     app.run()
@@ -0,0 +1,323 @@
+import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+from ui.query_worker import LatencyStats
+
+# A small HTTP/1.1 JSON service over one shared CookingRecommender, on asyncio streams only.
+#   GET  /suggest?text=1 cup chick&k=5        next words, or completions of a half-typed word
+#   GET  /match?text=egg flour sugar           best dish, its missing ingredients, confidence
+#   GET  /alternatives?text=egg flour&k=3      closest dishes by ingredient overlap
+#   POST /alternatives {"texts": [...], "k": 3} the same for many pantries, scored as one batch
+#   GET  /steps?dish=Dish 3&max=6             first steps of a dish
+#   GET  /metrics                              request latency per endpoint
+# POST bodies may carry any of the query parameters as a JSON object.
+#
+# Suggestions, steps and the service endpoints are lookups of well under a millisecond and
+# run right on the event loop. A match or an alternatives query scans every recipe sharing a
+# token with the pantry: with rare ingredients that is a handful and it runs on the loop too,
+# as handing it to the pool would cost more than the scan, but common ones take tens of
+# milliseconds on a large catalogue and a batch can take seconds, so those go to a pool as
+# they would otherwise stall every other connection:
+# forked worker processes where the platform has fork, as a thread scoring in Python would
+# hold the GIL and stall the loop all the same; threads elsewhere. There is one pool, forked
+# at once while this is the only thread (a second pool would be forked from a process
+# already running the first one's manager threads). It has batch_workers + query_workers
+# workers and at most batch_workers batches are let into it at a time, so single queries
+# always find a free worker however many batches wait. Either way the workers only read the
+# postings and the ingredient matrix, which are built before the pool starts, so forked
+# workers inherit them and threads never race to create them.
+
+# the recommender forked pool workers query, set before they are started
+POOL_RECOMMENDER = None
+
+
+def score_batch(texts, top_k):
+    return POOL_RECOMMENDER.get_alternative_dishes_batch(texts, top_k)
+
+
+def match_one(text, min_matches):
+    return POOL_RECOMMENDER.find_missing_ingredients(text, min_matches=min_matches)
+
+
+def alternatives_one(text, top_k):
+    return POOL_RECOMMENDER.get_alternative_dishes(text, top_k=top_k)
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def text_param(params, name, default=None):
+    value = params.get(name, default)
+    if not isinstance(value, str):
+        raise HttpError(400, f"'{name}' must be a string")
+    return value
+
+
+def int_param(params, name, default, lo, hi):
+    value = params.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"'{name}' must be an integer")
+    if not lo <= value <= hi:
+        raise HttpError(400, f"'{name}' must be between {lo} and {hi}")
+    return value
+
+
+class QueryServer:
+    MAX_HEADER_BYTES = 16 * 1024
+    MAX_BODY_BYTES = 1 << 20
+    MAX_BATCH = 10000  # texts per batch request
+    POOL_FUNCTIONS = {"batch": score_batch, "match": match_one, "alternatives": alternatives_one}
+    INLINE_MAX_POSTINGS = 4096  # queries walking fewer postings run on the loop, in well under 1 ms
+    IDLE_TIMEOUT = 15.0  # seconds a keep-alive connection may sit between requests
+
+    def __init__(self, recommender, batch_workers=2, batch_pool="process", max_queued_batches=8, window=2048,
+                 query_workers=2, max_queued_queries=256):
+        self.recommender = recommender
+        self.max_queued_batches = max_queued_batches
+        self.queued_batches = 0
+        self.batch_slots = asyncio.Semaphore(batch_workers)
+        self.max_queued_queries = max_queued_queries
+        self.queued_queries = 0
+        self.window = window
+        self.latency = {}  # endpoint -> LatencyStats
+        self.errors = {}  # endpoint -> requests answered with a 4xx/5xx
+        self.status_counts = {}
+        self.in_flight = 0
+        self.started = time.time()
+        self.server = None
+        self.routes = {
+            "/suggest": self.suggest,
+            "/match": self.match,
+            "/alternatives": self.alternatives,
+            "/steps": self.steps,
+            "/metrics": self.metrics,
+            "/health": self.health,
+        }
+
+        # everything the recommender builds lazily, built now so the batch workers only read it
+        # and the first requests do not pay for it
+        recommender.get_alternative_dishes_batch([""], top_k=1)
+        recommender.get_suggestions("a", top_k=1)
+        recommender.recipe_steps()
+
+        self.inline = {
+            "match": lambda text, min_matches: recommender.find_missing_ingredients(text, min_matches=min_matches),
+            "alternatives": lambda text, top_k: recommender.get_alternative_dishes(text, top_k=top_k),
+        }
+        global POOL_RECOMMENDER
+        if batch_pool == "process" and "fork" in multiprocessing.get_all_start_methods():
+            POOL_RECOMMENDER = recommender
+            workers = batch_workers + query_workers
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+            # fork every worker now, while this is the only thread
+            list(self.pool.map(score_batch, [[]] * workers, [1] * workers))
+            self.calls = self.POOL_FUNCTIONS
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=batch_workers + query_workers, thread_name_prefix="query")
+            self.calls = dict(self.inline, batch=recommender.get_alternative_dishes_batch)
+        self.batch_pool = "process" if isinstance(self.pool, ProcessPoolExecutor) else "thread"
+
+    async def run_query(self, name, text, *args):
+        # a single match or alternatives query, on the loop when it is cheap, else on the pool
+        if self.recommender.query_postings(text) < self.INLINE_MAX_POSTINGS:
+            return self.inline[name](text, *args)
+        if self.queued_queries >= self.max_queued_queries:
+            raise HttpError(503, "too many queries queued, retry later")
+        self.queued_queries += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, self.calls[name], text, *args)
+        finally:
+            self.queued_queries -= 1
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=self.MAX_HEADER_BYTES)
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.recommender.close()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.IDLE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 431, {"error": "request headers too large"}, False)
+                    return
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                if not await self.handle_request(head, reader, writer):
+                    return
+        finally:
+            writer.close()
+
+    async def handle_request(self, head, reader, writer):
+        # -> whether the connection stays open for another request
+        start = time.perf_counter()
+        self.in_flight += 1
+        endpoint = None
+        keep_alive = False
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ")
+            except ValueError:
+                raise HttpError(400, "malformed request line")
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                keep_alive = False
+                raise HttpError(400, "bad Content-Length")
+            if length > self.MAX_BODY_BYTES:
+                keep_alive = False
+                raise HttpError(413, "request body too large")
+            body = await reader.readexactly(length) if length else b""
+
+            url = urlsplit(target)
+            handler = self.routes.get(url.path)
+            if handler is None:
+                raise HttpError(404, f"no such endpoint: {url.path}")
+            endpoint = url.path
+            if method not in ("GET", "POST"):
+                raise HttpError(405, "use GET or POST")
+            params = dict(parse_qsl(url.query, keep_blank_values=True))
+            if body:
+                try:
+                    payload = json.loads(body)
+                except ValueError:
+                    raise HttpError(400, "body is not valid JSON")
+                if not isinstance(payload, dict):
+                    raise HttpError(400, "body must be a JSON object")
+                params.update(payload)
+
+            status, result = 200, await handler(params)
+        except HttpError as e:
+            status, result = e.status, {"error": str(e)}
+        except asyncio.IncompleteReadError:
+            return False
+        except Exception as e:  # a failing query must not take the connection handler down
+            status, result = 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.in_flight -= 1
+
+        await self.respond(writer, status, result, keep_alive)
+        self.record(endpoint or "other", status, time.perf_counter() - start)
+        return keep_alive
+
+    async def respond(self, writer, status, result, keep_alive):
+        body = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def record(self, endpoint, status, seconds):
+        stats = self.latency.get(endpoint)
+        if stats is None:
+            stats = self.latency[endpoint] = LatencyStats(self.window)
+        stats.add(seconds)
+        if status >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    async def suggest(self, params):
+        text = text_param(params, "text", "")
+        k = int_param(params, "k", 5, 1, 50)
+        return {"suggestions": self.recommender.get_suggestions(text, top_k=k)}
+
+    async def match(self, params):
+        text = text_param(params, "text")
+        min_matches = int_param(params, "min_matches", 2, 1, 1000)
+        dish, missing, confidence = await self.run_query("match", text, min_matches)
+        return {"dish": dish, "missing": missing, "confidence": confidence}
+
+    async def alternatives(self, params):
+        k = int_param(params, "k", 3, 1, 100)
+        if "texts" not in params:
+            text = text_param(params, "text")
+            return {"alternatives": await self.run_query("alternatives", text, k)}
+
+        texts = params["texts"]
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise HttpError(400, "'texts' must be a list of strings")
+        if len(texts) > self.MAX_BATCH:
+            raise HttpError(413, f"at most {self.MAX_BATCH} texts per batch")
+        if self.queued_batches >= self.max_queued_batches:
+            raise HttpError(503, "too many batches queued, retry later")
+        self.queued_batches += 1
+        try:
+            # a batch waits here, not in the pool, so it never takes a single query's worker
+            async with self.batch_slots:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(self.pool, self.calls["batch"], texts, k)
+        finally:
+            self.queued_batches -= 1
+        return {"alternatives": results}
+
+    async def steps(self, params):
+        dish = text_param(params, "dish")
+        max_steps = int_param(params, "max", 6, 1, 1000)
+        return {"dish": dish, "steps": self.recommender.get_recipe_steps(dish, max_steps=max_steps)}
+
+    async def health(self, params):
+        return {"status": "ok"}
+
+    async def metrics(self, params):
+        endpoints = {}
+        for endpoint, stats in sorted(self.latency.items()):
+            endpoints[endpoint] = {"count": stats.count, "errors": self.errors.get(endpoint, 0)}
+            for p in (50, 95, 99):
+                value = stats.percentile(p)
+                endpoints[endpoint][f"p{p}_ms"] = round(value * 1000, 3) if value is not None else None
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "in_flight": self.in_flight,
+            "queued_batches": self.queued_batches,
+            "queued_queries": self.queued_queries,
+            "batch_pool": self.batch_pool,
+            "window": self.window,
+            "status": {str(status): n for status, n in sorted(self.status_counts.items())},
+            "endpoints": endpoints,
+        }
+
+
+async def serve(recommender, host="127.0.0.1", port=8080, batch_workers=2, batch_pool="process", query_workers=2):
+    query_server = QueryServer(recommender, batch_workers=batch_workers, batch_pool=batch_pool,
+                               query_workers=query_workers)
+    server = await query_server.start(host, port)
+    print(f"Serving on http://{host}:{port} (suggest, match, alternatives, steps, metrics)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await query_server.close()
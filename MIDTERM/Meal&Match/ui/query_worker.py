@@ -0,0 +1,111 @@
+import math
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class LatencyStats:
+    # rolling window of query times behind the p50/p95 readout
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def percentile(self, p):
+        with self.lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        # nearest-rank percentile
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    def summary(self):
+        p50 = self.percentile(50)
+        if p50 is None:
+            return ""
+        return f"Query time p50 {p50 * 1000:.1f} ms, p95 {self.percentile(95) * 1000:.1f} ms ({self.count} queries)"
+
+
+class QueryWorker:
+    # Runs queries on one background thread. Only the newest submitted text is kept, so a burst
+    # of keystrokes costs one query; a query overtaken while it runs stops at the next stage
+    # and its results are dropped. on_result(generation, text, results, seconds) is called on
+    # the worker thread, the caller hands it over to its own thread. A query that raises is
+    # passed to on_error(generation, text, error) instead (printed when there is none), and the
+    # worker carries on with the next one.
+    def __init__(self, stages, on_result, stats=None, on_error=None):
+        self.stages = stages  # [(name, fn(text)), ...], results are keyed by name
+        self.on_result = on_result
+        self.on_error = on_error
+        self.stats = stats
+        self.generation = 0
+        self.dropped = 0
+        self._pending = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="query-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, text):
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+            self.generation += 1
+            self._pending = (self.generation, text)
+            self._cond.notify()
+            return self.generation
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def close(self, timeout=1.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, text = self._pending
+                self._pending = None
+
+            try:
+                self._answer(generation, text)
+            except Exception as e:
+                self._report(generation, text, e)
+
+    def _answer(self, generation, text):
+        start = time.perf_counter()
+        results = {}
+        for name, fn in self.stages:
+            if not self.is_current(generation):
+                break
+            results[name] = fn(text)
+        if len(results) < len(self.stages) or not self.is_current(generation):
+            with self._cond:
+                self.dropped += 1
+            return
+        elapsed = time.perf_counter() - start
+        if self.stats is not None:
+            self.stats.add(elapsed)
+        self.on_result(generation, text, results, elapsed)
+
+    def _report(self, generation, text, error):
+        # nothing raised here may end the thread either
+        try:
+            if self.on_error is None:
+                raise error
+            self.on_error(generation, text, error)
+        except Exception:
+            traceback.print_exc()
@@ -1,10 +1,15 @@
+import queue
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
 from core.recommender import CookingRecommender
-from core.corpora_builder import simple_tokenize
+from core.tokenizer import split_partial
+from ui.query_worker import LatencyStats, QueryWorker
 
 
 class CookingUI:
+    DEBOUNCE_MS = 150  # typing pause before a query is sent
+    POLL_MS = 25  # how often finished queries are picked up on the Tk thread
+
     def __init__(self, recommender: CookingRecommender):
         self.recommender = recommender
         self.root = tk.Tk()
@@ -12,6 +17,19 @@ class CookingUI:
         self.build_widgets()
         self.bind_events()
 
+        # Queries run on a worker thread; Tk widgets may only be touched from this thread, so
+        # results come back through a queue that poll_results drains via root.after.
+        self.latency = LatencyStats()
+        self.results = queue.Queue()
+        self.worker = QueryWorker([
+            ("suggestions", lambda text: self.recommender.get_suggestions(text, top_k=6)),
+            ("match", self.recommender.find_missing_ingredients),
+        ], lambda *result: self.results.put(result), stats=self.latency,
+            # a failed query comes back with results None and the exception in place of the seconds
+            on_error=lambda generation, text, error: self.results.put((generation, text, None, error)))
+        self.pending_query = None
+        self.root.after(self.POLL_MS, self.poll_results)
+
     def build_widgets(self):
         frm_top = tk.Frame(self.root)
         frm_top.pack(fill="x", padx=8, pady=6)
@@ -51,6 +69,9 @@ class CookingUI:
         self.steps_box = scrolledtext.ScrolledText(frm_steps, height=12, wrap="word")
         self.steps_box.pack(fill="both", expand=True)
 
+        self.latency_label = tk.Label(self.root, text="", anchor="w", fg="gray")
+        self.latency_label.pack(fill="x", padx=8, pady=(0, 4))
+
     def bind_events(self):
         self.entry.bind("<KeyRelease>", self.on_key_release)
         self.suggestions_listbox.bind("<Double-Button-1>", self.on_suggestion_double)
@@ -59,15 +80,43 @@ class CookingUI:
 
 
     def on_key_release(self, event):
-        text = self.entry.get().strip()
-
-        preds = self.recommender.get_suggestions(text, top_k=6)
+        # restart the debounce timer on every key; programmatic edits (event None) go out at once
+        if self.pending_query is not None:
+            self.root.after_cancel(self.pending_query)
+        self.pending_query = self.root.after(self.DEBOUNCE_MS if event is not None else 0, self.submit_query)
+
+    def submit_query(self):
+        self.pending_query = None
+        # trailing text is kept: "chick" asks for completions, "chick " for the next word
+        self.worker.submit(self.entry.get().lstrip())
+
+    def poll_results(self):
+        latest = None
+        while True:
+            try:
+                latest = self.results.get_nowait()
+            except queue.Empty:
+                break
+        if latest is not None:
+            generation, _, results, error = latest
+            # text typed after this query was sent already has a newer one on the way
+            if self.worker.is_current(generation) and results is None:
+                self.latency_label.config(text=f"Query failed: {error}")
+            elif self.worker.is_current(generation):
+                self.show_results(results["suggestions"], results["match"])
+                summary = self.latency.summary()
+                if self.worker.dropped:
+                    summary += f", {self.worker.dropped} superseded"
+                self.latency_label.config(text=summary)
+        self.root.after(self.POLL_MS, self.poll_results)
+
+    def show_results(self, preds, match):
         self.suggestions_listbox.delete(0, tk.END)
         for w, p in preds:
             self.suggestions_listbox.insert(tk.END, f"{w}  ({p:.2f})")
 
 
-        dish, missing, confidence = self.recommender.find_missing_ingredients(text)
+        dish, missing, confidence = match
         if dish:
             self.confirm_label.config(text=f"Are you cooking {dish}?   Confidence: {confidence}%")
             self.missing_text.delete("1.0", tk.END)
@@ -97,9 +146,14 @@ class CookingUI:
             return
 
         word = sel.split()[0]
-        cur = self.entry.get().strip()
-        if cur and not cur.endswith(" "):
-            cur = cur + " "
+        head, partial = split_partial(self.entry.get())
+        if partial:
+            # the suggestion completes the word being typed, so it replaces it
+            cur = head.lstrip()
+        else:
+            cur = head.strip()
+            if cur and not cur.endswith(" "):
+                cur = cur + " "
         self.entry.delete(0, tk.END)
         self.entry.insert(0, cur + word + " ")
 
@@ -162,23 +216,7 @@ class CookingUI:
         user_tokens = set(self.recommender.ingredient_model.vocab & set(user_text.split()))
         ing_list = self.recommender.ingredients_map.get(dish, [])
         missing = [i for i in ing_list if i not in user_tokens]
-
-        phrases = self.recommender.original_ingredients_phrases.get(dish, [])
-        missing_phrases = []
-        used = set()
-        
-        for phrase in phrases:
-            phrase_tokens = set(simple_tokenize(phrase))
-            if phrase_tokens & set(missing) and phrase not in used:
-                missing_phrases.append(phrase)
-                used.add(phrase)
-        covered = set()
-
-        for phrase in missing_phrases:
-            covered |= set(simple_tokenize(phrase))
-        for token in missing:
-            if token not in covered:
-                missing_phrases.append(token)
+        missing_phrases = self.recommender.describe_missing(dish, missing)
 
         match_count = len(set(user_text.split()) & set(ing_list))
         confidence = int(round(match_count / max(1, len(ing_list)) * 100))
@@ -201,4 +239,8 @@ class CookingUI:
         win.destroy()
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.worker.close()
+            self.recommender.close()
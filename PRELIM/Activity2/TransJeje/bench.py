@@ -0,0 +1,287 @@
+import contextlib
+import io
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from typing import List
+from TransJeje.core import JejemonNormalizer
+from TransJeje.fuzzy import edit_distance, load_fuzzy_index
+from TransJeje.store import SqliteDictionary
+
+# Throughput of the normalizer on a synthetic chat dump built from the dictionary's own words,
+# or of the smart punctuation filter on long texts full of '!!!' and '...'.
+# Run from the Activity2 folder: python -m TransJeje.bench [lines] [workers]
+#                                python -m TransJeje.bench punctuation [KB]
+#                                python -m TransJeje.bench dictionary [words]
+#                                python -m TransJeje.bench fuzzy [typos]
+
+
+# What the default normalizer gave before any of the optional corrections existed; none of
+# them may change it. Checked before every benchmark.
+REFERENCE_OUTPUTS = [
+    ('Where are you going tonight?', 'Where are you going tonigt?'),
+    ('tulong kanina going', 'Tulong kanina going'),
+    ('p0h qAqO slamat haayop!!!', 'Po kako slamat haayop!'),
+    ('mUsTaH nA pOwhz?? ingat ka lagi...', 'Musta na po ingat ka lagi.'),
+    ('hAhAhA 2loy ang saya, grbe!!!', 'Haaha toloy ang saya, grbe!'),
+    ('Nice one!!! See you later :)', 'Nice one! See you later'),
+]
+
+
+def check_reference_outputs(normalizer: JejemonNormalizer) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        for text, expected in REFERENCE_OUTPUTS:
+            got = normalizer.normalize_text(text)['final_normalized']
+            if got != expected or normalizer.normalize(text) != expected:
+                raise SystemExit(f"default output changed: {text!r} gave {got!r}, expected {expected!r}")
+
+
+def chat_lines(normalizer: JejemonNormalizer, count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    words = list(normalizer.jejemon_dict) + ["p0h", "qAqO", "hAhAhA", "2loy", "mUsTaH", "ingat", "ok", "lol"]
+    tails = ["", "", "!!!", "?", "...", " :)", ".", " haha"]
+    lines = []
+    for _ in range(count):
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(3, 14)))
+        lines.append(line + rng.choice(tails))
+    return lines
+
+
+def quadratic_punctuation_filter(text: str) -> str:
+    # is_proper_sentence_punctuation before the single-pass filter: every '.', '!' or '?'
+    # followed by a space joined and stripped the whole rest of the text
+    chars = list(text)
+    n = len(chars)
+
+    def proper(index: int, punct: str) -> bool:
+        if punct == ',':
+            if index == 0 or index == n - 1:
+                return False
+            return (any(c.isalnum() for c in chars[:index][::-1][:10])
+                    and any(c.isalnum() for c in chars[index + 1:index + 11]))
+        if index == n - 1:
+            return True
+        if chars[index + 1] == ' ':
+            remaining = ''.join(chars[index + 1:]).strip()
+            return not remaining or remaining[0].isupper()
+        return False
+
+    result = []
+    for i, char in enumerate(chars):
+        if char in '#@$¥':
+            result.append(char)
+        elif char in '.,!?':
+            if proper(i, char):
+                result.append(char)
+        elif char == "'":
+            if 0 < i < n - 1 and chars[i - 1].isalpha() and chars[i + 1].isalpha():
+                result.append(char)
+        elif char not in string.punctuation:
+            result.append(char)
+    return ''.join(result)
+
+
+def punctuation_benchmark(normalizer: JejemonNormalizer, size_kb: int) -> None:
+    rng = random.Random(0)
+    pieces = ["wow!!! ", "ok... ", "Talaga?! ", "hala!!! Grabe... ", "sige, ", "di'ba ", "hahaha!!! ", "...",
+              "!!! ", "Hi. "]
+    print(f"{'input':>8s} {'old':>11s} {'single pass':>12s}")
+    kb = 1
+    while kb <= size_kb:
+        parts, length = [], 0
+        while length < kb * 1000:
+            parts.append(rng.choice(pieces))
+            length += len(parts[-1])
+        text = ''.join(parts)
+        times = []
+        for f in (quadratic_punctuation_filter, normalizer.is_proper_sentence_punctuation):
+            start = time.perf_counter()
+            out = f(text)
+            times.append(time.perf_counter() - start)
+            if f is quadratic_punctuation_filter:
+                expected = out
+            elif out != expected:
+                raise SystemExit("the single-pass filter does not match the old one")
+        print(f"{kb:6d}KB {times[0] * 1000:8.1f} ms {times[1] * 1000:9.2f} ms  {times[0] / times[1]:7.0f}x")
+        kb = size_kb if kb < size_kb < kb * 4 else kb * 4
+
+
+def dictionary_benchmark(normalizer: JejemonNormalizer, size: int) -> None:
+    # the shipped dictionary padded with made-up words up to size, as JSON and as SQLite
+    rng = random.Random(0)
+    mappings = dict(normalizer.jejemon_dict)
+    letters = string.ascii_lowercase + "0123456789"
+    while len(mappings) < size:
+        word = ''.join(rng.choice(letters) for _ in range(rng.randint(4, 12)))
+        mappings.setdefault(word, word[::-1])
+    lines = chat_lines(normalizer, 5000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "jejemon.json")
+        db_path = os.path.join(tmp, "jejemon.db")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(mappings, f, ensure_ascii=False, indent=2)
+
+        start = time.perf_counter()
+        imported = SqliteDictionary(db_path)
+        imported.import_json(json_path)
+        imported.close()
+        print(f"{size} words: JSON {os.path.getsize(json_path) / 1e6:.1f} MB, SQLite "
+              f"{os.path.getsize(db_path) / 1e6:.1f} MB, bulk import {time.perf_counter() - start:.2f}s")
+
+        print(f"{'':8s} {'start':>10s} {'add 1 word':>11s} {'add 1000':>10s} {'lines/s':>9s}")
+        for name, path in (("JSON", json_path), ("SQLite", db_path)):
+            start = time.perf_counter()
+            store = JejemonNormalizer(path)
+            opened = time.perf_counter() - start
+
+            start = time.perf_counter()
+            store.add_word_mapping("bagongsalita", "new word")
+            add_one = time.perf_counter() - start
+            start = time.perf_counter()
+            store.add_word_mappings((f"salita{i}", f"word {i}") for i in range(1000))
+            add_many = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for line in lines:
+                store.normalize(line)
+            rate = len(lines) / (time.perf_counter() - start)
+            print(f"{name:8s} {opened * 1000:7.1f} ms {add_one * 1000:8.1f} ms {add_many * 1000:7.1f} ms {rate:9.0f}")
+            if name == "SQLite":
+                store.jejemon_dict.close()
+            del store  # freed here, not inside the next start timing
+
+
+def misspell(word: str, rng: random.Random) -> str:
+    # one random edit: a letter dropped, added, changed, or swapped with the next one
+    i = rng.randrange(len(word))
+    letter = rng.choice(string.ascii_lowercase)
+    edit = rng.randrange(4)
+    if edit == 0 and len(word) > 1:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + letter + word[i:]
+    if edit == 2:
+        return word[:i] + letter + word[i + 1:]
+    if i + 1 < len(word):
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word + letter
+
+
+def fuzzy_benchmark(normalizer: JejemonNormalizer, count: int) -> None:
+    mappings = dict(normalizer.jejemon_dict)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jejemon.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(mappings, f, ensure_ascii=False, indent=2)
+        start = time.perf_counter()
+        index = load_fuzzy_index(mappings, path)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        load_fuzzy_index(mappings, path)
+        loaded = time.perf_counter() - start
+        size = os.path.getsize(path + ".fuzzy")
+    print(f"{len(mappings)} words, {len(index.variants)} deletions: build and save {built * 1000:.1f} ms, "
+          f"load {loaded * 1000:.1f} ms, {size / 1e6:.1f} MB")
+
+    # typos of dictionary words long enough to be corrected, that are not words themselves
+    rng = random.Random(0)
+    words = [w for w in mappings if w.isalpha() and len(w) >= 5]
+    typos = []
+    while len(typos) < count:
+        word = rng.choice(words)
+        typo = misspell(word, rng)
+        if typo.isalpha() and len(typo) >= 5 and typo not in mappings and typo not in index.known:
+            typos.append((typo, word))
+
+    print(f"{'':16s} {'median':>9s} {'p99':>9s} {'max':>9s} {'found':>7s} {'right':>7s}")
+    for label, candidates in ((f"{index.max_candidates} candidates", index.max_candidates), ("no cap", 1 << 30)):
+        index.max_candidates = candidates
+        times, found, right = [], 0, 0
+        for typo, word in typos:
+            start = time.perf_counter()
+            nearest = index.nearest(typo)
+            times.append(time.perf_counter() - start)
+            found += nearest is not None
+            right += nearest is not None and mappings[nearest] == mappings[word]
+        times.sort()
+        print(f"{label:16s} {times[len(times) // 2] * 1e6:6.1f} us {times[len(times) * 99 // 100] * 1e6:6.1f} us "
+              f"{times[-1] * 1e6:6.1f} us {found / count:7.0%} {right / count:7.0%}")
+
+    # the full scan the index replaces, for a few typos
+    sample = typos[:50]
+    start = time.perf_counter()
+    for typo, _ in sample:
+        min(mappings, key=lambda w: edit_distance(typo, w, 2))
+    print(f"comparing with every word instead: {(time.perf_counter() - start) / len(sample) * 1000:.1f} ms per lookup")
+
+
+def throughput(label: str, count: int, seconds: float, base: float = None) -> None:
+    rate = count / seconds
+    speedup = f"  {rate / base:5.1f}x" if base else ""
+    print(f"{label:34s} {rate:10.0f} lines/s{speedup}")
+
+
+def main() -> None:
+    normalizer = JejemonNormalizer(os.path.join(os.path.dirname(__file__), "jejemon.json"))
+    check_reference_outputs(normalizer)
+    if len(sys.argv) > 1 and sys.argv[1] == "punctuation":
+        punctuation_benchmark(normalizer, int(sys.argv[2]) if len(sys.argv) > 2 else 100)
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "dictionary":
+        dictionary_benchmark(normalizer, int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "fuzzy":
+        fuzzy_benchmark(normalizer, int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    lines = chat_lines(normalizer, count)
+    print(f"{count} lines, {sum(map(len, lines)) / 1000:.0f} KB, {len(normalizer.jejemon_dict)} dictionary words")
+
+    # the single-call path the UI uses, its blank lines kept off the terminal
+    sample = lines[:max(1, count // 10)]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected = [normalizer.normalize_text(line)['final_normalized'] for line in sample]
+    base = len(sample) / (time.perf_counter() - start)
+    throughput("normalize_text, one call per line", len(sample), len(sample) / base)
+
+    normalizer._word_cache.clear()
+    start = time.perf_counter()
+    results = list(normalizer.normalize_many(lines))
+    throughput("normalize_many", count, time.perf_counter() - start, base)
+    if results[:len(sample)] != expected:
+        raise SystemExit("normalize_many does not match normalize_text")
+
+    normalizer._word_cache.clear()
+    start = time.perf_counter()
+    three_passes = [normalizer.normalize(line, converge=False) for line in lines]
+    throughput("normalize, always 3 passes", count, time.perf_counter() - start, base)
+    if three_passes != results:
+        raise SystemExit("stopping at the fixed point changed the results")
+
+    normalizer._word_cache.clear()
+    timings = {}
+    for line in lines:
+        normalizer.normalize(line, timings=timings)
+    total = sum(timings.values())
+    print(f"per stage, {total / count * 1e6:.1f} us per line: " +
+          ", ".join(f"{name} {seconds / total:.0%}" for name, seconds in timings.items()))
+
+    if workers > 1:
+        normalizer._word_cache.clear()
+        start = time.perf_counter()
+        pooled = list(normalizer.normalize_many(lines, workers=workers))
+        throughput(f"normalize_many, {workers} workers", count, time.perf_counter() - start, base)
+        if pooled != results:
+            raise SystemExit("pooled results differ from serial ones")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,236 @@
 import json
+import multiprocessing
 import re
 import string
-from typing import Dict, Any
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from TransJeje.fuzzy import FuzzyIndex, load_fuzzy_index
+from TransJeje.store import SQLITE_SUFFIXES, SqliteDictionary
+
+
+class NormalizationCancelled(Exception):
+    # Raised by normalize_text and normalize when their cancelled callback returns True
+    pass
+
 
 class JejemonNormalizer:
-    def __init__(self, dictionary_file: str = "TransJeje/jejemon.json"):
+    # Special characters and their base equivalents. The curly quotes in the last row were
+    # straightened at some point, so ''' there opens a string and one key is really
+    # the 9 characters : "'", (colon, space, quote, apostrophe, quote, comma, space) rather than
+    # a quote mark. It is kept so the output does not change.
+    SPECIAL_CHAR_MAP = {
+        # Accented vowels
+        'á': 'a', 'à': 'a', 'â': 'a', 'ä': 'a', 'ā': 'a', 'ă': 'a', 'ą': 'a', 'ã': 'a', 'å': 'a',
+        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ē': 'e', 'ĕ': 'e', 'ę': 'e', 'ė': 'e',
+        'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i', 'ī': 'i', 'ĭ': 'i', 'į': 'i', 'ĩ': 'i',
+        'ó': 'o', 'ò': 'o', 'ô': 'o', 'ö': 'o', 'ō': 'o', 'ŏ': 'o', 'ő': 'o', 'õ': 'o', 'ø': 'o',
+        'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u', 'ū': 'u', 'ŭ': 'u', 'ů': 'u', 'ű': 'u', 'ũ': 'u',
+        'ý': 'y', 'ỳ': 'y', 'ŷ': 'y', 'ÿ': 'y', 'ȳ': 'y', 'ỹ': 'y',
+        
+        # Uppercase accented vowels
+        'Á': 'A', 'À': 'A', 'Â': 'A', 'Ä': 'A', 'Ā': 'A', 'Ă': 'A', 'Ą': 'A', 'Ã': 'A', 'Å': 'A',
+        'É': 'E', 'È': 'E', 'Ê': 'E', 'Ë': 'E', 'Ē': 'E', 'Ĕ': 'E', 'Ę': 'E', 'Ė': 'E',
+        'Í': 'I', 'Ì': 'I', 'Î': 'I', 'Ï': 'I', 'Ī': 'I', 'Ĭ': 'I', 'Į': 'I', 'Ĩ': 'I',
+        'Ó': 'O', 'Ò': 'O', 'Ô': 'O', 'Ö': 'O', 'Ō': 'O', 'Ŏ': 'O', 'Ő': 'O', 'Õ': 'O', 'Ø': 'O',
+        'Ú': 'U', 'Ù': 'U', 'Û': 'U', 'Ü': 'U', 'Ū': 'U', 'Ŭ': 'U', 'Ů': 'U', 'Ű': 'U', 'Ũ': 'U',
+        'Ý': 'Y', 'Ỳ': 'Y', 'Ŷ': 'Y', 'Ÿ': 'Y', 'Ȳ': 'Y', 'Ỹ': 'Y',
+        
+        # Special consonants
+        'ç': 'c', 'ć': 'c', 'č': 'c', 'ĉ': 'c', 'ċ': 'c',
+        'Ç': 'C', 'Ć': 'C', 'Č': 'C', 'Ĉ': 'C', 'Ċ': 'C',
+        'ñ': 'n', 'ń': 'n', 'ň': 'n', 'ņ': 'n', 'ṅ': 'n',
+        'Ñ': 'N', 'Ń': 'N', 'Ň': 'N', 'Ņ': 'N', 'Ṅ': 'N',
+        'š': 's', 'ś': 's', 'ŝ': 's', 'ş': 's', 'ș': 's',
+        'Š': 'S', 'Ś': 'S', 'Ŝ': 'S', 'Ş': 'S', 'Ș': 'S',
+        'ž': 'z', 'ź': 'z', 'ż': 'z', 'ẑ': 'z',
+        'Ž': 'Z', 'Ź': 'Z', 'Ż': 'Z', 'Ẑ': 'Z',
+        'ř': 'r', 'ŕ': 'r', 'ṛ': 'r',
+        'Ř': 'R', 'Ŕ': 'R', 'Ṛ': 'R',
+        'ł': 'l', 'ĺ': 'l', 'ľ': 'l', 'ļ': 'l',
+        'Ł': 'L', 'Ĺ': 'L', 'Ľ': 'L', 'Ļ': 'L',
+        'đ': 'd', 'ď': 'd', 'ḍ': 'd',
+        'Đ': 'D', 'Ď': 'D', 'Ḍ': 'D',
+        'ť': 't', 'ţ': 't', 'ț': 't', 'ṭ': 't',
+        'Ť': 'T', 'Ţ': 'T', 'Ț': 'T', 'Ṭ': 'T',
+        'ğ': 'g', 'ģ': 'g', 'ġ': 'g',
+        'Ğ': 'G', 'Ģ': 'G', 'Ġ': 'G',
+        'ķ': 'k', 'ḳ': 'k',
+        'Ķ': 'K', 'Ḳ': 'K',
+        'ḥ': 'h', 'ĥ': 'h',
+        'Ḥ': 'H', 'Ĥ': 'H',
+        'ṃ': 'm', 'ṁ': 'm',
+        'Ṃ': 'M', 'Ṁ': 'M',
+        'ṇ': 'n', 'ṅ': 'n',
+        'Ṇ': 'N', 'Ṅ': 'N',
+        'ṗ': 'p', 'ṕ': 'p',
+        'Ṗ': 'P', 'Ṕ': 'P',
+        'ḅ': 'b', 'ḇ': 'b',
+        'Ḅ': 'B', 'Ḇ': 'B',
+        'ḟ': 'f', 'ḋ': 'd',
+        'Ḟ': 'F', 'Ḋ': 'D',
+        'ṽ': 'v', 'ṿ': 'v',
+        'Ṽ': 'V', 'Ṿ': 'V',
+        'ẇ': 'w', 'ẁ': 'w', 'ẃ': 'w', 'ẅ': 'w',
+        'Ẇ': 'W', 'Ẁ': 'W', 'Ẃ': 'W', 'Ẅ': 'W',
+        'ẋ': 'x', 'ẍ': 'x',
+        'Ẋ': 'X', 'Ẍ': 'X',
+        
+        # Additional special characters
+        'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'þ': 'th', 'ð': 'd',
+        'Æ': 'AE', 'Œ': 'OE', 'Þ': 'TH', 'Ð': 'D',
+        
+        # Currency and symbols that might be used as letters
+        '€': 'e', '£': 'l', '₱': 'p', '₩': 'w',
+        
+        # Mathematical and other symbols sometimes used
+        'α': 'a', 'β': 'b', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'h', 'θ': 'th',
+        'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p',
+        'ρ': 'r', 'σ': 's', 'τ': 't', 'υ': 'u', 'φ': 'f', 'χ': 'ch', 'ψ': 'ps', 'ω': 'w',
+        
+        # Common stylistic characters
+        'ı': 'i', 'ȷ': 'j', 'ﬀ': 'ff', 'ﬁ': 'fi', 'ﬂ': 'fl', 'ﬃ': 'ffi', 'ﬄ': 'ffl',
+        
+        # Quotation marks and dashes
+        '"': '"', '"': '"', ''': "'", ''': "'", '–': '-', '—': '-', '…': '...',
+    }
+
+    # No replacement produces a character another entry maps, so one str.translate pass does
+    # what a str.replace per entry would; keys longer than one character are replaced first.
+    # Every single-character key is non-ASCII (or maps to itself), so ASCII text skips it.
+    SPECIAL_CHAR_TABLE = str.maketrans({k: v for k, v in SPECIAL_CHAR_MAP.items() if len(k) == 1})
+    SPECIAL_CHAR_STRINGS = [(k, v) for k, v in SPECIAL_CHAR_MAP.items() if len(k) > 1]
+    SPECIAL_CHAR_PAIRS = [(k, v) for k, v in SPECIAL_CHAR_MAP.items() if len(k) == 1 and k != v]
+
+    # Anything still outside alphanumerics, whitespace and our exempt characters
+    SPECIAL_CHAR_RESIDUE = re.compile(r'[^a-zA-Z0-9\s#@\$¥.,!?\']')
+    SPECIAL_CHAR_RESIDUE_ASCII = str.maketrans('', '', ''.join(filter(SPECIAL_CHAR_RESIDUE.match, map(chr, range(128)))))
+
+    # Above this length str.translate loses to a scan per entry on non-ASCII text (CPython only
+    # has a fast translate path for ASCII), and wins over the residue regex on ASCII text
+    LONG_TEXT = 1024
+
+    # Common jejemon number-to-letter substitutions
+    WORD_SUBSTITUTIONS = {
+        '0': 'o',
+        '1': 'i',
+        '2': 'to',
+        '3': 'e',
+        '4': 'a',
+        '5': 's',
+        '6': 'g',
+        '7': 't',
+        '8': 'b',
+        '9': 'g',
+        '@': 'a',
+        '#': 'h',
+        '$': 's',
+        '¥': 'y', 
+        #'!': 'i',
+    }
+
+    # Common jejemon patterns, applied in this order over the whole word
+    WORD_PATTERNS = [
+        ('q', 'k'),
+        ('z', 's'),
+        ('zz', 's'),
+        ('ph', 'f'),
+        ('gh', 'g'),
+        ('ck', 'k'),
+        ('poh', 'po'),
+        ('nah', 'na'),
+        ('kah', 'ka'),
+        ('tah', 'ta'),
+        ('dah', 'da'),
+        ('bah', 'ba'),
+        ('pah', 'pa'),
+        ('noh', 'no'),
+        ('koh', 'ko'),
+        ('toh', 'to'),
+        ('doh', 'do'),
+        ('boh', 'bo'),
+        ('wah', 'wa'),
+        ('yah', 'ya'),
+        ('hah', 'ha'),
+        ('powh', 'po'),
+        ('gah', 'ga'),
+        ('moh', 'mo'),
+        ('rah', 'ra'),
+        ('yoh', 'yo'),
+        ('meh', 'me'),
+        ('lah', 'la'),
+        ('loh', 'lo'),
+        ('teh', 'te'),  
+        ('sia', 'sya'),
+        ('ieh', 'ie'),
+        ('mah', 'ma'),
+        ('rah', 'ra'),
+        ('beh', 'be'),
+        ('sah', 'sa'),
+        ('soh', 'so'),
+        ('leh', 'le'),
+        ('mih', 'mi'),
+        ("eeh", "ee"),
+    ]
+    #('x', 'ks'),
+
+    # Words normalize_single_word remembers (it is cleared whenever the dictionary changes)
+    WORD_CACHE_SIZE = 50000
+
+    # The stages of one normalization pass, in order: (option that turns it on, method, key it
+    # is recorded under in normalize_text's steps, name in timings)
+    PASS_STAGES = (
+        (None, 'exclamation_to_i', None, 'exclamation'),
+        ('remove_punct', 'remove_punctuation', 'step_1_smart_punctuation', 'smart_punctuation'),
+        ('remove_special', 'normalize_special_characters', 'step_2_normalized_special_chars', 'special_chars'),
+        ('remove_repeats', 'remove_repeated_letters', 'step_3_no_repeated_letters', 'repeated_letters'),
+        ('jejemon', 'normalize_jejemon_words', 'step_4_jejemon_normalized', 'jejemon'),
+        (None, 'clean_spaces', 'step_5_clean_spaces', 'clean_spaces'),
+        ('capitalize', 'capitalize_sentences', 'step_6_capitalized', 'capitalize'),
+    )
+
+    # Tests that prove a stage would return the text unchanged, so it can be skipped: no '!'
+    # at all; nothing in string.punctuation; nothing the special-character residue regex
+    # removes (every key of SPECIAL_CHAR_MAP is such a character, or contains one)
+    EXCLAMATION_BETWEEN_LETTERS = re.compile(r"(?<=\w)!(?=\w)")
+    PUNCTUATION = re.compile('[' + re.escape(string.punctuation) + ']')
+    STAGE_NOOP = {
+        'exclamation_to_i': lambda text: '!' not in text,
+        'remove_punctuation': lambda text: not JejemonNormalizer.PUNCTUATION.search(text),
+        'normalize_special_characters': lambda text: not JejemonNormalizer.SPECIAL_CHAR_RESIDUE.search(text),
+    }
+
+    MULTIPLE_SPACES = re.compile(r'\s+')
+    SPACE_BEFORE_PUNCTUATION = re.compile(r'\s+([.,!?])')
+    SPACE_BETWEEN_PUNCTUATION = re.compile(r'([.,!?])\s*([.,!?])')
+    SENTENCE_START = re.compile(r'(^|[.!?]\s+)([a-z])')
+
+    # The punctuation is_proper_sentence_punctuation decides on: runs of sentence marks, commas
+    # and apostrophes one at a time, and runs of everything else it removes; and its lookahead
+    CHECKED_PUNCTUATION = re.compile(r"[.!?]+|[,']|[" + re.escape(''.join(c for c in string.punctuation
+                                                                       if c not in "#@$.!?,'")) + ']+')
+    NON_SPACE = re.compile(r'\S')
+
+    def __init__(self, dictionary_file: str = "TransJeje/jejemon.json", fuzzy_distance: int = 0,
+                 fuzzy_candidates: int = 64):
         self.dictionary_file = dictionary_file
         self.jejemon_dict = self.load_dictionary()
+        self.compile_rewrites()
+        self._word_cache = OrderedDict()
+        # With fuzzy_distance > 0, words still not in the dictionary after the rewrites go to the
+        # nearest dictionary word within that many edits, comparing fuzzy_candidates at most. It
+        # is off by default: edit distance cannot tell a misspelling from a correct word that is
+        # not in the dictionary ("going" is one edit from "gising", "tulong" from "tulog").
+        self.fuzzy_distance = fuzzy_distance
+        self.fuzzy_candidates = fuzzy_candidates
+        self._fuzzy = None
+        if fuzzy_distance:
+            self.fuzzy_index()  # now, not on the first unknown word of the first translation
     
     def load_dictionary(self) -> Dict[str, str]:
+        # A SQLite dictionary is opened, not read: words are looked up as they are needed
+        if self.dictionary_file.lower().endswith(SQLITE_SUFFIXES):
+            return SqliteDictionary(self.dictionary_file)
         try:
             with open(self.dictionary_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -20,188 +242,96 @@ class JejemonNormalizer:
             print(f"Error: Invalid JSON in '{self.dictionary_file}'")
             return {}
     
+    def compile_rewrites(self):
+        # The substitutions map single characters to letters, never to another key, so one
+        # str.translate does them all. The patterns must keep their order: each runs over the
+        # whole word, and a later one can match text an earlier one made (with 'hah' before
+        # 'mah', "mahah" becomes "maa"), so they are not merged into one alternation. Leading
+        # single-character patterns become a table, and patterns those make impossible
+        # ('zz' once every 'z' is an 's') are dropped.
+        self._substitution_table = str.maketrans(self.WORD_SUBSTITUTIONS)
+        leading = {}
+        patterns = list(self.WORD_PATTERNS)
+        while patterns and len(patterns[0][0]) == 1 and patterns[0][0] not in leading.values():
+            pattern, replacement = patterns.pop(0)
+            leading[pattern] = replacement
+        self._pattern_table = str.maketrans(leading)
+        gone = set(leading) - set(''.join(leading.values()))
+        self._patterns = []
+        for pattern, replacement in patterns:
+            if not gone.intersection(pattern):
+                self._patterns.append((pattern, replacement))
+                gone -= set(replacement)
+        self._pattern_trigger = re.compile('|'.join(re.escape(p) for p, _ in self._patterns) or '(?!)')
+    
     def remove_repeated_letters(self, text: str) -> str:
         return re.sub(r'(\w)\1{2,}', r'\1', text)
     
     def is_proper_sentence_punctuation(self, text: str) -> str:
-        # Characters to always exempt from removal
-        always_exempt = '#@$¥'
-        
-        # Sentence punctuation that we want to preserve when used correctly
-        sentence_punct = '.,!?'
-        
-        # Create a list to store the result
-        result = []
-        chars = list(text)
-        
-        for i, char in enumerate(chars):
-            # Always keep exempt characters
-            if char in always_exempt:
-                result.append(char)
-            # Handle sentence punctuation with context
-            elif char in sentence_punct:
-                if self._is_punctuation_proper(chars, i, char):
-                    result.append(char)
-                # If not proper, skip (remove) this punctuation
-            # Handle apostrophes in contractions
-            elif char == "'":
-                if self._is_apostrophe_in_contraction(chars, i):
-                    result.append(char)
+        # Characters to always exempt from removal: '#@$¥' ('¥' is not in string.punctuation),
+        # so only the rest of string.punctuation is looked at, in one pass
+        text_length = len(text)
+        next_non_space = self.NON_SPACE.search
+
+        def keep(match):
+            char = match.group()[-1]
+            index = match.end() - 1
+
+            if char in '.!?':
+                # Sentence end: at the very end, or followed by a space and then either nothing
+                # but whitespace or an uppercase letter (a new sentence). In a run like '!!!'
+                # only the last mark can be, so the run is matched whole and the rest dropped.
+                if index == text_length - 1:
+                    return char
+                if text[index + 1] == ' ':
+                    following = next_non_space(text, index + 1)
+                    if following is None or following.group().isupper():
+                        return char
+                return ''
+
+            if char == ',':
+                # Comma should be between words, not at start/end of text: a letter or digit
+                # within 10 characters on both sides
+                if index == 0 or index == text_length - 1:
+                    return ''
+                if (any(c.isalnum() for c in text[max(0, index - 10):index])
+                        and any(c.isalnum() for c in text[index + 1:index + 11])):
+                    return char
+                return ''
+
+            if char == "'":
+                # Apostrophes in contractions: a letter right before and right after
+                if 0 < index < text_length - 1 and text[index - 1].isalpha() and text[index + 1].isalpha():
+                    return char
+                return ''
+
             # Remove other punctuation
-            elif char not in string.punctuation:
-                result.append(char)
-            # Skip other punctuation marks
-        
-        return ''.join(result)
-    
-    def _is_punctuation_proper(self, chars: list, index: int, punct: str) -> bool:
-        text_length = len(chars)
-        
-        if punct == '.':
-            # Period should be at end of sentence or after abbreviations
-            # Check if it's at the end or followed by space/end
-            if index == text_length - 1:  # At the very end
-                return True
-            if index < text_length - 1 and chars[index + 1] == ' ':
-                # Check if there's text after the space (new sentence)
-                remaining = ''.join(chars[index + 1:]).strip()
-                if remaining and remaining[0].isupper():
-                    return True
-                # If at end after space, also valid
-                if not remaining:
-                    return True
-            return False
-            
-        elif punct == ',':
-            # Comma should be between words, not at start/end of text
-            if index == 0 or index == text_length - 1:
-                return False
-            # Should have non-space characters before and after (eventually)
-            has_word_before = any(c.isalnum() for c in chars[:index][::-1][:10])  # Check last 10 chars
-            has_word_after = any(c.isalnum() for c in chars[index + 1:index + 11])  # Check next 10 chars
-            return has_word_before and has_word_after
-            
-        elif punct in '!?':
-            # Question mark and exclamation should be at end of sentence
-            if index == text_length - 1:  # At the very end
-                return True
-            if index < text_length - 1 and chars[index + 1] == ' ':
-                # Check if there's text after the space (new sentence)
-                remaining = ''.join(chars[index + 1:]).strip()
-                if remaining and remaining[0].isupper():
-                    return True
-                # If at end after space, also valid
-                if not remaining:
-                    return True
-            return False
-            
-        return False
-    
-    def _is_apostrophe_in_contraction(self, chars: list, index: int) -> bool:
-        text_length = len(chars)
-        
-        # Must have letters before and after
-        if index == 0 or index == text_length - 1:
-            return False
-        
-        # Check for letter before and after apostrophe
-        has_letter_before = index > 0 and chars[index - 1].isalpha()
-        has_letter_after = index < text_length - 1 and chars[index + 1].isalpha()
-        
-        return has_letter_before and has_letter_after
+            return ''
+
+        return self.CHECKED_PUNCTUATION.sub(keep, text)
     
     def remove_punctuation(self, text: str) -> str:
         return self.is_proper_sentence_punctuation(text)
     
     def normalize_special_characters(self, text: str) -> str:
-
-        # Dictionary mapping special characters to their base equivalents
-        special_char_map = {
-            # Accented vowels
-            'á': 'a', 'à': 'a', 'â': 'a', 'ä': 'a', 'ā': 'a', 'ă': 'a', 'ą': 'a', 'ã': 'a', 'å': 'a',
-            'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e', 'ē': 'e', 'ĕ': 'e', 'ę': 'e', 'ė': 'e',
-            'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i', 'ī': 'i', 'ĭ': 'i', 'į': 'i', 'ĩ': 'i',
-            'ó': 'o', 'ò': 'o', 'ô': 'o', 'ö': 'o', 'ō': 'o', 'ŏ': 'o', 'ő': 'o', 'õ': 'o', 'ø': 'o',
-            'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u', 'ū': 'u', 'ŭ': 'u', 'ů': 'u', 'ű': 'u', 'ũ': 'u',
-            'ý': 'y', 'ỳ': 'y', 'ŷ': 'y', 'ÿ': 'y', 'ȳ': 'y', 'ỹ': 'y',
-            
-            # Uppercase accented vowels
-            'Á': 'A', 'À': 'A', 'Â': 'A', 'Ä': 'A', 'Ā': 'A', 'Ă': 'A', 'Ą': 'A', 'Ã': 'A', 'Å': 'A',
-            'É': 'E', 'È': 'E', 'Ê': 'E', 'Ë': 'E', 'Ē': 'E', 'Ĕ': 'E', 'Ę': 'E', 'Ė': 'E',
-            'Í': 'I', 'Ì': 'I', 'Î': 'I', 'Ï': 'I', 'Ī': 'I', 'Ĭ': 'I', 'Į': 'I', 'Ĩ': 'I',
-            'Ó': 'O', 'Ò': 'O', 'Ô': 'O', 'Ö': 'O', 'Ō': 'O', 'Ŏ': 'O', 'Ő': 'O', 'Õ': 'O', 'Ø': 'O',
-            'Ú': 'U', 'Ù': 'U', 'Û': 'U', 'Ü': 'U', 'Ū': 'U', 'Ŭ': 'U', 'Ů': 'U', 'Ű': 'U', 'Ũ': 'U',
-            'Ý': 'Y', 'Ỳ': 'Y', 'Ŷ': 'Y', 'Ÿ': 'Y', 'Ȳ': 'Y', 'Ỹ': 'Y',
-            
-            # Special consonants
-            'ç': 'c', 'ć': 'c', 'č': 'c', 'ĉ': 'c', 'ċ': 'c',
-            'Ç': 'C', 'Ć': 'C', 'Č': 'C', 'Ĉ': 'C', 'Ċ': 'C',
-            'ñ': 'n', 'ń': 'n', 'ň': 'n', 'ņ': 'n', 'ṅ': 'n',
-            'Ñ': 'N', 'Ń': 'N', 'Ň': 'N', 'Ņ': 'N', 'Ṅ': 'N',
-            'š': 's', 'ś': 's', 'ŝ': 's', 'ş': 's', 'ș': 's',
-            'Š': 'S', 'Ś': 'S', 'Ŝ': 'S', 'Ş': 'S', 'Ș': 'S',
-            'ž': 'z', 'ź': 'z', 'ż': 'z', 'ẑ': 'z',
-            'Ž': 'Z', 'Ź': 'Z', 'Ż': 'Z', 'Ẑ': 'Z',
-            'ř': 'r', 'ŕ': 'r', 'ṛ': 'r',
-            'Ř': 'R', 'Ŕ': 'R', 'Ṛ': 'R',
-            'ł': 'l', 'ĺ': 'l', 'ľ': 'l', 'ļ': 'l',
-            'Ł': 'L', 'Ĺ': 'L', 'Ľ': 'L', 'Ļ': 'L',
-            'đ': 'd', 'ď': 'd', 'ḍ': 'd',
-            'Đ': 'D', 'Ď': 'D', 'Ḍ': 'D',
-            'ť': 't', 'ţ': 't', 'ț': 't', 'ṭ': 't',
-            'Ť': 'T', 'Ţ': 'T', 'Ț': 'T', 'Ṭ': 'T',
-            'ğ': 'g', 'ģ': 'g', 'ġ': 'g',
-            'Ğ': 'G', 'Ģ': 'G', 'Ġ': 'G',
-            'ķ': 'k', 'ḳ': 'k',
-            'Ķ': 'K', 'Ḳ': 'K',
-            'ḥ': 'h', 'ĥ': 'h',
-            'Ḥ': 'H', 'Ĥ': 'H',
-            'ṃ': 'm', 'ṁ': 'm',
-            'Ṃ': 'M', 'Ṁ': 'M',
-            'ṇ': 'n', 'ṅ': 'n',
-            'Ṇ': 'N', 'Ṅ': 'N',
-            'ṗ': 'p', 'ṕ': 'p',
-            'Ṗ': 'P', 'Ṕ': 'P',
-            'ḅ': 'b', 'ḇ': 'b',
-            'Ḅ': 'B', 'Ḇ': 'B',
-            'ḟ': 'f', 'ḋ': 'd',
-            'Ḟ': 'F', 'Ḋ': 'D',
-            'ṽ': 'v', 'ṿ': 'v',
-            'Ṽ': 'V', 'Ṿ': 'V',
-            'ẇ': 'w', 'ẁ': 'w', 'ẃ': 'w', 'ẅ': 'w',
-            'Ẇ': 'W', 'Ẁ': 'W', 'Ẃ': 'W', 'Ẅ': 'W',
-            'ẋ': 'x', 'ẍ': 'x',
-            'Ẋ': 'X', 'Ẍ': 'X',
-            
-            # Additional special characters
-            'æ': 'ae', 'œ': 'oe', 'ß': 'ss', 'þ': 'th', 'ð': 'd',
-            'Æ': 'AE', 'Œ': 'OE', 'Þ': 'TH', 'Ð': 'D',
-            
-            # Currency and symbols that might be used as letters
-            '€': 'e', '£': 'l', '₱': 'p', '₩': 'w',
-            
-            # Mathematical and other symbols sometimes used
-            'α': 'a', 'β': 'b', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'h', 'θ': 'th',
-            'ι': 'i', 'κ': 'k', 'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p',
-            'ρ': 'r', 'σ': 's', 'τ': 't', 'υ': 'u', 'φ': 'f', 'χ': 'ch', 'ψ': 'ps', 'ω': 'w',
-            
-            # Common stylistic characters
-            'ı': 'i', 'ȷ': 'j', 'ﬀ': 'ff', 'ﬁ': 'fi', 'ﬂ': 'fl', 'ﬃ': 'ffi', 'ﬄ': 'ffl',
-            
-            # Quotation marks and dashes
-            '"': '"', '"': '"', ''': "'", ''': "'", '–': '-', '—': '-', '…': '...',
-        }
-        
-        # Apply character replacements
         result = text
-        for special_char, replacement in special_char_map.items():
-            result = result.replace(special_char, replacement)
-        
+        for special, replacement in self.SPECIAL_CHAR_STRINGS:
+            if special in result:
+                result = result.replace(special, replacement)
+
+        long_text = len(result) >= self.LONG_TEXT
+        if result.isascii():
+            if long_text:
+                return result.translate(self.SPECIAL_CHAR_RESIDUE_ASCII)
+        elif long_text:
+            for special, replacement in self.SPECIAL_CHAR_PAIRS:
+                result = result.replace(special, replacement)
+        else:
+            result = result.translate(self.SPECIAL_CHAR_TABLE)
+
         # After replacements, remove any remaining non-standard characters
         # Keep only alphanumeric, spaces, and our exempt characters
-        result = re.sub(r'[^a-zA-Z0-9\s#@\$¥.,!?\']', '', result)
-        
-        return result
+        return self.SPECIAL_CHAR_RESIDUE.sub('', result)
     
     def normalize_jejemon_words(self, text: str) -> str:
         if not self.jejemon_dict:
@@ -212,106 +342,74 @@ class JejemonNormalizer:
         normalized_words = []
         
         for word in words:
-            # Check for exact match (case-insensitive)
-            word_lower = word.lower()
-            
-            # First check exact match
-            if word_lower in self.jejemon_dict:
-                normalized_words.append(self.jejemon_dict[word_lower])
-            else:
-                # Check for partial matches or character substitutions
-                normalized_word = self.normalize_single_word(word)
-                normalized_words.append(normalized_word)
+            # Exact match (case-insensitive) first, then partial matches or character
+            # substitutions; normalize_single_word does both and remembers the word, so
+            # repeated words cost no dictionary lookup at all
+            normalized_words.append(self.normalize_single_word(word))
         
         return ' '.join(normalized_words)
     
     def normalize_single_word(self, word: str) -> str:
         normalized = word.lower()
-        
+
+        cached = self._word_cache.get(normalized)
+        if cached is not None:
+            self._word_cache.move_to_end(normalized)
+            return cached
+        result = self._rewrite_word(normalized)
+        self._word_cache[normalized] = result
+        if len(self._word_cache) > self.WORD_CACHE_SIZE:
+            self._word_cache.popitem(last=False)
+        return result
+
+    def _rewrite_word(self, normalized: str) -> str:
         # Check dictionary first
-        if normalized in self.jejemon_dict:
-            return self.jejemon_dict[normalized]
-        
-        # Apply common jejemon number-to-letter substitutions
-        substitutions = {
-            '0': 'o',
-            '1': 'i',
-            '2': 'to',
-            '3': 'e',
-            '4': 'a',
-            '5': 's',
-            '6': 'g',
-            '7': 't',
-            '8': 'b',
-            '9': 'g',
-            '@': 'a',
-            '#': 'h',
-            '$': 's',
-            '¥': 'y', 
-            #'!': 'i',
-        }
-        
+        mapped = self.jejemon_dict.get(normalized)
+        if mapped is not None:
+            return mapped
+
         # Apply substitutions
-        for num, letter in substitutions.items():
-            normalized = normalized.replace(num, letter)
-        
+        normalized = normalized.translate(self._substitution_table)
+
         # Check dictionary again after substitutions
-        if normalized in self.jejemon_dict:
-            return self.jejemon_dict[normalized]
-        
-        # Common jejemon patterns
-        patterns = [
-            ('q', 'k'),
-            ('z', 's'),
-            ('zz', 's'),
-            ('ph', 'f'),
-            ('gh', 'g'),
-            ('ck', 'k'),
-            ('poh', 'po'),
-            ('nah', 'na'),
-            ('kah', 'ka'),
-            ('tah', 'ta'),
-            ('dah', 'da'),
-            ('bah', 'ba'),
-            ('pah', 'pa'),
-            ('noh', 'no'),
-            ('koh', 'ko'),
-            ('toh', 'to'),
-            ('doh', 'do'),
-            ('boh', 'bo'),
-            ('wah', 'wa'),
-            ('yah', 'ya'),
-            ('hah', 'ha'),
-            ('powh', 'po'),
-            ('gah', 'ga'),
-            ('moh', 'mo'),
-            ('rah', 'ra'),
-            ('yoh', 'yo'),
-            ('meh', 'me'),
-            ('lah', 'la'),
-            ('loh', 'lo'),
-            ('teh', 'te'),  
-            ('sia', 'sya'),
-            ('ieh', 'ie'),
-            ('mah', 'ma'),
-            ('rah', 'ra'),
-            ('beh', 'be'),
-            ('sah', 'sa'),
-            ('soh', 'so'),
-            ('leh', 'le'),
-            ('mih', 'mi'),
-            ("eeh", "ee"),
-        ]
-        #('x', 'ks'),
-        
-        for pattern, replacement in patterns:
-            normalized = normalized.replace(pattern, replacement)
-        
+        mapped = self.jejemon_dict.get(normalized)
+        if mapped is not None:
+            return mapped
+
+        # Single-character patterns in one pass, then the rest in order, but only when one of
+        # them occurs at all: no rule can fire unless one already matches
+        normalized = normalized.translate(self._pattern_table)
+        if self._pattern_trigger.search(normalized):
+            for pattern, replacement in self._patterns:
+                normalized = normalized.replace(pattern, replacement)
+
         # Check dictionary one more time
-        if normalized in self.jejemon_dict:
-            return self.jejemon_dict[normalized]
-        
+        mapped = self.jejemon_dict.get(normalized)
+        if mapped is not None:
+            return mapped
+
+        # Then for a misspelling of a dictionary word
+        if self.fuzzy_distance:
+            nearest = self.fuzzy_index().nearest(normalized)
+            if nearest is not None:
+                return self.jejemon_dict[nearest]
+
         return normalized
+
+    def fuzzy_index(self) -> FuzzyIndex:
+        # Loaded, or built and saved next to the dictionary file, when typo correction is turned on
+        if self._fuzzy is None or self._fuzzy.max_distance != self.fuzzy_distance:
+            self._fuzzy = load_fuzzy_index(self.jejemon_dict, self.dictionary_file, self.fuzzy_distance,
+                                           self.fuzzy_candidates)
+        return self._fuzzy
+
+    def set_fuzzy_distance(self, fuzzy_distance: int) -> None:
+        # Turns typo correction on (or changes its distance) or off for the words that follow;
+        # the cached rewrites were made with the old setting
+        self.fuzzy_distance = fuzzy_distance
+        self._word_cache.clear()
+        if fuzzy_distance:
+            self.fuzzy_index()
     
     def normalize_text(
         self,
@@ -321,59 +419,155 @@ class JejemonNormalizer:
         remove_repeats: bool = True,
         leetspeak: bool = True,
         jejemon: bool = True,
-        capitalize: bool = True
+        capitalize: bool = True,
+        converge: bool = False,
+        timings: Optional[Dict[str, float]] = None,
+        cancelled: Optional[Callable[[], bool]] = None
     ) -> Dict[str, Any]:
-        
+        # converge stops after the first pass that changes nothing; the final text is the same,
+        # only the steps of the passes left out are missing. timings, when given, gets the
+        # seconds spent in each stage added to it. cancelled, when given, is called before
+        # every stage, and NormalizationCancelled is raised once it returns True.
+        options = {'remove_punct': remove_punct, 'remove_special': remove_special, 'remove_repeats': remove_repeats,
+                   'jejemon': jejemon, 'capitalize': capitalize}
         steps = {}
         current = text
         steps['step_0_raw_text'] = current
         
         for i in range(3):  # Run the process
             print("")
-            current = re.sub(r"(?<=\w)!(?=\w)", "i", current)
-
-            if remove_punct:
-                current = self.remove_punctuation(current)
-            steps[f'step_1_smart_punctuation_{i}'] = current
-
-            if remove_special:
-                current = self.normalize_special_characters(current)
-            steps[f'step_2_normalized_special_chars_{i}'] = current
-
-            if remove_repeats:
-                current = self.remove_repeated_letters(current)
-            steps[f'step_3_no_repeated_letters_{i}'] = current
-
-            if jejemon:
-                current = self.normalize_jejemon_words(current)
-            steps[f'step_4_jejemon_normalized_{i}'] = current
-
-            # Clean up extra spaces while preserving sentence structure
-            current = re.sub(r'\s+', ' ', current)  # Replace multiple spaces with single space
-            current = re.sub(r'\s+([.,!?])', r'\1', current)  # Remove space before punctuation
-            current = re.sub(r'([.,!?])\s*([.,!?])', r'\1\2', current)  # Remove space between punctuation
-            current = current.strip()
-            steps[f'step_5_clean_spaces_{i}'] = current
-
-            if capitalize and current:
-                # Capitalize first letter and letters after sentence-ending punctuation
-                current = re.sub(r'(^|[.!?]\s+)([a-z])', 
-                               lambda m: m.group(1) + m.group(2).upper(), current)
-            steps[f'step_6_capitalized_{i}'] = current
+            previous = current
+            current = self._normalize_pass(current, options, steps, i, timings, cancelled)
             print("")
+            if converge and current == previous:
+                break
 
         steps['final_normalized'] = current
         return steps
+
+    def normalize(
+        self,
+        text: str,
+        remove_punct: bool = True,
+        remove_special: bool = True,
+        remove_repeats: bool = True,
+        leetspeak: bool = True,
+        jejemon: bool = True,
+        capitalize: bool = True,
+        converge: bool = True,
+        timings: Optional[Dict[str, float]] = None,
+        cancelled: Optional[Callable[[], bool]] = None
+    ) -> str:
+        # normalize_text(...)['final_normalized'], without printing or keeping every step. A pass
+        # depends on nothing but its input, so once one changes nothing the rest would not either.
+        options = {'remove_punct': remove_punct, 'remove_special': remove_special, 'remove_repeats': remove_repeats,
+                   'jejemon': jejemon, 'capitalize': capitalize}
+        current = text
+        for i in range(3):
+            previous = current
+            current = self._normalize_pass(current, options, timings=timings, cancelled=cancelled)
+            if converge and current == previous:
+                break
+        return current
+
+    def _normalize_pass(self, current: str, options: Dict[str, bool], steps: Optional[Dict[str, Any]] = None,
+                        i: int = 0, timings: Optional[Dict[str, float]] = None,
+                        cancelled: Optional[Callable[[], bool]] = None) -> str:
+        for option, method, step, name in self.PASS_STAGES:
+            if cancelled is not None and cancelled():
+                raise NormalizationCancelled()
+            if option is None or options[option]:
+                noop = self.STAGE_NOOP.get(method)
+                if timings is not None:
+                    start = time.perf_counter()
+                if noop is None or not noop(current):
+                    current = getattr(self, method)(current)
+                if timings is not None:
+                    timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+            if steps is not None and step is not None:
+                steps[f'{step}_{i}'] = current
+        return current
+
+    def exclamation_to_i(self, text: str) -> str:
+        return self.EXCLAMATION_BETWEEN_LETTERS.sub("i", text)
+
+    def clean_spaces(self, text: str) -> str:
+        # Clean up extra spaces while preserving sentence structure
+        text = self.MULTIPLE_SPACES.sub(' ', text)  # Replace multiple spaces with single space
+        text = self.SPACE_BEFORE_PUNCTUATION.sub(r'\1', text)  # Remove space before punctuation
+        text = self.SPACE_BETWEEN_PUNCTUATION.sub(r'\1\2', text)  # Remove space between punctuation
+        return text.strip()
+
+    def capitalize_sentences(self, text: str) -> str:
+        # Capitalize first letter and letters after sentence-ending punctuation
+        return self.SENTENCE_START.sub(lambda m: m.group(1) + m.group(2).upper(), text)
+
+    def normalize_many(self, texts: Iterable[str], workers: int = 1, chunksize: int = 256,
+                       **options: bool) -> Iterator[str]:
+        # Normalizes texts one after another and yields the results in order, as they are
+        # ready; texts can be any iterable, a generator over a huge dump included. With workers > 1 they are spread over a process
+        # pool; each worker gets this normalizer once at startup, so with fork the dictionary
+        # is shared copy-on-write instead of being pickled.
+        if workers <= 1:
+            for text in texts:
+                yield self.normalize(text, **options)
+            return
+        if self.fuzzy_distance:
+            self.fuzzy_index()  # once here rather than once in every worker
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(self, options)) as pool:
+            yield from pool.imap(_normalize_in_worker, texts, chunksize)
+
+    def normalize_file(self, input_file: str, output_file: str, workers: int = 1, **options: bool) -> int:
+        # One normalized line out for every line in; returns the number of lines written
+        count = 0
+        with open(input_file, 'r', encoding='utf-8') as src, open(output_file, 'w', encoding='utf-8') as dst:
+            # without its line break, which would otherwise count as text after the last mark
+            lines = (line.rstrip('\n') for line in src)
+            for line in self.normalize_many(lines, workers=workers, **options):
+                dst.write(line + '\n')
+                count += 1
+        return count
     
     def add_word_mapping(self, jejemon_word: str, normal_word: str) -> bool:
+        return self.add_word_mappings([(jejemon_word, normal_word)]) == 1
+
+    def add_word_mappings(self, mappings: Iterable[Tuple[str, str]]) -> int:
+        # Adds many mappings with a single write: one transaction for a SQLite dictionary, one
+        # rewrite of the file for a JSON one. Returns how many were added, 0 on failure.
         try:
-            self.jejemon_dict[jejemon_word.lower()] = normal_word.lower()
-            
-            # Save to file
-            with open(self.dictionary_file, 'w', encoding='utf-8') as f:
-                json.dump(self.jejemon_dict, f, ensure_ascii=False, indent=2)
+            pairs = [(jejemon_word.lower(), normal_word.lower()) for jejemon_word, normal_word in mappings]
+            if isinstance(self.jejemon_dict, SqliteDictionary):
+                self.jejemon_dict.update_many(pairs)
+            else:
+                self.jejemon_dict.update(pairs)
+
+                # Save to file
+                with open(self.dictionary_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.jejemon_dict, f, ensure_ascii=False, indent=2)
+            self._word_cache.clear()
+            # The saved index no longer matches the file and is rebuilt on the next start; the
+            # loaded one just takes the new words
+            if self._fuzzy is not None:
+                self._fuzzy.add_all(pairs)
             
-            return True
+            return len(pairs)
         except Exception as e:
             print(f"Error adding word mapping: {e}")
-            return False
+            return 0
+
+
+# The normalizer a normalize_many pool worker uses, set by _init_worker when the worker starts
+_worker_normalizer = None
+_worker_options = {}
+
+
+def _init_worker(normalizer: JejemonNormalizer, options: Dict[str, bool]) -> None:
+    global _worker_normalizer, _worker_options
+    _worker_normalizer = normalizer
+    if isinstance(normalizer.jejemon_dict, SqliteDictionary):
+        normalizer.jejemon_dict.reopen()
+    _worker_options = options
+
+
+def _normalize_in_worker(text: str) -> str:
+    return _worker_normalizer.normalize(text, **_worker_options)
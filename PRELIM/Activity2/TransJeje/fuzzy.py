@@ -0,0 +1,137 @@
+import marshal
+import os
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# Nearest dictionary word within a small edit distance, SymSpell style: every dictionary word
+# is indexed under each string left after deleting up to max_distance of its characters, so a
+# lookup only generates the deletions of the word it is given and checks the dictionary words
+# filed under them, instead of comparing against the whole dictionary.
+FUZZY_INDEX_VERSION = 1
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    # Damerau-Levenshtein (adjacent transpositions count once), or limit + 1 once it is
+    # certain to be more than limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def deletions(word: str, distance: int) -> List[Set[str]]:
+    # [{word}, the strings one deletion away, two deletions away, ...] up to distance
+    levels = [{word}]
+    for _ in range(distance):
+        levels.append({w[:i] + w[i + 1:] for w in levels[-1] for i in range(len(w))})
+    return levels
+
+
+class FuzzyIndex:
+    def __init__(self, max_distance: int = 2, max_candidates: int = 64):
+        self.max_distance = max_distance
+        self.max_candidates = max_candidates  # dictionary words compared per lookup at most
+        self.variants: Dict[str, List[str]] = {}  # deletion -> dictionary words it came from
+        self.known: Set[str] = set()  # words of the normal spellings, never corrected
+
+    def add(self, word: str, normal: str) -> None:
+        for level in deletions(word, self.max_distance):
+            for variant in level:
+                words = self.variants.setdefault(variant, [])
+                if word not in words:
+                    words.append(word)
+        self.known.update(normal.split())
+
+    def add_all(self, mappings: Iterable[Tuple[str, str]]) -> None:
+        for word, normal in mappings:
+            self.add(word, normal)
+
+    def allowed_distance(self, word: str) -> int:
+        # one edit from 5 letters on, two from 10: shorter words are too near to too many
+        # others ('akin' is one edit from 'kain', 'sila' from 'lila')
+        if len(word) < 5:
+            return 0
+        return min(self.max_distance, 1 if len(word) < 10 else 2)
+
+    def nearest(self, word: str) -> Optional[str]:
+        # The closest dictionary word, ties going to the one nearest in length and then the
+        # first alphabetically, or None when there is none within the allowed distance
+        limit = self.allowed_distance(word)
+        if not limit or word in self.known or not word.isalpha():
+            return None
+        best = None
+        seen = set()
+        for level in deletions(word, limit):
+            for variant in level:
+                for candidate in self.variants.get(variant, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = edit_distance(word, candidate, limit)
+                    if distance <= limit:
+                        rank = (distance, abs(len(candidate) - len(word)), candidate)
+                        if best is None or rank < best:
+                            best = rank
+                    if len(seen) >= self.max_candidates:
+                        return best[2] if best else None
+        return best[2] if best else None
+
+    def to_state(self) -> dict:
+        return {"max_distance": self.max_distance, "variants": self.variants, "known": sorted(self.known)}
+
+    @classmethod
+    def from_state(cls, state: dict, max_candidates: int = 64) -> "FuzzyIndex":
+        index = cls(state["max_distance"], max_candidates)
+        index.variants = state["variants"]
+        index.known = set(state["known"])
+        return index
+
+
+def source_stamp(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def load_fuzzy_index(mappings: Mapping[str, str], dictionary_file: str, max_distance: int = 2,
+                     max_candidates: int = 64) -> FuzzyIndex:
+    # The index saved next to the dictionary file (jejemon.json.fuzzy) when it was
+    # built from the file as it is now, otherwise a new one, which is saved for next time
+    index_file = dictionary_file + ".fuzzy"
+    stamp = source_stamp(dictionary_file)
+    if stamp is not None:
+        try:
+            with open(index_file, "rb") as f:
+                state = marshal.loads(f.read())  # load(f) reads the file a few bytes at a time
+            if (state.get("version") == FUZZY_INDEX_VERSION and state.get("source") == stamp
+                    and state.get("max_distance") == max_distance):
+                return FuzzyIndex.from_state(state, max_candidates)
+        except (OSError, EOFError, ValueError, TypeError, AttributeError):
+            pass
+
+    index = FuzzyIndex(max_distance, max_candidates)
+    index.add_all(mappings.items())
+    if stamp is not None:
+        state = index.to_state()
+        state["version"] = FUZZY_INDEX_VERSION
+        state["source"] = stamp
+        try:
+            tmp_file = index_file + ".tmp"
+            with open(tmp_file, "wb") as f:
+                marshal.dump(state, f)
+            os.replace(tmp_file, index_file)
+        except OSError:
+            pass  # a read-only folder only means building it again next time
+    return index
@@ -0,0 +1,89 @@
+import json
+import sqlite3
+from collections.abc import MutableMapping
+from typing import Iterable, Iterator, Optional, Tuple
+
+# A jejemon dictionary kept in SQLite instead of one JSON file. Opening it reads nothing,
+# words are looked up when asked for, and every change is written right away, so neither
+# startup nor adding words depends on how many words there are. It behaves like the dict
+# JejemonNormalizer.load_dictionary returns for a JSON file.
+SQLITE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+
+class SqliteDictionary(MutableMapping):
+    def __init__(self, path: str):
+        self.path = path
+        self._len = None
+        self._inherited = []
+        self._connect()
+
+    def _connect(self) -> None:
+        # check_same_thread=False: the UI translates on a worker thread and adds words on the
+        # Tk thread; sqlite3 serializes the calls on one connection
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS mappings (word TEXT PRIMARY KEY, normal TEXT NOT NULL) "
+                         "WITHOUT ROWID")
+        self._db.commit()
+
+    def reopen(self) -> None:
+        # A connection must not be used on both sides of a fork. The inherited one is kept
+        # around unused rather than closed, as closing it could drop the parent's locks.
+        self._inherited.append(self._db)
+        self._connect()
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def get(self, word: str, default: Optional[str] = None) -> Optional[str]:
+        row = self._db.execute("SELECT normal FROM mappings WHERE word = ?", (word,)).fetchone()
+        return default if row is None else row[0]
+
+    def __getitem__(self, word: str) -> str:
+        normal = self.get(word)
+        if normal is None:
+            raise KeyError(word)
+        return normal
+
+    def __contains__(self, word) -> bool:
+        return self._db.execute("SELECT 1 FROM mappings WHERE word = ?", (word,)).fetchone() is not None
+
+    def __setitem__(self, word: str, normal: str) -> None:
+        self.update_many([(word, normal)])
+
+    def __delitem__(self, word: str) -> None:
+        with self._db:
+            deleted = self._db.execute("DELETE FROM mappings WHERE word = ?", (word,)).rowcount
+        if not deleted:
+            raise KeyError(word)
+        self._len = None
+
+    def __iter__(self) -> Iterator[str]:
+        for (word,) in self._db.execute("SELECT word FROM mappings"):
+            yield word
+
+    def __len__(self) -> int:
+        # SQLite counts by scanning, so the count is kept until the next change
+        if self._len is None:
+            self._len = self._db.execute("SELECT count(*) FROM mappings").fetchone()[0]
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._db.execute("SELECT EXISTS (SELECT 1 FROM mappings)").fetchone()[0] == 1
+
+    def update_many(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        # Any number of mappings in one transaction; later ones win, as in dict.update
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO mappings (word, normal) VALUES (?, ?)", pairs)
+        self._len = None
+
+    def import_json(self, json_path: str) -> int:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            mappings = json.load(f)
+        self.update_many(mappings.items())
+        return len(mappings)
+
+    def close(self) -> None:
+        self._db.close()
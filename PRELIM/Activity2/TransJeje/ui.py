@@ -1,13 +1,27 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
+import queue
 import threading
-import time
-from TransJeje.core import JejemonNormalizer
+from TransJeje.core import JejemonNormalizer, NormalizationCancelled
 
 class JejemonTranslatorUI:
-    def __init__(self, root):
+    POLL_MS = 50
+    FUZZY_DISTANCE = 2  # edits the FIX TYPOS toggle allows, when it is on
+
+    def __init__(self, root, fuzzy_distance=0):
         self.root = root
-        self.normalizer = JejemonNormalizer()
+        self.normalizer = JejemonNormalizer(fuzzy_distance=fuzzy_distance)
+        self.fuzzy_var = tk.BooleanVar(value=bool(fuzzy_distance))
+        # Translations run on a worker thread and hand their results to the Tk thread through
+        # this queue, tagged with the generation they were started in; anything from an older
+        # generation than the current one was cancelled and is dropped
+        self.results = queue.Queue()
+        self.generation = 0
+        self.cancel_event = None  # set while a translation runs
+        self.translating = None  # the text it is translating
+        self.polling = False
+        # held by the worker while it translates and by add_word while it changes the dictionary
+        self.normalizer_lock = threading.Lock()
         self.setup_ui()
         
     def setup_ui(self):
@@ -84,6 +98,11 @@ class JejemonTranslatorUI:
         
         add_word_btn.pack(side='right')
         
+        fuzzy_check = tk.Checkbutton(buttons_frame, text="🔍 FIX TYPOS", variable=self.fuzzy_var, command=self.toggle_fuzzy,
+        bg='#0a0a0a', fg='#00ff88', selectcolor='#2a2a2a', activebackground='#0a0a0a', activeforeground='#00e676', font=('Arial', 11, 'bold'), bd=0, highlightthickness=0)
+        
+        fuzzy_check.pack(side='right', padx=(0, 10))
+        
         # Progress bar
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
         self.progress.pack(fill='x', pady=(0, 15))
@@ -119,6 +138,8 @@ class JejemonTranslatorUI:
         
         # Bind Enter key to translate
         self.input_text.bind('<Control-Return>', lambda e: self.translate_text())
+        # Editing the input cancels a translation still running on the old text
+        self.input_text.bind('<<Modified>>', self._on_input_modified)
         
     def translate_text(self):
         input_text = self.input_text.get(1.0, tk.END).strip()
@@ -127,39 +148,93 @@ class JejemonTranslatorUI:
             messagebox.showwarning("Warning", "Please enter some jejemon text to translate!")
             return
         
+        self.cancel_translation()
+        cancel_event = threading.Event()
+        self.cancel_event = cancel_event
+        self.translating = input_text
+
         # Start progress animation
         self.progress.start(10)
         self.status_label.config(text="Translating jejemon text...")
-        
-        # Disable translate button during processing
-        self.root.after(100, lambda: self._process_translation(input_text))
-        
-    def _process_translation(self, text):
+
+        threading.Thread(target=self._translate_worker, args=(input_text, self.generation, cancel_event),
+                         daemon=True).start()
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_MS, self._poll_results)
+
+    def _translate_worker(self, text, generation, cancel_event):
+        # Runs on the worker thread: no Tk calls here, only the queue
         try:
-            time.sleep(0.5)
+            with self.normalizer_lock:
+                result = self.normalizer.normalize_text(text, cancelled=cancel_event.is_set)
+            self.results.put((generation, result, None))
+        except NormalizationCancelled:
+            pass
+        except Exception as e:
+            self.results.put((generation, None, e))
 
-            result = self.normalizer.normalize_text(text)
+    def _poll_results(self):
+        while True:
+            try:
+                generation, result, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation == self.generation:
+                self.cancel_event = None
+                if error is None:
+                    self._show_translation(result)
+                else:
+                    self.progress.stop()
+                    self.status_label.config(text="Translation failed!")
+                    messagebox.showerror("Error", f"Translation failed: {str(error)}")
+        self.polling = self.cancel_event is not None
+        if self.polling:
+            self.root.after(self.POLL_MS, self._poll_results)
+
+    def cancel_translation(self, status=None):
+        # Stops the running translation, if any, and makes sure its result is never shown
+        self.generation += 1
+        if self.cancel_event is None:
+            return
+        self.cancel_event.set()
+        self.cancel_event = None
+        self.progress.stop()
+        if status:
+            self.status_label.config(text=status)
+
+    def toggle_fuzzy(self):
+        # A translation still running was started with the old setting and is dropped
+        self.cancel_translation()
+        enabled = self.fuzzy_var.get()
+        with self.normalizer_lock:
+            self.normalizer.set_fuzzy_distance(self.FUZZY_DISTANCE if enabled else 0)
+        self.status_label.config(text="Typo correction on: unknown words go to the nearest dictionary word."
+                                 if enabled else "Typo correction off.")
 
-            self.output_text.config(state='normal')
-            self.output_text.delete(1.0, tk.END)
+    def _on_input_modified(self, event):
+        # <<Modified>> fires once until the flag is reset. The newline Ctrl+Return types right
+        # after starting a translation changes nothing that is translated, so it cancels nothing.
+        self.input_text.edit_modified(False)
+        if self.cancel_event is not None and self.input_text.get(1.0, tk.END).strip() != self.translating:
+            self.cancel_translation("Translation cancelled: the text changed.")
 
-            output = f"🎯 FINAL RESULT:\n{result['final_normalized']}\n\n"
-            output += f"📋 PROCESSING PIPELINE (step by step):\n"
-            for key in result:
-                if key.startswith('step_'):
-                    label = key.replace('step_', '').replace('_', ' ').capitalize()
-                    output += f"{label}: {result[key]}\n"
+    def _show_translation(self, result):
+        self.output_text.config(state='normal')
+        self.output_text.delete(1.0, tk.END)
 
-            self.output_text.insert(1.0, output)
-            self.output_text.config(state='disabled')
+        output = f"🎯 FINAL RESULT:\n{result['final_normalized']}\n\n"
+        output += f"📋 PROCESSING PIPELINE (step by step):\n"
+        for key in result:
+            if key.startswith('step_'):
+                label = key.replace('step_', '').replace('_', ' ').capitalize()
+                output += f"{label}: {result[key]}\n"
 
-            self.progress.stop()
-            self.status_label.config(text="Translation completed successfully!")
+        self.output_text.insert(1.0, output)
+        self.output_text.config(state='disabled')
 
-        except Exception as e:
-            self.progress.stop()
-            self.status_label.config(text="Translation failed!")
-            messagebox.showerror("Error", f"Translation failed: {str(e)}")
+        self.progress.stop()
+        self.status_label.config(text="Translation completed successfully!")
     
     def clear_all(self):
         self.input_text.delete(1.0, tk.END)
@@ -231,7 +306,12 @@ class JejemonTranslatorUI:
                 messagebox.showwarning("Warning", "Please fill in both fields!")
                 return
             
-            if self.normalizer.add_word_mapping(jejemon_word, normal_word):
+            # A translation still running would not have the new word, and must not be using
+            # the normalizer while its word cache is cleared
+            self.cancel_translation("Translation cancelled: the dictionary changed.")
+            with self.normalizer_lock:
+                added = self.normalizer.add_word_mapping(jejemon_word, normal_word)
+            if added:
                 messagebox.showinfo("Success", f"Added mapping: '{jejemon_word}' → '{normal_word}'")
                 dialog.destroy()
 
@@ -7,7 +7,9 @@ def main():
     try:
         root = tk.Tk()
         
-        app = JejemonTranslatorUI(root)
+        # python main.py --fuzzy starts with typo correction on
+        fuzzy_distance = JejemonTranslatorUI.FUZZY_DISTANCE if "--fuzzy" in sys.argv[1:] else 0
+        app = JejemonTranslatorUI(root, fuzzy_distance=fuzzy_distance)
         
         root.update_idletasks()
         x = (root.winfo_screenwidth() // 2) - (root.winfo_width() // 2)